@@ -0,0 +1,2 @@
+from .snapshot import write_snapshot, load_snapshot, SNAPSHOT_FORMAT
+from .reports import top_books_by_genre, top_rented_by_genre, total_overdue, overdue_rate, loan_durations, circulation_report
@@ -0,0 +1,94 @@
+import numpy as np  # Import NumPy for the vectorized aggregations
+
+from utils.utils import today_day  # Import today_day for the default overdue cut-off
+
+# Circulation reports computed with vectorized operations over a snapshot (see analytics.snapshot).
+# top_books_by_genre, top_rented_by_genre and total_overdue give the same numbers as the SQL behind
+# Book.top_books_by_genre, Rental.top_books_by_genre and Rental.total_overdue: they read Rental
+# only, leaving archived rentals out, and join rentals to books the way the SQL JOIN does.
+
+
+def _ranking(genres, totals, present, limit):
+    # [(genre, total)] of the genres that have rows, highest total first; ties by genre name
+    order = sorted((code for code in np.flatnonzero(present)), key=lambda code: (-totals[code], str(genres[code])))
+    return [(genres[code], int(totals[code])) for code in order[:limit]]
+
+
+def _rental_books(snapshot):
+    # (mask of the live rentals whose book still exists, index of that book in the book columns)
+    books = snapshot['book']['book_id']  # Ascending, so a rental's book is a binary search away
+    rentals = snapshot['rental']
+    position = np.searchsorted(books, rentals['book_id'])
+    position = np.minimum(position, max(len(books) - 1, 0))
+    found = (rentals['archived'] == 0) & (books[position] == rentals['book_id']) if len(books) else np.zeros(len(position), bool)
+    return found, position
+
+
+def top_books_by_genre(snapshot, limit=5):
+    # Genres with the most copies in the library, as Book.top_books_by_genre
+    book = snapshot['book']
+    genres = snapshot['genres']
+    totals = np.bincount(book['genre'], weights=book['count'], minlength=len(genres))
+    present = np.bincount(book['genre'], minlength=len(genres)) > 0
+    return _ranking(genres, totals, present, limit)
+
+
+def top_rented_by_genre(snapshot, limit=5):
+    # Genres with the most copies rented, as Rental.top_books_by_genre
+    found, position = _rental_books(snapshot)
+    genres = snapshot['genres']
+    rental_genre = snapshot['book']['genre'][position[found]]
+    totals = np.bincount(rental_genre, weights=snapshot['rental']['quantity'][found], minlength=len(genres))
+    present = np.bincount(rental_genre, minlength=len(genres)) > 0
+    return _ranking(genres, totals, present, limit)
+
+
+def total_overdue(snapshot, today=None):
+    # Copies on loan past their return day, as Rental.total_overdue; None when there are none, like SUM
+    rental = snapshot['rental']
+    today = today if today is not None else today_day()
+    overdue = (rental['archived'] == 0) & (rental['returned'] == 0) & (rental['return_day'] < today)
+    return int(rental['quantity'][overdue].sum()) if overdue.any() else None
+
+
+def overdue_rate(snapshot, today=None):
+    # Share of the copies on loan that are overdue, overall and per genre
+    rental = snapshot['rental']
+    today = today if today is not None else today_day()
+    found, position = _rental_books(snapshot)
+    on_loan = found & (rental['returned'] == 0)
+    overdue = on_loan & (rental['return_day'] < today)
+    genres = snapshot['genres']
+    genre = snapshot['book']['genre']
+    loaned = np.bincount(genre[position[on_loan]], weights=rental['quantity'][on_loan], minlength=len(genres))
+    late = np.bincount(genre[position[overdue]], weights=rental['quantity'][overdue], minlength=len(genres))
+    total_loaned, total_late = loaned.sum(), late.sum()
+    by_genre = [(genres[code], int(loaned[code]), int(late[code]), float(late[code] / loaned[code]))
+                for code in np.flatnonzero(loaned)]
+    by_genre.sort(key=lambda row: (-row[3], str(row[0])))
+    return {'on_loan': int(total_loaned), 'overdue': int(total_late),
+            'rate': float(total_late / total_loaned) if total_loaned else 0.0, 'by_genre': by_genre}
+
+
+def loan_durations(snapshot, percentiles=(50, 90, 99)):
+    # Booked loan lengths in days (return day minus rental day) over every rental, archived ones included
+    rental = snapshot['rental']
+    days = rental['return_day'].astype(np.int64) - rental['rental_day']
+    if not len(days):
+        return {'rentals': 0, 'mean': None, 'max': None, 'percentiles': {}}
+    values = np.percentile(days, percentiles)
+    return {'rentals': int(len(days)), 'mean': float(days.mean()), 'max': int(days.max()),
+            'percentiles': {int(p): float(value) for p, value in zip(percentiles, values)}}
+
+
+def circulation_report(snapshot, today=None, limit=5):
+    # Every report above in one dict
+    today = today if today is not None else today_day()
+    return {
+        'day': today,
+        'top_books_by_genre': top_books_by_genre(snapshot, limit),
+        'top_rented_by_genre': top_rented_by_genre(snapshot, limit),
+        'total_overdue': total_overdue(snapshot, today),
+        'overdue_rate': overdue_rate(snapshot, today),
+        'loan_durations': loan_durations(snapshot),
+    }
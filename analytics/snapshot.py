@@ -0,0 +1,130 @@
+import json  # Import json to write and read the snapshot manifest
+import os  # Import os to build the snapshot paths
+
+import numpy as np  # Import NumPy for the column arrays
+
+from db import current_version  # Import current_version to record the schema the snapshot was taken from
+from utils.utils import today_day  # Import today_day to date the snapshot
+
+# Columnar snapshot of the circulation data: one .npy file per column, written through memory maps
+# chunk by chunk, so neither writing nor loading holds the rows as Python tuples. Dates are day
+# numbers (see utils.utils.to_day); ISBN and genre are dictionary-encoded, the book columns holding
+# int32 codes into isbn_values.npy and the manifest's genre list. Rentals include the archived
+# ones, flagged in rental/archived, so history reports see everything while the reports that
+# mirror SQL over Rental can leave them out.
+#
+#     directory/manifest.json
+#     directory/rental/{rental_id,user_id,book_id,rental_day,return_day,returned,quantity,archived}.npy
+#     directory/book/{book_id,isbn,genre,year,count}.npy, directory/book/isbn_values.npy
+#     directory/user/{user_id,valid_until_day}.npy
+
+SNAPSHOT_FORMAT = 1  # Bumped when the layout changes
+
+# Table -> (row count query, row query, [(column, dtype)]). Rows come in primary key order.
+NUMERIC_TABLES = {
+    'rental': (
+        'SELECT (SELECT COUNT(*) FROM Rental) + (SELECT COUNT(*) FROM RentalArchive)',
+        '''
+            SELECT RentalID, UserID, BookID, RentalDay, ReturnDay, IFNULL(Returned, 0), Quantity, 0 FROM Rental
+            UNION ALL
+            SELECT RentalID, UserID, BookID, RentalDay, ReturnDay, 1, 0, 1 FROM RentalArchive
+            ORDER BY 1
+        ''',
+        [('rental_id', np.int64), ('user_id', np.int64), ('book_id', np.int64), ('rental_day', np.int32),
+         ('return_day', np.int32), ('returned', np.int8), ('quantity', np.int32), ('archived', np.int8)],
+    ),
+    'user': (
+        'SELECT COUNT(*) FROM User',
+        'SELECT UserID, ValidUntilDay FROM User ORDER BY UserID',
+        [('user_id', np.int64), ('valid_until_day', np.int32)],
+    ),
+}
+BOOK_COLUMNS = [('book_id', np.int64), ('isbn', np.int32), ('genre', np.int32), ('year', np.int32), ('count', np.int32)]
+
+
+def _open_columns(directory, table, columns, rows):
+    # Writable memory-mapped .npy files of rows entries, one per column
+    os.makedirs(os.path.join(directory, table), exist_ok=True)
+    return [np.lib.format.open_memmap(os.path.join(directory, table, f'{name}.npy'), mode='w+', dtype=dtype, shape=(rows,))
+            for name, dtype in columns]
+
+
+def _write_numeric(cursor, directory, table, chunk_size):
+    # Stream an all-integer table into its column files; returns the number of rows
+    count_sql, rows_sql, columns = NUMERIC_TABLES[table]
+    rows = cursor.execute(count_sql).fetchone()[0]
+    arrays = _open_columns(directory, table, columns, rows)
+    cursor.execute(rows_sql)
+    start = 0
+    while True:
+        chunk = cursor.fetchmany(chunk_size)
+        if not chunk:
+            break
+        block = np.array(chunk, dtype=np.int64)  # One conversion per chunk, then a column slice per file
+        for index, array in enumerate(arrays):
+            array[start:start + len(chunk)] = block[:, index]
+        start += len(chunk)
+    for array in arrays:
+        array.flush()
+    return rows
+
+
+def _write_books(cursor, directory, chunk_size):
+    # Stream Book into its column files, dictionary-encoding ISBN and genre; returns (rows, genres)
+    rows = cursor.execute('SELECT COUNT(*) FROM Book').fetchone()[0]
+    book_id, isbn, genre, year, count = _open_columns(directory, 'book', BOOK_COLUMNS, rows)
+    isbn_codes, genre_codes = {}, {}
+    cursor.execute('SELECT BookID, ISBN, Genre, IFNULL(Year, -1), IFNULL(Count, 0) FROM Book ORDER BY BookID')
+    start = 0
+    while True:
+        chunk = cursor.fetchmany(chunk_size)
+        if not chunk:
+            break
+        end = start + len(chunk)
+        book_id[start:end] = [row[0] for row in chunk]
+        isbn[start:end] = [isbn_codes.setdefault(row[1], len(isbn_codes)) for row in chunk]
+        genre[start:end] = [genre_codes.setdefault(row[2], len(genre_codes)) for row in chunk]
+        year[start:end] = [row[3] for row in chunk]
+        count[start:end] = [row[4] for row in chunk]
+        start = end
+    for array in (book_id, isbn, genre, year, count):
+        array.flush()
+    np.save(os.path.join(directory, 'book', 'isbn_values.npy'), np.array(list(isbn_codes), dtype=str))
+    return rows, list(genre_codes)  # Dicts keep insertion order, so list position == code
+
+
+def write_snapshot(conn, directory, chunk_size=100000):
+    # Write a snapshot of Rental (with RentalArchive), Book and User into directory, all read in one
+    # transaction so the tables agree with each other. Returns the manifest.
+    cursor = conn.cursor()
+    with conn.transaction():
+        rental_rows = _write_numeric(cursor, directory, 'rental', chunk_size)
+        user_rows = _write_numeric(cursor, directory, 'user', chunk_size)
+        book_rows, genres = _write_books(cursor, directory, chunk_size)
+        schema_version = current_version(conn)
+    manifest = {
+        'format': SNAPSHOT_FORMAT,
+        'schema_version': schema_version,
+        'day': today_day(),
+        'rows': {'rental': rental_rows, 'book': book_rows, 'user': user_rows},
+        'genres': genres,
+    }
+    with open(os.path.join(directory, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_snapshot(directory, mmap=True):
+    # Read a snapshot back as {'manifest', 'genres', 'isbn_values', 'rental', 'book', 'user'}, each
+    # table a dict of column arrays. With mmap the arrays are memory-mapped read-only, so loading
+    # costs nothing until a report touches a column.
+    with open(os.path.join(directory, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format {manifest.get('format')!r} in {directory}")
+    mode = 'r' if mmap else None
+    snapshot = {'manifest': manifest, 'genres': manifest['genres']}
+    for table, columns in (('rental', NUMERIC_TABLES['rental'][2]), ('user', NUMERIC_TABLES['user'][2]), ('book', BOOK_COLUMNS)):
+        snapshot[table] = {name: np.load(os.path.join(directory, table, f'{name}.npy'), mmap_mode=mode) for name, dtype in columns}
+    snapshot['isbn_values'] = np.load(os.path.join(directory, 'book', 'isbn_values.npy'), mmap_mode=mode)
+    return snapshot
@@ -0,0 +1,127 @@
+import argparse  # Import argparse to read the benchmark options
+import shutil  # Import shutil to remove the scratch directory
+import sys  # Import sys to fail the run when the reports disagree
+import tempfile  # Import tempfile to create a scratch directory
+import time  # Import time to measure the reports
+
+import numpy as np  # Import NumPy to aggregate the snapshot columns for the cross-check
+
+from analytics import load_snapshot, write_snapshot, circulation_report, top_books_by_genre, top_rented_by_genre, total_overdue  # Import the snapshot and its reports
+from benchmarks.datagen import generate  # Import the synthetic data generator
+from library import Library  # Import the Library facade whose database is read
+from models import GenreStats, Rental  # Import the models whose SQL answers the reports must match
+from utils.utils import today_day  # Import today_day for the overdue cut-off
+
+# Analytics benchmark: on a generated database, computes the circulation report twice, once with
+# SQL aggregations and Python loops over the fetched rows, once vectorized over a NumPy snapshot,
+# and checks that the snapshot gives the same genre totals and overdue count as the SQL behind
+# the top charts. Exits with status 1 when they disagree.
+#
+#     python -m benchmarks.bench_analytics --books 200000 --rentals 2000000
+
+
+def sql_report(conn, today):
+    # The report's numbers from SQL: genre totals grouped by the database, loan lengths and
+    # per-genre overdue counts gathered in Python from the fetched rentals
+    cursor = conn.cursor()
+    cursor.execute('SELECT Genre, SUM(Count) FROM Book GROUP BY Genre')
+    books = dict(cursor.fetchall())
+    cursor.execute('SELECT b.Genre, SUM(r.Quantity) FROM Rental r JOIN Book b ON r.BookID = b.BookID GROUP BY b.Genre')
+    rented = dict(cursor.fetchall())
+    cursor.execute('''
+        SELECT b.Genre, r.Quantity, r.ReturnDay FROM Rental r JOIN Book b ON r.BookID = b.BookID WHERE r.Returned = 0
+    ''')
+    loaned, late = {}, {}
+    for genre, quantity, return_day in cursor.fetchall():
+        loaned[genre] = loaned.get(genre, 0) + quantity
+        if return_day < today:
+            late[genre] = late.get(genre, 0) + quantity
+    cursor.execute('SELECT ReturnDay - RentalDay FROM Rental UNION ALL SELECT ReturnDay - RentalDay FROM RentalArchive')
+    days = sorted(row[0] for row in cursor.fetchall())
+    mean = sum(days) / len(days) if days else None
+    return books, rented, loaned, late, mean
+
+
+def totals_by_genre(snapshot):
+    # {genre: (copies in the library, copies rented)} over every genre, from the snapshot columns
+    genres = snapshot['genres']
+    book = snapshot['book']
+    books = np.bincount(book['genre'], weights=book['count'], minlength=len(genres))
+    ranked = dict(top_rented_by_genre(snapshot, limit=len(genres)))
+    return {genre: (int(books[code]), ranked.get(genre)) for code, genre in enumerate(genres)}
+
+
+def check(conn, snapshot, today):
+    # Differences between the snapshot reports and the SQL they mirror, as printable lines
+    problems = []
+    cursor = conn.cursor()
+    cursor.execute('SELECT Genre, SUM(Count) FROM Book GROUP BY Genre')
+    books = dict(cursor.fetchall())
+    cursor.execute('SELECT b.Genre, SUM(r.Quantity) FROM Rental r JOIN Book b ON r.BookID = b.BookID GROUP BY b.Genre')
+    rented = dict(cursor.fetchall())
+    for genre, (total_books, total_rented) in totals_by_genre(snapshot).items():
+        if total_books != (books.get(genre) or 0) or total_rented != rented.get(genre):
+            problems.append(f"{genre}: snapshot {total_books}/{total_rented}, SQL {books.get(genre)}/{rented.get(genre)}")
+    # Ties may rank in either order, so the charts are compared by their totals
+    for name, chart, expected in (('top books', top_books_by_genre(snapshot), GenreStats.top_books(conn)),
+                                  ('top rented', top_rented_by_genre(snapshot), GenreStats.top_rented(conn))):
+        if [total for _, total in chart] != [total for _, total in expected]:
+            problems.append(f"{name}: snapshot {chart}, SQL {expected}")
+    overdue, expected = total_overdue(snapshot, today), Rental.total_overdue(conn)[0]
+    if overdue != expected:
+        problems.append(f"total overdue: snapshot {overdue}, SQL {expected}")
+    return problems
+
+
+def best_of(runs, function):
+    # Best wall time, in seconds, of runs calls of function
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the SQL circulation report with the vectorized snapshot report")
+    parser.add_argument('--books', type=int, default=50000, help="Books in the database (default: 50000)")
+    parser.add_argument('--rentals', type=int, default=500000, help="Rental rows (default: 500000)")
+    parser.add_argument('--runs', type=int, default=5, help="Timed runs of each report (default: 5)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        path = f'{workdir}/analytics.db'
+        generate(path, args.books, rentals=args.rentals)
+        library = Library(path)
+        today = today_day()
+        with library.db.reader() as conn:
+            started = time.perf_counter()
+            manifest = write_snapshot(conn, f'{workdir}/snapshot')
+            written = time.perf_counter() - started
+            snapshot = load_snapshot(f'{workdir}/snapshot')
+            sql = best_of(args.runs, lambda: sql_report(conn, today))
+            vectorized = best_of(args.runs, lambda: circulation_report(load_snapshot(f'{workdir}/snapshot'), today))
+            problems = check(conn, snapshot, today)
+        library.close()
+    finally:
+        shutil.rmtree(workdir)
+
+    rows = manifest['rows']
+    print(f"snapshot: {rows['rental']} rentals, {rows['book']} books, {rows['user']} users written in {written:.2f}s")
+    print(f"{'report':<12} {'ms':>10}")
+    print(f"{'SQL':<12} {sql * 1000:10.1f}")
+    print(f"{'snapshot':<12} {vectorized * 1000:10.1f}")
+    print(f"speed-up: {sql / vectorized:.1f}x")
+    if problems:
+        print("The snapshot reports disagree with SQL:")
+        for problem in problems:
+            print(f"  {problem}")
+        sys.exit(1)
+    print("Snapshot reports match the SQL top charts and overdue total.")
+
+
+if __name__ == '__main__':
+    main()
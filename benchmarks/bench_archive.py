@@ -0,0 +1,74 @@
+import argparse  # Import argparse to read the benchmark options
+import contextlib  # Import contextlib to silence the archive job's report
+import io  # Import io for the silenced output
+import shutil  # Import shutil to remove the scratch directory
+import tempfile  # Import tempfile to create a scratch directory
+import time  # Import time to measure the open-loan walks
+
+from benchmarks.datagen import generate  # Import the synthetic data generator
+from library import Library  # Import the Library facade being measured
+from models import GenreStats, Rental  # Import the models whose queries are timed
+
+# Rental archive benchmark: on a generated database whose Rental table is mostly closed history,
+# times the queries that read Rental, moves the old history into RentalArchive with
+# Library.archive_rentals and times the same queries again on the compacted table.
+#
+#     python -m benchmarks.bench_archive --books 200000 --rentals 2000000
+
+
+def best_of(runs, function):
+    # Best wall time, in seconds, of runs calls of function
+    best = None
+    for _ in range(runs):
+        started = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def measure(library, runs):
+    # {query: best seconds} for the queries that read Rental
+    def walk_open_loans():
+        with library.db.reader() as conn:
+            for _ in Rental.iter_rented(conn):
+                pass
+
+    def verify_genre_stats():
+        with library.db.reader() as conn:
+            GenreStats.verify(conn)  # Aggregates every Rental row
+    return {'open-loan walk': best_of(runs, walk_open_loans), 'genre stats check': best_of(runs, verify_genre_stats)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the open-loan walks before and after archiving rental history")
+    parser.add_argument('--books', type=int, default=50000, help="Books in the database (default: 50000)")
+    parser.add_argument('--rentals', type=int, default=500000, help="Rental rows (default: 500000)")
+    parser.add_argument('--returned-ratio', type=float, default=0.95, help="Share of the rentals that are returned history (default: 0.95)")
+    parser.add_argument('--older-than-days', type=int, default=90, help="Archive returned rentals due more than this many days ago (default: 90)")
+    parser.add_argument('--batch-size', type=int, default=5000, help="Rentals moved per transaction (default: 5000)")
+    parser.add_argument('--runs', type=int, default=5, help="Timed walks before and after (default: 5)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        path = f'{workdir}/archive.db'
+        generate(path, args.books, rentals=args.rentals, returned_ratio=args.returned_ratio)
+        library = Library(path)
+        before = measure(library, args.runs)
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = library.archive_rentals(args.older_than_days, args.batch_size)
+        after = measure(library, args.runs)
+        library.close()
+    finally:
+        shutil.rmtree(workdir)
+
+    print(f"archived: {report['moved']} rentals in {report['batches']} batches, "
+          f"{report['seconds']:.2f}s ({report['rows_per_sec']:,.0f} rows/sec)")
+    print(f"{'query':<18} {'before ms':>10} {'after ms':>10} {'speed-up':>9}")
+    for query, seconds in before.items():
+        print(f"{query:<18} {seconds * 1000:10.1f} {after[query] * 1000:10.1f} {seconds / after[query]:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+import argparse  # Import argparse to read the benchmark options
+import os  # Import os to clean up the temporary database
+import random  # Import random to pick the ISBNs looked up
+import tempfile  # Import tempfile to create a scratch database file
+import time  # Import time to measure elapsed time
+
+from benchmarks.datagen import isbn13  # Import isbn13 to give the books valid ISBNs
+from library import Library  # Import the Library facade being measured
+from models import Book  # Import Book to load the catalog in one statement
+
+# Availability lookup benchmark: the rent flow's return_available_books() calls, a share of them
+# for mistyped ISBNs, with the availability cache disabled and enabled, on a file database.
+#
+#     python -m benchmarks.bench_availability --books 20000 --lookups 100000 --typos 0.2
+
+
+def run(books, lookups, typos, seed):
+    # Return {mode: (seconds, stats)} for the uncached and the cached run
+    rng = random.Random(seed)
+    hot = [isbn13(rng.randrange(books)) for _ in range(200)]  # The titles patrons keep asking for
+    isbns = [isbn13(rng.randrange(books, 10 ** 9)) if rng.random() < typos else rng.choice(hot) for _ in range(lookups)]
+    results = {}
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        library = Library(path)
+        with library.transaction() as conn:
+            Book.bulk_save(conn, [(f'Title {i}', 'Author', 2000, 'Fiction', isbn13(i), 3) for i in range(books)])
+        library.close()
+        for mode, size in (('uncached', 0), ('cached', 1024)):
+            library = Library(path, availability_cache_size=size)
+            started = time.perf_counter()
+            for isbn in isbns:
+                library.return_available_books(isbn)
+            elapsed = time.perf_counter() - started
+            cache = library.db.availability_cache
+            results[mode] = (elapsed, cache.stats() if cache else None)
+            library.close()
+    finally:
+        os.remove(path)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare availability lookups with and without the availability cache")
+    parser.add_argument('--books', type=int, default=20000, help="Books in the database (default: 20000)")
+    parser.add_argument('--lookups', type=int, default=100000, help="ISBNs looked up (default: 100000)")
+    parser.add_argument('--typos', type=float, default=0.2, help="Share of lookups for ISBNs that do not exist (default: 0.2)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed (default: 42)")
+    args = parser.parse_args()
+
+    results = run(args.books, args.lookups, args.typos, args.seed)
+    for mode, (seconds, stats) in results.items():
+        print(f"{mode:>8}: {seconds:7.3f}s, {args.lookups / seconds:11,.0f} lookups/sec")
+        if stats:
+            print(f"          {stats['hits']} hits, {stats['negative_hits']} filtered unknown ISBNs, "
+                  f"{stats['misses']} misses, hit rate {stats['hit_rate']:.1%}")
+    print(f"speedup: {results['uncached'][0] / results['cached'][0]:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
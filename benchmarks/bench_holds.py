@@ -0,0 +1,78 @@
+import argparse  # Import argparse to read the benchmark options
+import contextlib  # Import contextlib to silence the Library's console output
+import io  # Import io for the silenced output
+import os  # Import os to clean up the temporary databases
+import statistics  # Import statistics for the median return time
+import tempfile  # Import tempfile to create scratch database files
+import time  # Import time to measure the returns
+
+from benchmarks.datagen import isbn13  # Import isbn13 to give the books valid ISBNs
+from library import Library  # Import the Library facade being measured
+from utils.utils import to_day  # Import to_day to store the valid-until dates as day numbers
+
+# Hold allocation benchmark: one copy of a popular title circulates through a queue of holds.
+# Every return hands the copy to the next hold and the holder picks it up, so each timed return
+# allocates from a queue as long as --holds. Allocation seeks into idx_hold_queue, so the time
+# per return should stay flat as the queue grows.
+#
+#     python -m benchmarks.bench_holds --holds 100 1000 10000 100000 --returns 200
+
+ISBN = isbn13(1)  # The popular title
+
+
+def build(path, holds):
+    # Database with one copy of the popular title on loan to the first patron and holds patrons queueing for it
+    library = Library(path)
+    with library.transaction() as conn:
+        conn.execute("INSERT INTO Book (Title, Author, Year, Genre, ISBN, Count) VALUES ('Popular', 'Author', 2020, 'Fiction', ?, 0)", (ISBN,))
+        conn.executemany('INSERT INTO User (LibraryCardNumber, FullName, ValidUntilDay) VALUES (?, ?, ?)',
+                         [(f'HOLD-{i}', f'Patron {i}', to_day('2099-12-31')) for i in range(holds + 1)])
+        conn.execute("INSERT INTO Rental (UserID, BookID, ReturnDay, Quantity) VALUES (1, 1, ?, 1)", (to_day('2099-12-31'),))
+        conn.executemany('INSERT INTO Hold (UserID, BookID, Priority) VALUES (?, 1, ?)',
+                         [(i + 2, i % 3) for i in range(holds)])
+    return library
+
+
+def run(holds, returns):
+    # Median and worst milliseconds per return that hands the copy to the next hold
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.remove(path)
+    try:
+        library = build(path, holds)
+        cursor = library.conn.cursor()
+        holder = 'HOLD-0'
+        timings = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(min(returns, holds)):
+                started = time.perf_counter()
+                library.return_book(holder, ISBN, 1)
+                timings.append(time.perf_counter() - started)
+                cursor.execute('''
+                    SELECT User.LibraryCardNumber FROM Hold JOIN User ON User.UserID = Hold.UserID
+                    WHERE Hold.BookID = 1 AND Hold.Status = 'ready'
+                ''')
+                holder = cursor.fetchone()[0]
+                library.rent_book(holder, ISBN, '2099-12-31', 1)  # The holder picks the copy up
+        library.close()
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    return statistics.median(timings) * 1000, max(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time hold allocation on return for growing queues")
+    parser.add_argument('--holds', type=int, nargs='+', default=[100, 1000, 10000, 100000], help="Queue lengths to run (default: 100 1000 10000 100000)")
+    parser.add_argument('--returns', type=int, default=200, help="Returns timed per queue length (default: 200)")
+    args = parser.parse_args()
+
+    print(f"{'holds':>7} {'median ms':>10} {'max ms':>8}")
+    for holds in args.holds:
+        median, worst = run(holds, args.returns)
+        print(f"{holds:7d} {median:10.3f} {worst:8.3f}")
+
+
+if __name__ == '__main__':
+    main()
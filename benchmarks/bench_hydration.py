@@ -0,0 +1,154 @@
+import argparse  # Import argparse to read the benchmark options
+import gc  # Import gc to start every measurement from a collected heap
+import sqlite3  # Import sqlite3 for the in-memory benchmark database
+import time  # Import time to measure hydration
+import tracemalloc  # Import tracemalloc to measure the memory each row representation holds
+import uuid  # Import uuid to reproduce the old User hydration
+from datetime import datetime  # Import datetime to reproduce the old User hydration
+
+from benchmarks.datagen import isbn13  # Import isbn13 to give the books valid ISBNs
+from db import migrate  # Import migrate to create the schema
+from models import Rental, RentalArchive, User  # Import User for its row_factory hydration and the models of the rental pages
+from models.rows import BookRow, UserRentalRow, as_row, checked  # Import the row types and helpers of the listings
+from utils.utils import add_one_year, to_day  # Import add_one_year to reproduce the old User hydration, to_day to store dates
+
+# Row hydration benchmark: reads --rows books, users and one patron's rentals from an in-memory database and reports,
+# for each row representation, the wall time of fetching every row and the memory the fetched
+# rows hold (tracemalloc peak of a separate run):
+#
+#   - Book rows as plain tuples, as the listings fetch them (a plain cursor and checked()) and as
+#     BookRow named tuples built by a Python row_factory, the listing path before checked()
+#   - User rows as plain tuples, as the old hydration did them (User(fullname) drew a uuid4 and
+#     computed a validity date before the loaded fields overwrote them, with a __dict__ per user)
+#     and through the User row_factory (__slots__, no incidental work)
+#   - one page holding all of a patron's rentals, from Rental.page_rented_by_user and
+#     RentalArchive.page_history_by_user, and with a UserRentalRow built for every row as the pages did
+#     before they returned the sliced tuples
+#
+#     python -m benchmarks.bench_hydration --rows 1000000
+
+
+class LegacyUser:
+    # The User model as it hydrated loaded rows before it had __slots__ and a row_factory
+    def __init__(self, fullname):
+        self.library_card_number = str(uuid.uuid4())
+        self.fullname = fullname
+        self.valid_until = add_one_year(datetime.today()).strftime('%Y-%m-%d')
+
+
+def legacy_user(row):
+    user = LegacyUser(row[2])
+    user.user_id = row[0]
+    user.library_card_number = row[1]
+    user.valid_until = row[3]
+    return user
+
+
+def build(rows):
+    # In-memory database with rows books and rows users
+    conn = sqlite3.connect(':memory:')
+    migrate(conn)
+    conn.executemany('INSERT INTO Book (Title, Author, Year, Genre, ISBN, Count) VALUES (?, ?, ?, ?, ?, ?)',
+                     ((f'Title {i}', f'Author {i % 5000}', 1950 + i % 75, 'Fiction', isbn13(i), 1 + i % 5) for i in range(rows)))
+    conn.executemany('INSERT INTO User (LibraryCardNumber, FullName, ValidUntilDay) VALUES (?, ?, ?)',
+                     ((f'HYD{i:09d}', f'Patron {i}', to_day('2030-01-01')) for i in range(rows)))
+    conn.executemany('INSERT INTO Rental (UserID, BookID, ReturnDay, Quantity) VALUES (1, ?, ?, 1)',
+                     ((i + 1, to_day('2030-01-01')) for i in range(rows)))
+    conn.commit()
+    return conn
+
+
+def book_tuples(conn):
+    return conn.execute('SELECT BookID, Title, Author, Year, Genre, ISBN, Count FROM Book').fetchall()
+
+
+def book_listing(conn):
+    return checked(conn.execute('SELECT BookID, Title, Author, Year, Genre, ISBN, Count FROM Book'), BookRow).fetchall()
+
+
+def book_rows(conn):
+    cursor = conn.cursor()
+    cursor.row_factory = lambda cursor, row: BookRow._make(row)
+    return cursor.execute('SELECT BookID, Title, Author, Year, Genre, ISBN, Count FROM Book').fetchall()
+
+
+def user_tuples(conn):
+    return conn.execute('SELECT UserID, LibraryCardNumber, FullName, ValidUntil FROM User').fetchall()
+
+
+def user_legacy(conn):
+    return [legacy_user(row) for row in conn.execute('SELECT * FROM User')]
+
+
+def user_objects(conn):
+    cursor = conn.cursor()
+    cursor.row_factory = User._row_factory
+    return cursor.execute('SELECT UserID, LibraryCardNumber, FullName, ValidUntil FROM User').fetchall()
+
+
+WHOLE_PAGE = 2 ** 62  # Page size of the rental pages, so one page holds every rental
+
+
+def rented_page(conn):
+    return Rental.page_rented_by_user(conn, 1, 0, WHOLE_PAGE)[0]
+
+
+def rented_page_rows(conn):
+    return [as_row(UserRentalRow, row) for row in rented_page(conn)]
+
+
+def history_page(conn):
+    return RentalArchive.page_history_by_user(conn, 1, 0, WHOLE_PAGE)[0]
+
+
+def history_page_rows(conn):
+    return [as_row(UserRentalRow, row) for row in history_page(conn)]
+
+
+CASES = [
+    ('Book: plain tuples', book_tuples),
+    ('Book: listing', book_listing),
+    ('Book: BookRow', book_rows),
+    ('User: plain tuples', user_tuples),
+    ('User: old hydration', user_legacy),
+    ('User: row_factory', user_objects),
+    ('Rented page: tuples', rented_page),
+    ('Rented page: as_row', rented_page_rows),
+    ('History page: tuples', history_page),
+    ('History page: as_row', history_page_rows),
+]
+
+
+def measure(conn, hydrate, repeat):
+    # (best seconds, peak MiB) of hydrating every row
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        rows = hydrate(conn)
+        times.append(time.perf_counter() - started)
+        del rows
+    gc.collect()
+    tracemalloc.start()
+    rows = hydrate(conn)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del rows
+    return min(times), peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the time and memory of hydrating result rows")
+    parser.add_argument('--rows', type=int, default=1000000, help="Books and users to read (default: 1000000)")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per case, the best is reported (default: 3)")
+    args = parser.parse_args()
+    conn = build(args.rows)
+    print(f"{'rows':<22} {'seconds':>8} {'ns/row':>8} {'peak MiB':>9} {'bytes/row':>10}")
+    for label, hydrate in CASES:
+        seconds, peak = measure(conn, hydrate, args.repeat)
+        print(f"{label:<22} {seconds:8.2f} {seconds / args.rows * 1e9:8.0f} {peak:9.1f} {peak * 2 ** 20 / args.rows:10.0f}")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
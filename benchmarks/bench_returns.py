@@ -0,0 +1,82 @@
+import argparse  # Import argparse to read the benchmark options
+import contextlib  # Import contextlib to silence the per-item path's messages
+import io  # Import io for the silenced output
+import os  # Import os to clean up the temporary databases
+import random  # Import random to build the rentals and the drop-box scan
+import shutil  # Import shutil to copy the prepared database
+import tempfile  # Import tempfile to create scratch database files
+import time  # Import time to measure throughput
+
+from benchmarks.datagen import isbn13  # Import isbn13 to give the books valid ISBNs
+from library import Library  # Import the Library facade being measured
+from utils.utils import to_day  # Import to_day to store the due dates as day numbers
+
+# Book-drop benchmark: returns the same stream of (card, ISBN, quantity) items once through
+# Library.return_book item by item and once through Library.bulk_return, on identical databases.
+#
+#     python -m benchmarks.bench_returns --rentals 50000 --items 10000
+
+
+def prepare(path, books, patrons, rentals, seed):
+    # Database with open rentals; returns the (card, isbn) pairs that are on loan
+    rng = random.Random(seed)
+    library = Library(path)
+    loans = []
+    with library.transaction() as conn:
+        conn.executemany('''
+            INSERT INTO Book (Title, Author, Year, Genre, ISBN, Count) VALUES (?, 'Author', 2000, 'Fiction', ?, 0)
+        ''', [(f'Title {i}', isbn13(i)) for i in range(books)])
+        conn.executemany('''
+            INSERT INTO User (LibraryCardNumber, FullName, ValidUntilDay) VALUES (?, 'Patron', ?)
+        ''', [(f'CARD-{i}', to_day('2099-12-31')) for i in range(patrons)])
+        rows = []
+        for _ in range(rentals):
+            user, book = rng.randrange(patrons), rng.randrange(books)
+            rows.append((user + 1, book + 1, to_day(f'2024-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}'), rng.randrange(1, 3)))
+            loans.append((f'CARD-{user}', isbn13(book)))
+        conn.executemany('INSERT INTO Rental (UserID, BookID, ReturnDay, Quantity) VALUES (?, ?, ?, ?)', rows)
+    library.close()
+    return loans
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-item and bulk return processing")
+    parser.add_argument('--books', type=int, default=5000, help="Books in the database (default: 5000)")
+    parser.add_argument('--patrons', type=int, default=5000, help="Patrons in the database (default: 5000)")
+    parser.add_argument('--rentals', type=int, default=50000, help="Open rentals (default: 50000)")
+    parser.add_argument('--items', type=int, default=10000, help="Items scanned from the drop box (default: 10000)")
+    parser.add_argument('--batch', type=int, default=1000, help="Items per bulk transaction (default: 1000)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed (default: 42)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        source = os.path.join(workdir, 'source.db')
+        loans = prepare(source, args.books, args.patrons, args.rentals, args.seed)
+        rng = random.Random(args.seed + 1)
+        items = [(*rng.choice(loans), rng.choice((None, 1))) for _ in range(args.items)]
+
+        results = {}
+        for mode in ('per-item', 'bulk'):
+            path = os.path.join(workdir, f'{mode}.db')
+            shutil.copy(source, path)
+            library = Library(path)
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                if mode == 'per-item':
+                    for card, isbn, quantity in items:
+                        library.return_book(card, isbn, quantity)
+                else:
+                    library.bulk_return(items, args.batch)
+            results[mode] = time.perf_counter() - started
+            library.close()
+    finally:
+        shutil.rmtree(workdir)
+
+    for mode, seconds in results.items():
+        print(f"{mode:>8}: {args.items} items in {seconds:7.3f}s, {args.items / seconds:10,.0f} items/sec")
+    print(f"speed-up: {results['per-item'] / results['bulk']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+import argparse  # Import argparse to read the benchmark options
+import shutil  # Import shutil to remove the scratch directory
+import statistics  # Import statistics for the median and percentile latencies
+import tempfile  # Import tempfile to create a scratch directory
+import time  # Import time to measure the searches
+
+from benchmarks.datagen import generate  # Import the synthetic data generator
+from library import Library  # Import the Library facade whose database is searched
+from models import Book  # Import the Book model whose searches are timed
+from models.books import FUZZY_THRESHOLD, _words  # Import the fuzzy search defaults for the full-scan comparison
+
+# Fuzzy search benchmark: on a generated catalogue with a few well-known books added, times
+# Book.search_fuzzy for misspelled rare names (few candidates in the trigram index) and misspelled
+# common title words and authors (candidates capped at FUZZY_CANDIDATES). With --scan the same
+# scoring is also run over every row, which is what a search without the index would cost.
+#
+#     python -m benchmarks.bench_search --books 1000000 --scan
+
+KNOWN_BOOKS = [
+    ('The Hobbit', 'J. R. R. Tolkien', 1937, 'Fantasy', '978-0-261-10221-7', 2),
+    ('The Lord of the Rings', 'J. R. R. Tolkien', 1954, 'Fantasy', '0-261-10320-2', 1),
+    ('Pride and Prejudice', 'Jane Austen', 1813, 'Romance', '9780141439518', 3),
+    ('Nineteen Eighty-Four', 'George Orwell', 1949, 'Fiction', '9780451524935', 2),
+    ('One Hundred Years of Solitude', 'Gabriel Garcia Marquez', 1967, 'Fiction', '0-06-088328-6', 1),
+]
+QUERIES = ['Tolkein', 'hobit', 'Jane Austin', 'Gabriel Garsia Markez', 'Shadwo', 'Mountian Wolf', 'Greta Kazlauskis']
+
+
+def full_scan(conn, term):
+    # The fuzzy search scoring applied to every book, best 20 first
+    cursor = conn.cursor()
+    cursor.execute('SELECT BookID, Title, Author, Year, Genre, ISBN, Count FROM Book')
+    return Book._rank_fuzzy(cursor.fetchall(), _words(term), FUZZY_THRESHOLD, 20)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the typo-tolerant trigram search")
+    parser.add_argument('--books', type=int, default=200000, help="Books in the catalogue (default: 200000)")
+    parser.add_argument('--runs', type=int, default=50, help="Timed searches per query (default: 50)")
+    parser.add_argument('--scan', action='store_true', help="Also time scoring every row once per query")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    try:
+        path = f'{workdir}/search.db'
+        generate(path, args.books, rentals=0)
+        library = Library(path)
+        with library.transaction() as conn:
+            for book in KNOWN_BOOKS:
+                Book(*book).save(conn)
+        results = []
+        with library.db.reader() as conn:
+            for term in QUERIES:
+                found = Book.search_fuzzy(conn, term)  # Warm the page cache
+                timings = []
+                for _ in range(args.runs):
+                    started = time.perf_counter()
+                    Book.search_fuzzy(conn, term)
+                    timings.append(time.perf_counter() - started)
+                scan = None
+                if args.scan:
+                    started = time.perf_counter()
+                    full_scan(conn, term)
+                    scan = time.perf_counter() - started
+                timings.sort()
+                top = f'{found[0].title} / {found[0].author} ({found[0].similarity})' if found else '-'
+                results.append((term, statistics.median(timings), timings[int(len(timings) * 0.95) - 1], scan, top))
+        library.close()
+    finally:
+        shutil.rmtree(workdir)
+
+    print(f"{args.books} books")
+    print(f"{'query':<24} {'median ms':>10} {'p95 ms':>8} {'scan ms':>9}  best match")
+    for term, median, p95, scan, top in results:
+        scan = f'{scan * 1000:9.0f}' if scan is not None else f"{'-':>9}"
+        print(f"{term:<24} {median * 1000:10.2f} {p95 * 1000:8.2f} {scan}  {top}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+import argparse  # Import argparse to read the benchmark options
+import asyncio  # Import asyncio to drive many concurrent clients
+import json  # Import json to encode request bodies
+import os  # Import os to clean up the temporary database
+import random  # Import random to pick requests
+import tempfile  # Import tempfile to create a scratch database file
+import time  # Import time to measure latency
+
+from benchmarks.datagen import isbn13  # Import isbn13 to give the books valid ISBNs
+from library import Library  # Import the Library facade being served
+from service import LibraryService  # Import the HTTP service under test
+from utils.utils import to_day  # Import to_day to store the valid-until dates as day numbers
+
+# Local load test for service.py: starts the service on an ephemeral port against a scratch
+# database and runs keep-alive clients with a read-heavy mix of requests.
+#
+#     python -m benchmarks.bench_service --clients 32 --requests 200
+
+
+def build_library(path, books, patrons):
+    # Scratch database with some books and patrons
+    library = Library(path)
+    with library.transaction() as conn:
+        conn.executemany('''
+            INSERT INTO Book (Title, Author, Year, Genre, ISBN, Count) VALUES (?, ?, ?, ?, ?, ?)
+        ''', [(f'Title {i}', f'Author {i % 97}', 1950 + i % 70, f'Genre {i % 12}', isbn13(i), 1000) for i in range(books)])
+        conn.executemany('''
+            INSERT INTO User (LibraryCardNumber, FullName, ValidUntilDay) VALUES (?, ?, ?)
+        ''', [(f'CARD-{i}', f'Patron {i}', to_day('2099-12-31')) for i in range(patrons)])
+    return library
+
+
+def pick_request(rng, books, patrons):
+    # One request from the mix: mostly searches and availability checks, some rentals and returns
+    roll = rng.random()
+    isbn = isbn13(rng.randrange(books))
+    card = f'CARD-{rng.randrange(patrons)}'
+    if roll < 0.45:
+        return 'GET', f'/books/search?q={rng.randrange(books)}&limit=20', None
+    if roll < 0.80:
+        return 'GET', f'/books/{isbn}/availability', None
+    if roll < 0.88:
+        return 'GET', '/charts/genres', None
+    if roll < 0.94:
+        return 'POST', '/rentals', {'card': card, 'isbn': isbn, 'quantity': 1}
+    return 'POST', '/returns', {'card': card, 'isbn': isbn}
+
+
+async def client(port, count, seed, books, patrons, latencies, statuses):
+    # One keep-alive connection sending count requests back to back
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for _ in range(count):
+        method, target, body = pick_request(rng, books, patrons)
+        data = json.dumps(body).encode() if body is not None else b''
+        started = time.perf_counter()
+        writer.write(f'{method} {target} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(data)}\r\n\r\n'.encode() + data)
+        await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        length = 0
+        while (line := await reader.readline()) not in (b'\r\n', b''):
+            if line.lower().startswith(b'content-length:'):
+                length = int(line.split(b':')[1])
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - started)
+        statuses[status] = statuses.get(status, 0) + 1
+    writer.close()
+
+
+def percentile(values, fraction):
+    # Nearest-rank percentile of a sorted list
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def run(args, library):
+    service = LibraryService(library, workers=args.workers, timeout=args.timeout)
+    server = await service.start('127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    latencies, statuses = [], {}
+    started = time.perf_counter()
+    await asyncio.gather(*(client(port, args.requests, seed, args.books, args.patrons, latencies, statuses)
+                           for seed in range(args.clients)))
+    elapsed = time.perf_counter() - started
+    server.close()
+    await server.wait_closed()
+    service.close()
+    return latencies, statuses, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Library JSON/HTTP service locally")
+    parser.add_argument('--clients', type=int, default=32, help="Concurrent keep-alive clients (default: 32)")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per client (default: 200)")
+    parser.add_argument('--workers', type=int, default=8, help="Service worker threads (default: 8)")
+    parser.add_argument('--timeout', type=float, default=5.0, help="Per-request timeout in seconds (default: 5)")
+    parser.add_argument('--books', type=int, default=20000, help="Books in the scratch database (default: 20000)")
+    parser.add_argument('--patrons', type=int, default=2000, help="Patrons in the scratch database (default: 2000)")
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        library = build_library(path, args.books, args.patrons)
+        latencies, statuses, elapsed = asyncio.run(run(args, library))
+        library.close()
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    latencies.sort()
+    print(f"{len(latencies)} requests from {args.clients} clients in {elapsed:.2f}s: {len(latencies) / elapsed:,.0f} requests/sec")
+    print("latency ms: " + ", ".join(f"p{int(q * 100)} {percentile(latencies, q) * 1000:.2f}" for q in (0.5, 0.9, 0.95, 0.99)) +
+          f", max {latencies[-1] * 1000:.2f}")
+    print("status codes: " + ", ".join(f"{code}: {count}" for code, count in sorted(statuses.items())))
+
+
+if __name__ == '__main__':
+    main()
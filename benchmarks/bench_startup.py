@@ -0,0 +1,87 @@
+import argparse  # Import argparse to read the benchmark options
+import os  # Import os to clean up the temporary databases
+import statistics  # Import statistics for the median start-up time
+import subprocess  # Import subprocess to start a fresh interpreter per run
+import sys  # Import sys to find the interpreter and set the exit status
+import tempfile  # Import tempfile to create scratch database files
+
+from benchmarks.datagen import isbn13  # Import isbn13 to give the books valid ISBNs
+from library import Library  # Import the Library facade used to build the databases
+from models import Book  # Import Book to load the catalog in one statement
+from utils.utils import to_day  # Import to_day to store the dates as day numbers
+
+# Start-up time benchmark for the command line: a fresh interpreter imports main.py and opens a
+# Library on an already migrated database, the fixed cost every scripted 'main.py ...' call pays.
+# It runs against a small and a large database and fails when start-up is slower than --max-ms
+# or grows with the database size, so it can guard against regressions in CI.
+#
+#     python -m benchmarks.bench_startup --runs 15 --max-ms 250
+
+STARTUP = '''
+import sys, time
+started = time.perf_counter()
+import main
+library = main.Library(sys.argv[1])
+library.close()
+print(time.perf_counter() - started)
+'''
+
+
+def build(path, books):
+    # Migrated database with books rows and one open rental per ten books
+    library = Library(path)
+    with library.transaction() as conn:
+        Book.bulk_save(conn, [(f'Title {i}', 'Author', 2000, 'Fiction', isbn13(i), 2) for i in range(books)])
+        conn.execute("INSERT INTO User (LibraryCardNumber, FullName, ValidUntilDay) VALUES ('START', 'Patron', ?)", (to_day('2099-12-31'),))
+        conn.executemany('INSERT INTO Rental (UserID, BookID, ReturnDay, Quantity) VALUES (1, ?, ?, 1)',
+                         [(book_id, to_day('2024-01-01')) for book_id in range(1, books + 1, 10)])
+    library.close()
+
+
+def measure(path, runs):
+    # Median wall time, in seconds, of runs fresh start-ups against path
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    times = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', STARTUP, path], cwd=root, capture_output=True, text=True, check=True)
+        times.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure command line start-up time on a small and a large database")
+    parser.add_argument('--small', type=int, default=1000, help="Books in the small database (default: 1000)")
+    parser.add_argument('--large', type=int, default=200000, help="Books in the large database (default: 200000)")
+    parser.add_argument('--runs', type=int, default=15, help="Start-ups measured per database (default: 15)")
+    parser.add_argument('--max-ms', type=float, default=250.0, help="Fail above this median start-up time (default: 250)")
+    parser.add_argument('--max-growth', type=float, default=1.5,
+                        help="Fail when the large database starts this many times slower than the small one (default: 1.5)")
+    args = parser.parse_args()
+
+    medians = {}
+    for label, books in (('small', args.small), ('large', args.large)):
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        try:
+            build(path, books)
+            medians[label] = measure(path, args.runs)
+        finally:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        print(f"{label:>5}: {books:8d} books, median start-up {medians[label] * 1000:6.1f} ms")
+
+    failures = []
+    slowest = max(medians.values()) * 1000
+    if slowest > args.max_ms:
+        failures.append(f"start-up took {slowest:.1f} ms, the limit is {args.max_ms:.0f} ms")
+    growth = medians['large'] / medians['small']
+    if growth > args.max_growth:
+        failures.append(f"start-up is {growth:.2f}x slower on the large database, the limit is {args.max_growth:.2f}x")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+import argparse  # Import argparse to read the benchmark options
+import os  # Import os to clean up the temporary database
+import tempfile  # Import tempfile to create a scratch database file
+import time  # Import time to measure elapsed time
+
+from benchmarks.datagen import isbn13  # Import isbn13 to give the books valid ISBNs
+from library import Library  # Import the Library facade being measured
+
+# Commit-count benchmark for Library.transaction(). Runs the same mixed workload
+# (add book, register user, rent, return) with one commit per operation and
+# grouped into units of work, on a file database so every commit pays its fsync.
+#
+#     python -m benchmarks.bench_transactions --rounds 500 --batch 50
+
+
+def workload(library, round_number):
+    # One round of a mixed front-desk workload: four writes
+    isbn = isbn13(round_number)
+    library.add_book(f'Title {round_number}', 'Bench Author', 2000, 'Fiction', isbn, 3)
+    card = library.register_user(f'Patron {round_number}')
+    library.rent_book(card, isbn, None, 2)
+    library.return_book(card, isbn, 1)
+
+
+def run(rounds, batch):
+    # Return {mode: (commits, seconds)} for the standalone and the unit-of-work run
+    results = {}
+    for mode in ('standalone', 'unit of work'):
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        try:
+            library = Library(path)
+            library.conn.commit_count = 0  # Ignore the commits made by the migrations
+            started = time.perf_counter()
+            if mode == 'standalone':
+                for round_number in range(rounds):
+                    workload(library, round_number)
+            else:
+                for first in range(0, rounds, batch):
+                    with library.transaction():
+                        for round_number in range(first, min(first + batch, rounds)):
+                            workload(library, round_number)
+            results[mode] = (library.conn.commit_count, time.perf_counter() - started)
+            library.conn.close()
+        finally:
+            os.remove(path)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare commits per mixed workload with and without Library.transaction()")
+    parser.add_argument('--rounds', type=int, default=500, help="Workload rounds, four writes each (default: 500)")
+    parser.add_argument('--batch', type=int, default=50, help="Rounds per unit of work (default: 50)")
+    args = parser.parse_args()
+
+    results = run(args.rounds, args.batch)
+    operations = args.rounds * 4
+    print(f"{operations} write operations")
+    for mode, (commits, seconds) in results.items():
+        print(f"{mode:>13}: {commits:6d} commits, {seconds:7.3f}s, {operations / seconds:9,.0f} ops/sec")
+    standalone, grouped = results['standalone'][0], results['unit of work'][0]
+    print(f"commit reduction: {standalone / max(grouped, 1):.0f}x")
+
+
+if __name__ == '__main__':
+    main()
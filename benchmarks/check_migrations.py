@@ -0,0 +1,150 @@
+import contextlib  # Import contextlib to silence the Library's console output
+import io  # Import io for the silenced console output
+import os  # Import the os module to remove the scratch database
+import sqlite3  # Import the sqlite3 module to create the baseline database
+import sys  # Import the sys module to set the exit status
+import tempfile  # Import tempfile to create a scratch database file
+
+import commands  # Import the command line operations whose results are checked
+from library import BOOK_HEADERS, BOOK_MATCH_HEADERS, Library  # Import the Library facade and the column names of its listings
+from models import Book, GenreStats  # Import Book for the searches and GenreStats to check the summary
+
+# Migration check: builds a database the way the first release of the application left it (its
+# tables and its sample data), opens it with the current Library, which migrates it to the latest
+# schema, and checks that the migrated data reads back correctly. Run from the repository root:
+#
+#     python -m benchmarks.check_migrations
+
+# The tables and sample data of the first release, as its Library.create_tables and insert_sample_data wrote them
+BASELINE = '''
+    CREATE TABLE User (
+        UserID INTEGER PRIMARY KEY AUTOINCREMENT,
+        LibraryCardNumber TEXT UNIQUE NOT NULL,
+        FullName TEXT NOT NULL,
+        ValidUntil DATE NOT NULL
+    );
+    CREATE TABLE Librarian (
+        LibrarianID INTEGER PRIMARY KEY AUTOINCREMENT,
+        Username TEXT UNIQUE NOT NULL,
+        Password TEXT NOT NULL,
+        FullName TEXT NOT NULL
+    );
+    CREATE TABLE Book (
+        BookID INTEGER PRIMARY KEY AUTOINCREMENT,
+        Title TEXT,
+        Author TEXT,
+        Year INTEGER,
+        Genre TEXT,
+        ISBN TEXT NOT NULL,
+        Count INTEGER DEFAULT 1
+    );
+    CREATE TABLE Rental (
+        RentalID INTEGER PRIMARY KEY AUTOINCREMENT,
+        UserID INTEGER NOT NULL,
+        BookID INTEGER NOT NULL,
+        RentalDate DATE NOT NULL DEFAULT (date('now')),
+        ReturnDate DATE NOT NULL,
+        Returned BOOLEAN DEFAULT 0,
+        Quantity INTEGER NOT NULL DEFAULT 1,
+        FOREIGN KEY (UserID) REFERENCES User (UserID),
+        FOREIGN KEY (BookID) REFERENCES Book (BookID)
+    );
+    INSERT INTO Librarian (Username, Password, FullName) VALUES
+    ('admin1', 'password1', 'Librarian One'),
+    ('admin2', 'password2', 'Librarian Two');
+    INSERT INTO User (LibraryCardNumber, FullName, ValidUntil) VALUES
+    ('CARD12345', 'User One', '2025-12-31'),
+    ('CARD67890', 'User Two', '2024-12-31');
+    INSERT INTO Book (Title, Author, Year, Genre, ISBN, Count) VALUES
+    ('Book One', 'Author One', 2001, 'Fiction', 'ISBN001', 5),
+    ('Book Two', 'Author Two', 2015, 'Non-Fiction', 'ISBN002', 2);
+    INSERT INTO Rental (UserID, BookID, RentalDate, ReturnDate, Returned, Quantity) VALUES
+    (1, 1, '2024-01-01', '2024-02-01', 0, 1),
+    (2, 2, '2024-03-01', '2024-04-01', 0, 1);
+'''
+
+
+def build_baseline(path):
+    # A database file holding the first release's tables and sample data, plus a second row of one of its
+    # ISBNs, which the first release allowed, with a stray space that has to be trimmed away
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE)
+    conn.execute("INSERT INTO Book (Title, Author, Year, Genre, ISBN, Count) VALUES ('Book Two', 'Author Two', 2015, 'Non-Fiction', 'ISBN002 ', 1)")
+    conn.commit()
+    conn.close()
+
+
+def check_searches(library, failures):
+    # Every search returns rows with exactly the columns its headers name, whatever columns the migrations added to Book
+    with library.db.reader() as conn:
+        results = {
+            'Book.search': (Book.search(conn, 'Book One'), BOOK_HEADERS),
+            'Book.search_like': (Book.search_like(conn, 'Author One'), BOOK_HEADERS),
+            'Book.search_fuzzy': (Book.search_fuzzy(conn, 'Autor One'), BOOK_MATCH_HEADERS),
+        }
+    for name, (rows, headers) in results.items():
+        if not rows:
+            failures.append(f'{name} found nothing')
+        for row in rows:
+            if len(row) != len(headers):
+                failures.append(f'{name} returned {len(row)} values for {len(headers)} columns: {row!r}')
+            elif (row[1], row[2]) != ('Book One', 'Author One'):
+                failures.append(f'{name} returned misaligned columns: {row!r}')
+    found = commands.call(library, 'search', {'term': 'Book Two'})['books']
+    if [(book['Title'], book['Count']) for book in found] != [('Book Two', 3)]:
+        failures.append(f"the search operation returned {found!r}")
+
+
+def check_legacy_isbns(library, failures):
+    # The sample ISBNs are not valid ISBNs; their books must still be found, rented, returned and removed under them
+    def expect(what, actual, expected):
+        if actual != expected:
+            failures.append(f'{what}: expected {expected!r}, got {actual!r}')
+
+    expect("copies of ISBN001", library.return_available_books('ISBN001'), 5)
+    expect("copies of ISBN002 after merging its two rows", library.return_available_books('ISBN002'), 3)
+    expect("returning the sample rental of ISBN001", library.return_book('CARD12345', 'ISBN001'), 1)
+    expect("copies of ISBN001 after the return", library.return_available_books('ISBN001'), 6)
+    card = library.register_user('Migration Checker')
+    expect("renting ISBN001", library.rent_book(card, 'ISBN001', None, 2), True)
+    expect("checking out ISBN001 and ISBN002", [item['rented'] for item in library.checkout(card, [('ISBN001', 1), ('ISBN002', 1)])], [1, 1])
+    expect("copies of ISBN001 after renting", library.return_available_books('ISBN001'), 3)
+    expect("adding copies of ISBN001", library.add_book('Book One', 'Author One', 2001, 'Fiction', 'ISBN001', 2), True)
+    expect("adding a new book with an invalid ISBN", library.add_book('Book Three', 'Author Three', 2020, 'Fiction', 'ISBN003', 1), False)
+    library.delete_book_by_isbn('ISBN002', 1)
+    expect("copies of ISBN002 after removing one", library.return_available_books('ISBN002'), 1)
+    with library.db.reader() as conn:
+        expect("genre statistics mismatches", GenreStats.verify(conn), [])
+
+
+def check():
+    # Migrate a baseline database and return the list of problems found. tests/test_migrations.py asserts on it.
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    failures = []
+    try:
+        build_baseline(path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            library = Library(path)
+            try:
+                check_searches(library, failures)
+                check_legacy_isbns(library, failures)
+            finally:
+                library.close()
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    return failures
+
+
+def main():
+    failures = check()
+    for failure in failures:
+        print(f'FAIL: {failure}\n')
+    print(f'Baseline database migrated, {len(failures)} problem(s).')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,207 @@
+import re  # Import the re module to inspect query plan details
+import sqlite3  # Import the sqlite3 module to interact with SQLite databases
+import sys  # Import the sys module to set the exit status
+
+from db import migrate, LibraryConnection, AvailabilityCache  # Import the migration runner and the connection pieces the models use
+from utils.utils import today_day  # Import today_day for the archive cut-off
+from models import Librarian, User, Book, Rental, GenreStats, RentalArchive, Hold  # Import the model classes whose queries are checked
+
+# Query plan regression check: runs every model method against a small migrated
+# database, captures the SQL it issues and fails if EXPLAIN QUERY PLAN shows a
+# full table scan or an ORDER BY sorted in a temp b-tree. Run from the repository root:
+#
+#     python -m benchmarks.check_query_plans
+
+# Methods that are not part of the model API and are therefore not exercised
+SKIPPED = {
+    'Book.delete_book_by_year',  # Legacy instance method, superseded by Book.delete_by_year
+}
+
+# Statements that legitimately read the whole table, keyed by a fragment of their SQL
+ALLOWED_SCANS = {
+    'FROM Book WHERE Count > 0': 'listing of every available book reads the whole catalogue',
+    "Title LIKE '%'": 'substring search cannot use a b-tree index',
+    'FROM GenreStats WHERE BookRows > 0 OR RentalRows > 0': 'GenreStats.verify reads the whole summary',
+    'GROUP BY Genre': 'full aggregations used to rebuild and verify GenreStats',
+    'GROUP BY b.Genre': 'full aggregations used to rebuild and verify GenreStats',
+}
+
+# Statements whose ORDER BY legitimately sorts its rows instead of reading them in index order
+ALLOWED_SORTS = {
+    'ORDER BY bm25(': 'full-text matches are ranked by their score',
+    'Rental.ReturnDay BETWEEN': 'the due-soon window is a range of idx_rental_due, its rentals are sorted by RentalID',
+    'Rental.ReturnDay < ': 'the overdue window is a range of idx_rental_due, its rentals are sorted by RentalID',
+    'WHERE Rental.UserID = ': "a patron's open rentals are found through idx_rental_user and sorted by RentalID",
+    'FROM RentalHistory': "a patron's open and archived rentals are merged and sorted by RentalID",
+    'FROM Hold AS Ahead': "a patron's open holds are sorted by HoldID",
+}
+
+# A plan row such as "SCAN Book" is a full table scan; "SCAN Book USING COVERING INDEX ..." is not
+FULL_SCAN = re.compile(r'^SCAN (\w+)(?! USING (?:COVERING )?INDEX)(?: AS \w+)?$')
+
+
+def seed(conn):
+    # Insert a handful of rows so every method has something to work on
+    Librarian('admin', 'secret', 'Admin').save(conn)
+    user = User.create('Plan Checker')
+    user.save(conn)
+    Book('Plan One', 'Author One', 2001, 'Fiction', '9780000000019', 5).save(conn)
+    Book('Plan Two', 'Author Two', 1990, 'History', '978-0-00-000002-6', 3).save(conn)
+    return User.get_by_library_card(conn, user.library_card_number)
+
+
+def exercise(conn, user):
+    # Call every public model method once; returns the names that were called
+    called = set()
+
+    def call(owner, name, *args):
+        called.add(f'{owner.__name__}.{name}')
+        return getattr(owner, name)(*args)
+
+    card = user.library_card_number
+    call(Librarian, 'authenticate', conn, 'admin', 'secret')
+    call(User, 'authenticate', conn, card)
+    call(User, 'get_by_library_card', conn, card)
+    call(User, 'check_rental_status', conn, card)
+    call(User, 'get_borrowing_status', conn, card)
+    called.add('User.has_overdue_books')
+    user.has_overdue_books(conn)
+    called.add('Rental.save')
+    Rental(user.user_id, '9780000000019', '2000-01-01', 2).save(conn)
+    call(Rental, 'list_overdue', conn)
+    call(Rental, 'list_all_rented_books', conn)
+    call(Rental, 'total_overdue', conn)
+    call(Rental, 'list_rented_by_user', conn, user.user_id)
+    call(Rental, 'page_overdue', conn, 0, 1)
+    list(call(Rental, 'iter_overdue', conn, 1))
+    call(Rental, 'page_due_soon', conn, 3, 0, 1)
+    list(call(Rental, 'iter_due_soon', conn, 3, 1))
+    call(Rental, 'page_rented', conn, 0, 1)
+    list(call(Rental, 'iter_rented', conn, 1))
+    call(Rental, 'page_rented_by_user', conn, user.user_id, 0, 1)
+    list(call(Rental, 'iter_rented_by_user', conn, user.user_id, 1))
+    call(Rental, 'top_books_by_genre', conn)
+    call(Rental, 'return_books', conn, user.user_id, '0-00-000001-9', 1)  # The ISBN-10 form of the same edition
+    call(Rental, 'bulk_return', conn, [(card, '9780000000019', 1), (card, '978-0-00-000002-6', None)])
+    holder = User.create('Plan Holder')  # A patron without overdue books, so holds are allocated
+    holder.save(conn)
+    holder = User.get_by_library_card(conn, holder.library_card_number)
+    book_id = Book.availability(conn, '978-0-00-000002-6')[0]
+    call(Hold, 'place', conn, holder.user_id, '978-0-00-000002-6', 1)  # A copy is on the shelf, so it is ready at once
+    call(Hold, 'list_by_user', conn, holder.user_id)
+    call(Hold, 'fulfil', conn, [call(Hold, 'ready_hold', conn, holder.user_id, book_id)])
+    call(Hold, 'place', conn, holder.user_id, '978-0-00-000002-6')
+    call(Hold, 'cancel', conn, holder.user_id, '978-0-00-000002-6')
+    call(Hold, 'place', conn, user.user_id, '978-0-00-000002-6')  # Waits: this patron has overdue books
+    call(Hold, 'allocate', conn, [book_id])
+    call(Hold, 'expire', conn, today_day() + 30)
+    call(Rental, 'checkout', conn, user.user_id, [('9780000000019', 1), ('978-0-00-000002-6', 1), ('9780000000095', 1)], None, True)
+    call(Rental, 'checkout', conn, user.user_id, [('9780000000019', 1), ('9780000000019', 1), ('978-0-00-000002-6', 1)])
+    call(RentalArchive, 'archive_batch', conn, today_day() + 60, 10)  # Every returned rental so far
+    call(RentalArchive, 'page_history_by_user', conn, user.user_id, 0, 1)
+    list(call(RentalArchive, 'iter_history_by_user', conn, user.user_id, 1))
+    call(Book, 'availability', conn, '9780000000019')  # Builds the Bloom filter and caches the row
+    call(Book, 'availability', conn, '9780000000019')
+    call(Book, 'list_all_available', conn)
+    call(Book, 'page_available', conn, 0, 1)
+    list(call(Book, 'iter_available', conn, 1))
+    call(Book, 'search', conn, 'Plan')
+    call(Book, 'search_like', conn, 'Plan')
+    call(Book, 'search_fuzzy', conn, 'Plna Autor')
+    call(Book, 'top_books_by_genre', conn)
+    call(GenreStats, 'top_books', conn)
+    call(GenreStats, 'top_rented', conn)
+    called.add('Book.save')
+    Book('Plan One', 'Author One', 2001, 'Fiction', '9780000000019', 1).save(conn)
+    call(Book, 'bulk_save', conn, [('Plan One', 'Author One', 2001, 'Fiction', '9780000000019', 2),
+                                   ('Plan Three', 'Author Three', 2010, 'Fiction', '9780000000033', 1)])
+    call(Book, 'delete_by_isbn', conn, '9780000000019', 1)
+    call(Book, 'delete_by_isbn', conn, '9780000000019')
+    call(Book, 'delete_by_year', conn, 1995)
+    call(Book, 'weed', conn, ['9780000000033'], None, 'Fiction', True)
+    call(Book, 'weed', conn, None, 2005, 'Fiction', True)
+    call(GenreStats, 'verify', conn)
+    call(GenreStats, 'rebuild', conn)
+    called.add('Librarian.save')
+    called.add('User.save')
+    called.add('User.create')  # seed() registers the user through it
+    return called
+
+
+def public_methods():
+    # Every public method defined on the model classes
+    names = set()
+    for model in (Librarian, User, Book, Rental, GenreStats, RentalArchive, Hold):
+        for name, value in vars(model).items():
+            if not name.startswith('_') and isinstance(value, (staticmethod, classmethod, type(public_methods))):
+                names.add(f'{model.__name__}.{name}')
+    return names - SKIPPED
+
+
+def query_plan(conn, statement):
+    # The detail column of EXPLAIN QUERY PLAN for statement
+    cursor = conn.cursor()
+    cursor.execute('EXPLAIN QUERY PLAN ' + statement)
+    return [row[3] for row in cursor.fetchall()]
+
+
+def full_scans(conn, statement):
+    # Return the table names that EXPLAIN QUERY PLAN reports as full scans. Scans of temp tables
+    # holding a batch of input and of materialized subqueries walk the batch, not the database.
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM sqlite_temp_master WHERE type = 'table'")
+    batch_tables = {row[0] for row in cursor.fetchall()}
+    plan = query_plan(conn, statement)
+    batch_tables.update(detail.split()[1] for detail in plan if detail.startswith(('MATERIALIZE ', 'CO-ROUTINE ')))
+    return [match.group(1) for detail in plan
+            if (match := FULL_SCAN.match(detail)) and match.group(1) not in batch_tables]
+
+
+def sorts(conn, statement):
+    # True when the statement's ORDER BY is done by sorting the rows in a temp b-tree
+    return 'USE TEMP B-TREE FOR ORDER BY' in query_plan(conn, statement)
+
+
+def check():
+    # Run the check; returns (statements checked, list of problems). tests/test_query_plans.py asserts on it.
+    conn = sqlite3.connect(':memory:', factory=LibraryConnection)
+    conn.availability_cache = AvailabilityCache()  # So the cache's own queries are checked too
+    migrate(conn)
+    user = seed(conn)
+
+    statements = []
+    conn.set_trace_callback(statements.append)  # Captures each statement with its parameters bound
+    called = exercise(conn, user)
+    conn.set_trace_callback(None)
+
+    failures = []
+    missing = sorted(public_methods() - called)
+    for name in missing:
+        failures.append(f'{name} is not exercised by the query plan check')
+
+    seen = set()
+    for statement in statements:
+        statement = statement.strip()
+        if statement in seen or not statement.split(None, 1)[0].upper() in ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH'):
+            continue
+        seen.add(statement)
+        if not any(fragment in statement for fragment in ALLOWED_SORTS) and sorts(conn, statement):
+            failures.append(f'sort for ORDER BY:\n{statement}')
+        if any(fragment in statement for fragment in ALLOWED_SCANS):
+            continue
+        for table in full_scans(conn, statement):
+            failures.append(f'full scan of {table}:\n{statement}')
+    conn.close()
+    return len(seen), failures
+
+
+def main():
+    checked, failures = check()
+    for failure in failures:
+        print(f'FAIL: {failure}\n')
+    print(f'{checked} statements checked, {len(failures)} problem(s).')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,209 @@
+import argparse  # Import argparse to read the generator options
+import operator  # Import operator for the ISBN check digit sum
+import os  # Import os to check for an existing database file
+import random  # Import random for the seeded generators
+import sqlite3  # Import sqlite3 to detect a database without a search index
+import time  # Import time to report how long generation took
+from array import array  # Import array to track copies per book in compact memory
+from contextlib import contextmanager  # Import contextmanager to build the trigger suspension block
+from datetime import date, timedelta  # Import date helpers to spread rentals over time
+from itertools import islice  # Import islice to insert the generated rows in chunks
+
+from library import Library  # Import the Library facade, which creates and migrates the database
+from models import GenreStats  # Import GenreStats to rebuild the summary after the bulk load
+from utils.utils import to_day  # Import to_day to store the dates as day numbers
+
+# Deterministic synthetic library generator. The same options and seed always produce the same
+# database, from a thousand books up to tens of millions, so benchmark runs can be compared:
+#
+#   - books: titles, authors, years and genres drawn from weighted pools, valid ISBN-13s, 1-5 copies
+#   - users: GEN-prefixed card numbers, a share of them with expired cards
+#   - rentals: a rental history where a few books and a few patrons account for most loans
+#     (--skew), with open loans limited by the copies of each book and a chosen share of them
+#     overdue (--overdue-ratio)
+#
+# Rows are generated lazily and written with executemany, one transaction per chunk, so memory
+# stays flat apart from one byte per book to track copies on the shelf. The search indexes and genre
+# summary triggers are dropped during the load and what they maintain is rebuilt once at the end.
+#
+#     python -m benchmarks.datagen bench.db --books 1000000 --seed 7
+
+GENRES = [('Fiction', 30), ('Mystery', 12), ('Science Fiction', 10), ('Fantasy', 10), ('Romance', 9),
+          ('History', 8), ('Biography', 6), ('Science', 5), ('Poetry', 3), ('Children', 4), ('Travel', 2), ('Cooking', 1)]
+WORDS = ['Shadow', 'River', 'Night', 'Garden', 'Empire', 'Silent', 'Winter', 'Stone', 'Light', 'Glass', 'Storm', 'House',
+         'Secret', 'Last', 'Golden', 'Lost', 'Iron', 'Northern', 'Summer', 'Paper', 'Broken', 'Ocean', 'Crown', 'Road',
+         'Forest', 'Letters', 'City', 'Memory', 'Fire', 'Island', 'Song', 'Clock', 'Mountain', 'Window', 'Harbor', 'Wolf']
+FIRST_NAMES = ['Ada', 'Jonas', 'Mia', 'Lukas', 'Emma', 'Matas', 'Sofia', 'Noah', 'Ieva', 'Liam', 'Greta', 'Oskar',
+               'Ruta', 'Hugo', 'Clara', 'Tomas', 'Ines', 'Felix', 'Laura', 'Max', 'Marta', 'Paulius', 'Nora', 'Karl']
+LAST_NAMES = ['Adams', 'Kazlauskas', 'Berg', 'Petraitis', 'Novak', 'Jensen', 'Rossi', 'Schmidt', 'Garcia', 'Vilkas',
+              'Murphy', 'Dubois', 'Silva', 'Nowak', 'Larsen', 'Moreau', 'Keller', 'Janssen', 'Costa', 'Bauer']
+ISBN_WEIGHTS = (1, 3) * 6  # ISBN-13 check digit weights of the first twelve digits
+LOAN_DAYS = 30  # Loan period, the same month Rental uses by default
+
+
+def isbn13(number):
+    # A valid ISBN-13 in the 978 range for a book number
+    body = f'978{number:09d}'
+    total = sum(map(operator.mul, map(int, body), ISBN_WEIGHTS))
+    return body + str((10 - total % 10) % 10)
+
+
+def author_name(number):
+    # Name of author number, the same every time it is drawn
+    first, rest = number % len(FIRST_NAMES), number // len(FIRST_NAMES)
+    last, rest = rest % len(LAST_NAMES), rest // len(LAST_NAMES)
+    initial = f' {chr(65 + rest % 26)}.' if rest else ''
+    return f'{FIRST_NAMES[first]}{initial} {LAST_NAMES[last]}'
+
+
+def card_number(number):
+    # Library card number of generated user number (0-based)
+    return f'GEN{number:09d}'
+
+
+def skewed(rng, size, skew):
+    # Index in [0, size) where low indexes are picked far more often when skew > 1 (1 = uniform)
+    return min(int(size * rng.random() ** skew), size - 1)
+
+
+def book_rows(seed, books, copies):
+    # Generator of (title, author, year, genre, isbn, count) rows; records each book's copies in copies
+    rng = random.Random(f'{seed}-books')
+    genres, weights = zip(*GENRES)
+    authors = max(books // 8, 1)
+    for number in range(books):
+        title = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+        author = author_name(skewed(rng, authors, 1.5))
+        year = 2025 - int(abs(rng.gauss(0, 25)))
+        genre = rng.choices(genres, weights)[0]
+        count = rng.choice((1, 1, 2, 2, 3, 4, 5))
+        copies.append(count)
+        yield (title, author, year, genre, isbn13(number), count)
+
+
+def user_rows(seed, users, today):
+    # Generator of (card, full name, valid until day) rows; about one card in ten has expired
+    rng = random.Random(f'{seed}-users')
+    for number in range(users):
+        name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+        valid_until = today + timedelta(days=rng.randint(-365, 3) if rng.random() < 0.1 else rng.randint(30, 730))
+        yield (card_number(number), name, to_day(valid_until))
+
+
+def rental_rows(seed, books, users, rentals, copies, today, skew=2.5, overdue_ratio=0.15, returned_ratio=0.7):
+    # Generator of (user id, book id, rental day, return day, returned, quantity) rows. A share
+    # returned_ratio are returned history (Returned = 1, Quantity = 0, as Rental.return_books leaves
+    # them); the rest are open loans that take copies off the shelf, overdue_ratio of them overdue.
+    # A loan of a book with no copies left becomes history instead.
+    rng = random.Random(f'{seed}-rentals')
+    for _ in range(rentals):
+        user_id = skewed(rng, users, skew) + 1
+        book_index = skewed(rng, books, skew)
+        quantity = 1 if rng.random() < 0.9 else 2
+        if rng.random() >= returned_ratio and copies[book_index] >= quantity:
+            copies[book_index] -= quantity
+            if rng.random() < overdue_ratio:
+                rented = today - timedelta(days=LOAN_DAYS + rng.randint(1, 180))
+            else:
+                rented = today - timedelta(days=rng.randint(0, LOAN_DAYS - 1))
+            yield (user_id, book_index + 1, to_day(rented), to_day(rented) + LOAN_DAYS, 0, quantity)
+        else:
+            rented = today - timedelta(days=rng.randint(LOAN_DAYS, 3 * 365))
+            yield (user_id, book_index + 1, to_day(rented), to_day(rented) + LOAN_DAYS, 1, 0)
+
+
+@contextmanager
+def triggers_suspended(library):
+    # Drop every trigger for the duration of a bulk load, then recreate them and rebuild the genre
+    # summary and the search indexes they would have maintained row by row
+    with library.transaction() as conn:
+        triggers = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall()
+        for name, sql in triggers:
+            conn.execute(f'DROP TRIGGER "{name}"')
+    try:
+        yield
+    finally:
+        with library.transaction() as conn:
+            for name, sql in triggers:
+                conn.execute(sql)
+            GenreStats.rebuild(conn)
+            for index in ('BookSearch', 'BookTrigram'):
+                try:
+                    conn.execute(f"INSERT INTO {index} ({index}) VALUES ('rebuild')")
+                except sqlite3.OperationalError:
+                    pass  # The SQLite build has no FTS5 (or no trigram tokenizer), so there is no such index
+
+
+def insert_chunks(library, statement, rows, chunk_size):
+    # Insert rows with executemany, one transaction per chunk_size rows; returns the number inserted
+    inserted = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return inserted
+        with library.transaction() as conn:
+            conn.executemany(statement, chunk)
+        inserted += len(chunk)
+
+
+def generate(path, books=10000, users=None, rentals=None, seed=42, skew=2.5, overdue_ratio=0.15,
+             returned_ratio=0.7, chunk_size=50000, today=None):
+    # Build a synthetic library at path, which must not exist yet. users defaults to one per ten
+    # books and rentals to two per book. Returns the row counts written.
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} already exists")
+    users = users if users is not None else max(books // 10, 10)
+    rentals = rentals if rentals is not None else books * 2
+    today = today or date.today()
+    copies = array('B')
+    library = Library(path)
+    try:
+        with library.transaction() as conn:
+            conn.execute("INSERT INTO Librarian (Username, Password, FullName) VALUES ('admin', 'admin', 'Generated Librarian')")
+        with triggers_suspended(library):
+            insert_chunks(library, '''
+                INSERT INTO Book (Title, Author, Year, Genre, ISBN, Count) VALUES (?, ?, ?, ?, ?, ?)
+            ''', book_rows(seed, books, copies), chunk_size)
+            insert_chunks(library, '''
+                INSERT INTO User (LibraryCardNumber, FullName, ValidUntilDay) VALUES (?, ?, ?)
+            ''', user_rows(seed, users, today), chunk_size)
+            shelf = array('B', copies)  # Copies before any loan, to find the books whose count changed
+            insert_chunks(library, '''
+                INSERT INTO Rental (UserID, BookID, RentalDay, ReturnDay, Returned, Quantity) VALUES (?, ?, ?, ?, ?, ?)
+            ''', rental_rows(seed, books, users, rentals, copies, today, skew, overdue_ratio, returned_ratio), chunk_size)
+            insert_chunks(library, 'UPDATE Book SET Count = ? WHERE BookID = ?',
+                          ((copies[index], index + 1) for index in range(books) if copies[index] != shelf[index]), chunk_size)
+    finally:
+        library.close()
+    return {'books': books, 'users': users, 'rentals': rentals}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic library database")
+    parser.add_argument('path', help="Database file to create")
+    parser.add_argument('--books', type=int, default=10000, help="Books (default: 10000)")
+    parser.add_argument('--users', type=int, help="Users (default: one per ten books)")
+    parser.add_argument('--rentals', type=int, help="Rental history rows (default: two per book)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed (default: 42)")
+    parser.add_argument('--skew', type=float, default=2.5, help="Popularity skew of books and patrons, 1 = uniform (default: 2.5)")
+    parser.add_argument('--overdue-ratio', type=float, default=0.15, help="Share of open loans that are overdue (default: 0.15)")
+    parser.add_argument('--returned-ratio', type=float, default=0.7, help="Share of rentals already returned (default: 0.7)")
+    parser.add_argument('--chunk-size', type=int, default=50000, help="Rows per transaction (default: 50000)")
+    parser.add_argument('--force', action='store_true', help="Replace the file if it exists")
+    args = parser.parse_args()
+
+    if args.force:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.path + suffix):
+                os.remove(args.path + suffix)
+    started = time.perf_counter()
+    counts = generate(args.path, args.books, args.users, args.rentals, args.seed, args.skew,
+                      args.overdue_ratio, args.returned_ratio, args.chunk_size)
+    elapsed = time.perf_counter() - started
+    rows = sum(counts.values())
+    print(f"Generated {counts['books']} books, {counts['users']} users and {counts['rentals']} rentals "
+          f"in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/sec).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+import argparse  # Import argparse to read the stress test options
+import contextlib  # Import contextlib to silence the Library's console output in the workers
+import multiprocessing  # Import multiprocessing to run the competing desks as separate processes
+import os  # Import os to clean up the scratch databases
+import random  # Import random to pick the books and patrons
+import sqlite3  # Import sqlite3 for the unguarded baseline and the final audit
+import sys  # Import sys to set the exit status
+import tempfile  # Import tempfile to create scratch database files
+import time  # Import time to measure throughput
+
+from benchmarks.datagen import isbn13  # Import isbn13 to give the books valid ISBNs
+from library import Library  # Import the Library facade the desks rent through
+from models import Book  # Import Book to stock the shelves in one statement
+from utils.utils import to_day  # Import to_day to store the far-future dates as day numbers
+
+# Multi-process checkout stress test. Several processes, each a circulation desk with its own
+# connection, rent copies of a small set of popular books from the same database file until the
+# shelves run dry. Afterwards every book is audited: the copies on the shelf plus the copies on
+# loan must equal the copies it was stocked with, and no shelf may be negative. It reports
+# checkouts/sec for each number of writer processes and fails on any oversell.
+#
+# --mode library rents through Library.rent_book (conditional UPDATE in an immediate transaction);
+# --mode unguarded replays the old read-check-then-write sequence as a baseline.
+#
+#     python -m benchmarks.stress_checkout --processes 1 2 4 8 --attempts 1000
+
+UNGUARDED_READ = 'SELECT BookID, Count FROM Book WHERE ISBNKey = ?'
+FAR_FUTURE = to_day('2099-12-31')  # Valid-until and due day of the stress patrons and loans
+
+
+def build(path, books, copies, patrons):
+    # Database with books titles of copies copies each and patrons patrons without overdue books
+    library = Library(path)
+    with library.transaction() as conn:
+        Book.bulk_save(conn, [(f'Stress {i}', 'Author', 2000, 'Fiction', isbn13(i), copies) for i in range(books)])
+        conn.executemany("INSERT INTO User (LibraryCardNumber, FullName, ValidUntilDay) VALUES (?, 'Patron', ?)",
+                         [(f'DESK-{i}', FAR_FUTURE) for i in range(patrons)])
+    library.close()
+
+
+def rent_unguarded(conn, user_id, isbn):
+    # The sequence Rental.save used before: read the count, check it in Python, then write
+    book = conn.execute(UNGUARDED_READ, (int(isbn),)).fetchone()
+    if book and book[1] >= 1:
+        conn.execute('INSERT INTO Rental (UserID, BookID, ReturnDay, Quantity) VALUES (?, ?, ?, 1)', (user_id, book[0], FAR_FUTURE))
+        conn.execute('UPDATE Book SET Count = Count - 1 WHERE BookID = ?', (book[0],))
+        conn.commit()
+        return True
+    return False
+
+
+def desk(path, mode, number, attempts, books, patrons, start, results):
+    # One worker process: attempts rentals of random popular books, then reports its counts
+    rng = random.Random(number)
+    rented = rejected = failed = 0
+    if mode == 'library':
+        library = Library(path, availability_cache_size=0)  # Other processes write too, so no cache
+    else:
+        conn = sqlite3.connect(path, timeout=5)
+    start.wait()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        for _ in range(attempts):
+            patron = rng.randrange(patrons)
+            isbn = isbn13(rng.randrange(books))
+            try:
+                if mode == 'library':
+                    ok = library.rent_book(f'DESK-{patron}', isbn, '2099-01-01', 1, check_overdue=False)
+                else:
+                    ok = rent_unguarded(conn, patron + 1, isbn)
+            except sqlite3.OperationalError:
+                failed += 1  # The write lock stayed busy through every retry
+                if mode != 'library':
+                    conn.rollback()
+                continue
+            if ok:
+                rented += 1
+            else:
+                rejected += 1
+    elapsed = time.perf_counter() - started
+    if mode == 'library':
+        library.close()
+    else:
+        conn.close()
+    results.put((rented, rejected, failed, elapsed))
+
+
+def audit(path, copies):
+    # (books sold beyond their stock, negative shelves, copies on loan) after a run
+    conn = sqlite3.connect(path)
+    rows = conn.execute('''
+        SELECT Book.Count, COALESCE(SUM(Rental.Quantity), 0)
+        FROM Book LEFT JOIN Rental ON Rental.BookID = Book.BookID AND Rental.Returned = 0
+        GROUP BY Book.BookID
+    ''').fetchall()
+    conn.close()
+    oversold = sum(max(0, loaned - copies) for count, loaned in rows)
+    negative = sum(1 for count, loaned in rows if count < 0)
+    return oversold, negative, sum(loaned for count, loaned in rows)
+
+
+def run(mode, processes, attempts, books, copies, patrons):
+    # One stress run on a fresh database; returns its report dict
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.remove(path)
+    try:
+        build(path, books, copies, patrons)
+        context = multiprocessing.get_context('spawn')
+        start = context.Barrier(processes)
+        results = context.Queue()
+        workers = [context.Process(target=desk, args=(path, mode, number, attempts, books, patrons, start, results))
+                   for number in range(processes)]
+        for worker in workers:
+            worker.start()
+        counts = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        rented = sum(count[0] for count in counts)
+        elapsed = max(count[3] for count in counts)
+        oversold, negative, loaned = audit(path, copies)
+        return {'processes': processes, 'rented': rented, 'rejected': sum(count[1] for count in counts),
+                'failed': sum(count[2] for count in counts), 'seconds': elapsed, 'per_sec': rented / elapsed,
+                'oversold': oversold, 'negative': negative, 'consistent': loaned == rented}
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rent the same books from several processes and check nothing is oversold")
+    parser.add_argument('--mode', choices=['library', 'unguarded'], default='library',
+                        help="Rent through Library.rent_book or the old read-check-write sequence (default: library)")
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, 8], help="Writer process counts to run (default: 1 2 4 8)")
+    parser.add_argument('--attempts', type=int, default=1000, help="Rentals attempted per process (default: 1000)")
+    parser.add_argument('--books', type=int, default=20, help="Popular books competed for (default: 20)")
+    parser.add_argument('--copies', type=int, default=100, help="Copies of each book (default: 100)")
+    parser.add_argument('--patrons', type=int, default=200, help="Patrons renting (default: 200)")
+    args = parser.parse_args()
+
+    print(f"{'procs':>5} {'rented':>7} {'rejected':>8} {'busy':>5} {'seconds':>8} {'rentals/s':>10} {'oversold':>8} {'negative':>8}")
+    failures = 0
+    for processes in args.processes:
+        report = run(args.mode, processes, args.attempts, args.books, args.copies, args.patrons)
+        print(f"{report['processes']:5d} {report['rented']:7d} {report['rejected']:8d} {report['failed']:5d} "
+              f"{report['seconds']:8.2f} {report['per_sec']:10.0f} {report['oversold']:8d} {report['negative']:8d}")
+        if report['oversold'] or report['negative'] or not report['consistent']:
+            failures += 1
+    if failures:
+        print(f"FAIL: {failures} run(s) sold copies that were not on the shelf")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
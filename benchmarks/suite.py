@@ -0,0 +1,456 @@
+import argparse  # Import argparse to read the suite options
+import contextlib  # Import contextlib to silence the Library's console output while timing
+import io  # Import io for the in-memory export sink
+import json  # Import json to write and read the results files
+import os  # Import os to manage the scratch files
+import platform  # Import platform to record the machine in the results
+import random  # Import random to pick the rows each operation works on
+import shutil  # Import shutil to copy the generated database before it is modified
+import sqlite3  # Import sqlite3 to record the SQLite version
+import statistics  # Import statistics for the timing summaries
+import subprocess  # Import subprocess to record the git commit
+import sys  # Import sys to set the exit status
+import tempfile  # Import tempfile to create scratch files
+import time  # Import time to measure each call
+
+from library import Library  # Import the Library facade being measured
+from benchmarks.datagen import generate, card_number, isbn13  # Import the synthetic data generator
+
+# Benchmark suite for the Library facade. Generates (or reuses) a synthetic database with
+# benchmarks/datagen.py, times every public Library method on a copy of it and writes the
+# timings to a JSON file; --compare prints the change against an earlier results file.
+#
+#     python -m benchmarks.suite --books 100000 --output results.json
+#     python -m benchmarks.suite --books 100000 --output after.json --compare results.json
+#
+# The suite fails when a public Library method has no benchmark, so new methods get one.
+# tests/test_benchmarks.py runs the same cases under pytest-benchmark.
+
+# Members that are not operations and are therefore not timed
+SKIPPED = {
+    'close',  # Ends the benchmark
+    'conn',  # Property giving the raw writer connection
+}
+
+
+def case(name, covers, repeat=None):
+    # Decorator registering a benchmark: name in the results, the Library methods it covers and
+    # how many timed calls it makes (None = the suite's --repeat). The function receives the
+    # Library and the shared context and returns (prepare, run): prepare(i) is untimed, run(i) timed.
+    def register(function):
+        CASES.append({'name': name, 'covers': covers, 'repeat': repeat, 'build': function})
+        return function
+    return register
+
+
+CASES = []
+
+
+class Context:
+    # Rows picked from the generated database that the cases work on, and the scratch files they write
+    def __init__(self, library, counts, seed, scratch):
+        self.rng = random.Random(seed)
+        self.books = counts['books']
+        self.users = counts['users']
+        self.patron = library.register_user('Benchmark Patron')  # A patron with no overdue books
+        self.rented = []  # (card, isbn) pairs rented by the rent case, returned by the return case
+        self.catalog = os.path.join(scratch, 'catalog.csv')
+        self.snapshot = os.path.join(scratch, 'snapshot')
+
+    def popular_isbn(self):
+        # ISBN of a book drawn with the same skew as the generated rentals
+        return isbn13(min(int(self.books * self.rng.random() ** 2.5), self.books - 1))
+
+    def any_isbn(self):
+        return isbn13(self.rng.randrange(self.books))
+
+    def card(self):
+        return card_number(self.rng.randrange(self.users))
+
+
+@case('register_user', ['register_user'])
+def _register_user(library, ctx):
+    return None, lambda i: library.register_user(f'Suite Patron {i}')
+
+
+@case('add_librarian', ['add_librarian'])
+def _add_librarian(library, ctx):
+    return None, lambda i: library.add_librarian(f'suite-{i}', 'secret', 'Suite Librarian')
+
+
+@case('authenticate_admin', ['authenticate_admin'])
+def _authenticate_admin(library, ctx):
+    return None, lambda i: library.authenticate_admin('admin', 'admin')
+
+
+@case('authenticate_user', ['authenticate_user'])
+def _authenticate_user(library, ctx):
+    return None, lambda i: library.authenticate_user(ctx.card())
+
+
+@case('check_rental_status', ['check_rental_status'])
+def _check_rental_status(library, ctx):
+    return None, lambda i: library.check_rental_status(ctx.card())
+
+
+@case('add_book', ['add_book'])
+def _add_book(library, ctx):
+    return None, lambda i: library.add_book(f'Suite Book {i}', 'Suite Author', 2020, 'Fiction', isbn13(900000000 + i), 2)
+
+
+@case('search_books', ['search_books'])
+def _search_books(library, ctx):
+    words = ['shadow river', 'wolf', 'garden night', 'empire', 'glass storm house', 'Adams', 'myst']
+    return None, lambda i: library.search_books(words[i % len(words)], 20)
+
+
+@case('fuzzy_search_books', ['fuzzy_search_books'])
+def _fuzzy_search_books(library, ctx):
+    words = ['shadwo rivr', 'wolff', 'gardne night', 'empyre', 'Adamz', 'Kazlauskis', 'Mountian Wolf']
+    return None, lambda i: library.fuzzy_search_books(words[i % len(words)], 20)
+
+
+@case('return_available_books', ['return_available_books'])
+def _return_available_books(library, ctx):
+    return None, lambda i: library.return_available_books(ctx.popular_isbn() if i % 5 else isbn13(800000000 + i))
+
+
+@case('book_exists', ['book_exists'])
+def _book_exists(library, ctx):
+    return None, lambda i: library.book_exists(ctx.popular_isbn() if i % 5 else isbn13(800000000 + i))
+
+
+@case('rent_book', ['rent_book'])
+def _rent_book(library, ctx):
+    def prepare(i):
+        ctx.pending = ctx.any_isbn()
+
+    def run(i):
+        if library.rent_book(ctx.patron, ctx.pending, None, 1):
+            ctx.rented.append((ctx.patron, ctx.pending))
+    return prepare, run
+
+
+@case('return_book', ['return_book'])
+def _return_book(library, ctx):
+    def prepare(i):
+        if not ctx.rented:
+            isbn = ctx.any_isbn()
+            library.add_book('Suite Book', 'Suite Author', 2020, 'Fiction', isbn, 1)
+            library.rent_book(ctx.patron, isbn, None, 1)
+            ctx.rented.append((ctx.patron, isbn))
+        ctx.pending = ctx.rented.pop()
+    return prepare, lambda i: library.return_book(*ctx.pending)
+
+
+@case('transaction (rent + return)', ['transaction'])
+def _transaction(library, ctx):
+    def run(i):
+        isbn = ctx.any_isbn()
+        with library.transaction():
+            library.add_book('Suite Book', 'Suite Author', 2020, 'Fiction', isbn, 1)
+            library.rent_book(ctx.patron, isbn, None, 1)
+            library.return_book(ctx.patron, isbn, 1)
+    return None, run
+
+
+@case('bulk_return (100 items)', ['bulk_return'], repeat=10)
+def _bulk_return(library, ctx):
+    def prepare(i):
+        ctx.items = []
+        with library.transaction():
+            for _ in range(100):
+                isbn = ctx.any_isbn()
+                library.add_book('Suite Book', 'Suite Author', 2020, 'Fiction', isbn, 1)
+                library.rent_book(ctx.patron, isbn, None, 1)
+                ctx.items.append((ctx.patron, isbn, 1))
+    return prepare, lambda i: library.bulk_return(ctx.items)
+
+
+@case('checkout (5-item cart)', ['checkout'], repeat=20)
+def _checkout(library, ctx):
+    def prepare(i):
+        ctx.cart = [(ctx.popular_isbn(), 1) for _ in range(5)]
+
+    def run(i):
+        for result in library.checkout(ctx.patron, ctx.cart):
+            if result['status'] == 'rented':
+                ctx.rented.append((ctx.patron, result['isbn']))
+    return prepare, run
+
+
+@case('place_hold', ['place_hold'], repeat=20)
+def _place_hold(library, ctx):
+    return None, lambda i: library.place_hold(ctx.card(), ctx.popular_isbn())
+
+
+@case('list_holds', ['list_holds'])
+def _list_holds(library, ctx):
+    return None, lambda i: library.list_holds(ctx.card())
+
+
+@case('cancel_hold', ['cancel_hold'], repeat=20)
+def _cancel_hold(library, ctx):
+    def prepare(i):
+        ctx.hold = (ctx.card(), ctx.popular_isbn())
+        library.place_hold(*ctx.hold)
+    return prepare, lambda i: library.cancel_hold(*ctx.hold)
+
+
+@case('expire_holds', ['expire_holds'], repeat=5)
+def _expire_holds(library, ctx):
+    return None, lambda i: library.expire_holds()
+
+
+@case('list_available_books (first page)', ['list_available_books'])
+def _list_available_books(library, ctx):
+    return None, lambda i: library.list_available_books(more=lambda: False)
+
+
+@case('list_overdue_books (first page)', ['list_overdue_books'])
+def _list_overdue_books(library, ctx):
+    return None, lambda i: library.list_overdue_books(more=lambda: False)
+
+
+@case('list_all_rented_books (first page)', ['list_all_rented_books'])
+def _list_all_rented_books(library, ctx):
+    return None, lambda i: library.list_all_rented_books(more=lambda: False)
+
+
+@case('list_rented_books', ['list_rented_books'])
+def _list_rented_books(library, ctx):
+    return None, lambda i: library.list_rented_books(ctx.card())
+
+
+@case('list_rental_history', ['list_rental_history'])
+def _list_rental_history(library, ctx):
+    return None, lambda i: library.list_rental_history(ctx.card(), more=lambda: False)
+
+
+@case('list_due_soon_books (first page)', ['list_due_soon_books'])
+def _list_due_soon_books(library, ctx):
+    return None, lambda i: library.list_due_soon_books(more=lambda: False)
+
+
+@case('list_total_overdue_books', ['list_total_overdue_books'], repeat=5)
+def _list_total_overdue_books(library, ctx):
+    return None, lambda i: library.list_total_overdue_books()
+
+
+@case('export_available_books (csv)', ['export_available_books'], repeat=3)
+def _export_available_books(library, ctx):
+    return None, lambda i: library.export_available_books(io.StringIO(), 'csv')
+
+
+@case('export_overdue_books (jsonl)', ['export_overdue_books'], repeat=3)
+def _export_overdue_books(library, ctx):
+    return None, lambda i: library.export_overdue_books(io.StringIO(), 'jsonl')
+
+
+@case('export_rented_books (csv)', ['export_rented_books'], repeat=3)
+def _export_rented_books(library, ctx):
+    return None, lambda i: library.export_rented_books(io.StringIO(), 'csv')
+
+
+@case('export_rented_by_user (jsonl)', ['export_rented_by_user'])
+def _export_rented_by_user(library, ctx):
+    return None, lambda i: library.export_rented_by_user(ctx.card(), io.StringIO(), 'jsonl')
+
+
+@case('top_books_by_genre_library', ['top_books_by_genre_library'])
+def _top_books_by_genre_library(library, ctx):
+    return None, lambda i: library.top_books_by_genre_library()
+
+
+@case('top_books_by_genre_rented', ['top_books_by_genre_rented'])
+def _top_books_by_genre_rented(library, ctx):
+    return None, lambda i: library.top_books_by_genre_rented()
+
+
+@case('import_catalog (1000 rows)', ['import_catalog'], repeat=3)
+def _import_catalog(library, ctx):
+    def prepare(i):
+        with open(ctx.catalog, 'w', encoding='utf-8') as f:
+            f.write('title,author,year,genre,isbn,count\n')
+            for row in range(1000):
+                f.write(f'Imported {i}-{row},Suite Author,2021,History,IMPORT-{i}-{row},1\n')
+    return prepare, lambda i: library.import_catalog(ctx.catalog)
+
+
+@case('weed_books (dry run by genre)', ['weed_books'], repeat=3)
+def _weed_books(library, ctx):
+    return None, lambda i: library.weed_books(genre='Poetry', dry_run=True)
+
+
+@case('delete_book_by_isbn (one copy)', ['delete_book_by_isbn'])
+def _delete_book_by_isbn(library, ctx):
+    return None, lambda i: library.delete_book_by_isbn(ctx.any_isbn(), 1)
+
+
+@case('delete_book_by_year', ['delete_book_by_year'], repeat=3)
+def _delete_book_by_year(library, ctx):
+    return None, lambda i: library.delete_book_by_year(1900 - i)  # Older than any generated book
+
+
+@case('archive_rentals (one year)', ['archive_rentals'], repeat=1)
+def _archive_rentals(library, ctx):
+    return None, lambda i: library.archive_rentals(365)  # Moves the generated history once
+
+
+@case('export_snapshot', ['export_snapshot'], repeat=3)
+def _export_snapshot(library, ctx):
+    return None, lambda i: library.export_snapshot(ctx.snapshot)
+
+
+@case('circulation_report (from snapshot)', ['circulation_report'], repeat=3)
+def _circulation_report(library, ctx):
+    return None, lambda i: library.circulation_report(ctx.snapshot)
+
+
+@case('rebuild_genre_stats', ['rebuild_genre_stats'], repeat=3)
+def _rebuild_genre_stats(library, ctx):
+    return None, lambda i: library.rebuild_genre_stats()
+
+
+@case('verify_genre_stats', ['verify_genre_stats'], repeat=3)
+def _verify_genre_stats(library, ctx):
+    return None, lambda i: library.verify_genre_stats()
+
+
+@case('availability_cache_stats', ['availability_cache_stats'])
+def _availability_cache_stats(library, ctx):
+    return None, lambda i: library.availability_cache_stats()
+
+
+@case('insert_sample_data (populated tables)', ['insert_sample_data'])
+def _insert_sample_data(library, ctx):
+    return None, lambda i: library.insert_sample_data()
+
+
+@case('create_tables (up to date)', ['create_tables'])
+def _create_tables(library, ctx):
+    return None, lambda i: library.create_tables()
+
+
+def summarize(times):
+    # Timing summary in milliseconds for a list of durations in seconds
+    times = sorted(times)
+    return {
+        'runs': len(times),
+        'min_ms': times[0] * 1000,
+        'median_ms': statistics.median(times) * 1000,
+        'mean_ms': statistics.fmean(times) * 1000,
+        'p95_ms': times[min(int(len(times) * 0.95), len(times) - 1)] * 1000,
+        'ops_per_sec': len(times) / sum(times) if sum(times) else 0.0,
+    }
+
+
+def public_methods():
+    # Every public member of Library
+    return {name for name in vars(Library) if not name.startswith('_')} - SKIPPED
+
+
+def git_commit():
+    # The checked-out commit, or None outside a git work tree
+    try:
+        result = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(path, counts, repeat, seed, only=None):
+    # Time every case against the database at path; returns {case name: summary}
+    results = {}
+    library = Library(path)
+    scratch = tempfile.mkdtemp()
+    try:
+        ctx = Context(library, counts, seed, scratch)
+        for spec in CASES:
+            if only and not any(word in spec['name'] for word in only):
+                continue
+            prepare, run = spec['build'](library, ctx)
+            times = []
+            for i in range(spec['repeat'] or repeat):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    if prepare:
+                        prepare(i)
+                    started = time.perf_counter()
+                    run(i)
+                    times.append(time.perf_counter() - started)
+            results[spec['name']] = summarize(times)
+            print(f"{spec['name']:<40} median {results[spec['name']]['median_ms']:9.3f} ms", file=sys.stderr)
+    finally:
+        library.close()
+        shutil.rmtree(scratch, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline):
+    # Print the median change of every case against a baseline results file
+    print(f"\n{'case':<40} {'baseline ms':>12} {'now ms':>12} {'change':>8}")
+    for name, summary in results.items():
+        before = baseline.get('results', {}).get(name)
+        if before is None:
+            print(f"{name:<40} {'-':>12} {summary['median_ms']:12.3f} {'new':>8}")
+            continue
+        change = (summary['median_ms'] - before['median_ms']) / before['median_ms'] if before['median_ms'] else 0.0
+        print(f"{name:<40} {before['median_ms']:12.3f} {summary['median_ms']:12.3f} {change:+8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every Library operation on a synthetic database")
+    parser.add_argument('--books', type=int, default=10000, help="Books in the generated database (default: 10000)")
+    parser.add_argument('--users', type=int, help="Users (default: one per ten books)")
+    parser.add_argument('--rentals', type=int, help="Rental history rows (default: two per book)")
+    parser.add_argument('--seed', type=int, default=42, help="Seed for the data and the operations (default: 42)")
+    parser.add_argument('--repeat', type=int, default=200, help="Timed calls per fast operation (default: 200)")
+    parser.add_argument('--data', help="Keep the generated database here and reuse it on later runs")
+    parser.add_argument('--only', nargs='*', help="Run only the cases whose name contains one of these words")
+    parser.add_argument('--output', default='benchmark-results.json', help="Results file (default: benchmark-results.json)")
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp()
+    try:
+        source = args.data or os.path.join(scratch, 'source.db')
+        counts = {'books': args.books, 'users': args.users if args.users is not None else max(args.books // 10, 10),
+                  'rentals': args.rentals if args.rentals is not None else args.books * 2}
+        if not os.path.exists(source):
+            print(f"Generating {counts['books']} books ...", file=sys.stderr)
+            generate(source, args.books, args.users, args.rentals, args.seed)
+        working = os.path.join(scratch, 'working.db')
+        shutil.copyfile(source, working)  # The cases write, the generated database stays untouched
+        results = run_suite(working, counts, args.repeat, args.seed, args.only)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    missing = sorted(public_methods() - {method for spec in CASES for method in spec['covers']})
+    report = {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'machine': platform.machine(),
+            'data': dict(counts, seed=args.seed),
+            'repeat': args.repeat,
+        },
+        'results': results,
+        'not_covered': missing,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} result(s) to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(results, json.load(f))
+    for name in missing:
+        print(f"FAIL: Library.{name} has no benchmark")
+    return 1 if missing else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
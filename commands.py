@@ -0,0 +1,264 @@
+import contextlib  # Import contextlib to send the Library's console messages to standard error
+import json  # Import json to read replay files and write results
+import sys  # Import sys for standard error
+import time  # Import time to measure replay throughput
+from itertools import islice  # Import islice to read a replay file in batches
+
+from library import BOOK_HEADERS, BOOK_MATCH_HEADERS, HOLD_HEADERS, RENTAL_HEADERS, USER_RENTAL_HEADERS  # Import the column names used in the results
+from models import Book, Hold, Rental, RentalArchive, User  # Import the model classes used by the read operations
+
+# Non-interactive operations for the command line ('main.py rent CARD ISBN', ...) and for
+# 'main.py replay FILE'. Each operation takes the Library and keyword parameters and returns a
+# JSON-ready dict; the Library's own console messages go to standard error so standard output
+# carries only results. A replay file holds one operation per line, e.g.
+#
+#   {"op": "rent", "card": "CARD12345", "isbn": "9780306406157", "quantity": 1}
+#   {"op": "return", "card": "CARD12345", "isbn": "0-306-40615-2"}
+#
+# with the same parameter names as the command line options (dashes become underscores).
+
+OPERATIONS = {}  # Operation name -> {'run': function, 'help': text, 'arguments': {parameter: argparse options}}
+
+
+def operation(name, help, **arguments):
+    # Register function as an operation. arguments maps each parameter to its argparse options;
+    # parameters with a 'default' become --options, the others positional arguments.
+    def register(function):
+        OPERATIONS[name] = {'run': function, 'help': help, 'arguments': arguments}
+        return function
+    return register
+
+
+def positive_int(value):
+    # argparse type and replay check for quantities and copy counts: a whole number of at least 1.
+    # Raises ValueError otherwise, which argparse reports as an invalid value and replay as a failed line.
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        number = 0
+    if number < 1:
+        raise ValueError(f"{value!r} is not a whole number of at least 1")
+    return number
+
+
+def cart_item(text):
+    # argparse type for checkout items written as ISBN or ISBN:QUANTITY
+    isbn, _, quantity = text.partition(':')
+    return [isbn, positive_int(quantity) if quantity else 1]
+
+
+def _rows(headers, rows):
+    return [dict(zip(headers, row)) for row in rows]
+
+
+@operation('register', "Register a patron and print the new library card number", full_name={})
+def register(library, full_name):
+    return {'card': library.register_user(full_name)}
+
+
+@operation('add-librarian', "Add a librarian account", username={}, password={}, fullname={})
+def add_librarian(library, username, password, fullname):
+    library.add_librarian(username, password, fullname)
+    return {'username': username}
+
+
+@operation('add-book', "Add copies of a book, creating it when the ISBN is new",
+           title={}, author={}, year={'type': int}, genre={}, isbn={}, count={'type': positive_int, 'default': 1})
+def add_book(library, title, author, year, genre, isbn, count=1):
+    count = positive_int(count)  # Replay lines skip argparse
+    added = library.add_book(title, author, year, genre, isbn, count)
+    return {'isbn': isbn, 'added': added, 'available': library.return_available_books(isbn)}
+
+
+@operation('delete-book', "Remove copies of a book, or the whole book without --count",
+           isbn={}, count={'type': int, 'default': None})
+def delete_book(library, isbn, count=None):
+    library.delete_book_by_isbn(isbn, count)
+    return {'isbn': isbn, 'available': library.return_available_books(isbn)}
+
+
+@operation('rent', "Rent copies of a book to a patron", card={}, isbn={},
+           quantity={'type': positive_int, 'default': 1}, return_date={'default': None})
+def rent(library, card, isbn, quantity=1, return_date=None):
+    quantity = positive_int(quantity)  # Replay lines skip argparse
+    return {'card': card, 'isbn': isbn, 'rented': library.rent_book(card, isbn, return_date, quantity)}
+
+
+@operation('checkout', "Rent several books to a patron in one transaction", card={},
+           items={'type': cart_item, 'nargs': '+', 'metavar': 'ISBN[:QUANTITY]'},
+           return_date={'default': None}, all_or_nothing={'action': 'store_true', 'default': False})
+def checkout(library, card, items, return_date=None, all_or_nothing=False):
+    items = [(isbn, positive_int(quantity)) for isbn, quantity in items]  # Replay lines skip argparse
+    return {'card': card, 'items': library.checkout(card, items, return_date, all_or_nothing)}
+
+
+@operation('return', "Return rented copies of a book, all of them without --quantity", card={}, isbn={},
+           quantity={'type': positive_int, 'default': None})
+def return_book(library, card, isbn, quantity=None):
+    if quantity is not None:
+        quantity = positive_int(quantity)  # Replay lines skip argparse
+    return {'card': card, 'isbn': isbn, 'returned': library.return_book(card, isbn, quantity)}
+
+
+@operation('hold', "Queue a patron for a book; prints 'ready' when a copy was set aside at once", card={}, isbn={},
+           priority={'type': int, 'default': 0})
+def hold(library, card, isbn, priority=0):
+    return {'card': card, 'isbn': isbn, 'hold': library.place_hold(card, isbn, priority)}
+
+
+@operation('cancel-hold', "Cancel a patron's hold on a book", card={}, isbn={})
+def cancel_hold(library, card, isbn):
+    return {'card': card, 'isbn': isbn, 'cancelled': library.cancel_hold(card, isbn)}
+
+
+@operation('holds', "A patron's open holds and their place in the queue", card={})
+def holds(library, card):
+    with library.db.reader() as conn:
+        user = User.get_by_library_card(conn, card)
+        if user is None:
+            raise LookupError("User not found")
+        return {'card': card, 'holds': _rows(HOLD_HEADERS, Hold.list_by_user(conn, user.user_id))}
+
+
+@operation('expire-holds', "Expire the holds not picked up in time and pass their copies on")
+def expire_holds(library):
+    return {'expired': library.expire_holds()}
+
+
+@operation('status', "Whether a patron exists and has overdue books", card={})
+def status(library, card):
+    with library.db.reader() as conn:
+        borrowing = User.get_borrowing_status(conn, card)
+    return {'card': card, 'found': borrowing is not None, 'overdue': bool(borrowing and borrowing[1])}
+
+
+@operation('availability', "Copies of a book on the shelf", isbn={})
+def availability(library, isbn):
+    return {'isbn': isbn, 'available': library.return_available_books(isbn)}
+
+
+@operation('search', "Search books by title, author or genre", term={}, limit={'type': int, 'default': 50})
+def search(library, term, limit=50):
+    with library.db.reader() as conn:
+        return {'books': _rows(BOOK_HEADERS, Book.search(conn, term, limit))}
+
+
+@operation('fuzzy-search', "Search titles and authors allowing for typos, most similar first", term={}, limit={'type': int, 'default': 20})
+def fuzzy_search(library, term, limit=20):
+    with library.db.reader() as conn:
+        return {'books': _rows(BOOK_MATCH_HEADERS, Book.search_fuzzy(conn, term, limit))}
+
+
+@operation('overdue', "One page of overdue rentals; pass next_after back as --after for the next",
+           after={'type': int, 'default': 0}, limit={'type': int, 'default': 500})
+def overdue(library, after=0, limit=500):
+    with library.db.reader() as conn:
+        rows, next_after = Rental.page_overdue(conn, after, max(1, limit))
+        total = Rental.total_overdue(conn)[0] or 0
+    return {'rentals': _rows(RENTAL_HEADERS, rows), 'next_after': next_after, 'total_overdue': total}
+
+
+@operation('due-soon', "One page of the open rentals due from today through the next --days days",
+           days={'type': int, 'default': 3}, after={'type': int, 'default': 0}, limit={'type': int, 'default': 500})
+def due_soon(library, days=3, after=0, limit=500):
+    with library.db.reader() as conn:
+        rows, next_after = Rental.page_due_soon(conn, days, after, max(1, limit))
+    return {'rentals': _rows(RENTAL_HEADERS, rows), 'next_after': next_after}
+
+
+@operation('rented', "One page of the books a patron has rented", card={},
+           after={'type': int, 'default': 0}, limit={'type': int, 'default': 500})
+def rented(library, card, after=0, limit=500):
+    with library.db.reader() as conn:
+        user = User.get_by_library_card(conn, card)
+        if user is None:
+            raise LookupError("User not found")
+        rows, next_after = Rental.page_rented_by_user(conn, user.user_id, after, max(1, limit))
+    return {'card': card, 'books': _rows(USER_RENTAL_HEADERS, rows), 'next_after': next_after}
+
+
+@operation('history', "One page of every rental a patron ever made, archived ones included", card={},
+           after={'type': int, 'default': 0}, limit={'type': int, 'default': 500})
+def history(library, card, after=0, limit=500):
+    with library.db.reader() as conn:
+        user = User.get_by_library_card(conn, card)
+        if user is None:
+            raise LookupError("User not found")
+        rows, next_after = RentalArchive.page_history_by_user(conn, user.user_id, after, max(1, limit))
+    return {'card': card, 'books': _rows(USER_RENTAL_HEADERS, rows), 'next_after': next_after}
+
+
+@operation('top-charts', "Genres ranked by books in the catalog and by rentals")
+def top_charts(library):
+    with library.db.reader() as conn:
+        library_chart = Book.top_books_by_genre(conn)
+        rented_chart = Rental.top_books_by_genre(conn)
+    return {
+        'library': [{'genre': genre, 'total_books': total} for genre, total in library_chart],
+        'rented': [{'genre': genre, 'total_rented': total} for genre, total in rented_chart],
+    }
+
+
+def add_parsers(subparsers):
+    # Add one argparse subcommand per operation
+    for name, spec in OPERATIONS.items():
+        parser = subparsers.add_parser(name, help=spec['help'])
+        parser.set_defaults(operation=name)
+        for parameter, options in spec['arguments'].items():
+            if 'default' in options:
+                parser.add_argument('--' + parameter.replace('_', '-'), dest=parameter, **options)
+            else:
+                parser.add_argument(parameter, **options)
+
+
+def call(library, name, params):
+    # Run one operation and return its result; raises for an unknown operation or bad parameters
+    spec = OPERATIONS.get(name)
+    if spec is None:
+        raise LookupError(f"Unknown operation {name!r}")
+    with contextlib.redirect_stdout(sys.stderr):
+        return spec['run'](library, **params)
+
+
+def run(library, name, params):
+    # Run one operation; returns {'op', 'ok', 'result'} or {'op', 'ok', 'error'}
+    try:
+        return {'op': name, 'ok': True, 'result': call(library, name, params)}
+    except (TypeError, ValueError, LookupError) as error:
+        return {'op': name, 'ok': False, 'error': str(error)}
+
+
+def replay(library, lines, batch_size=500, out=None):
+    # Run the JSONL operations in lines, batch_size operations per transaction. Each operation runs
+    # in its own savepoint, so one that fails leaves the rest of its batch in place. Writes one JSON
+    # result line per operation to out, when given, and returns a summary.
+    operations = failed = 0
+    started = time.perf_counter()
+    numbered = enumerate(lines, 1)
+    while True:
+        batch = list(islice(numbered, batch_size))
+        if not batch:
+            break
+        with library.transaction(immediate=True):
+            for line_number, line in batch:
+                if not line.strip():
+                    continue
+                operations += 1
+                try:
+                    params = json.loads(line)
+                    name = params.pop('op')
+                except (ValueError, KeyError, AttributeError):
+                    outcome = {'op': None, 'ok': False, 'error': "Not a JSON object with an 'op'"}
+                else:
+                    try:
+                        with library.transaction():
+                            outcome = {'op': name, 'ok': True, 'result': call(library, name, params)}
+                    except Exception as error:  # The savepoint has been rolled back
+                        outcome = {'op': name, 'ok': False, 'error': f"{type(error).__name__}: {error}"}
+                if not outcome['ok']:
+                    failed += 1
+                if out is not None:
+                    out.write(json.dumps(dict(outcome, line=line_number)) + '\n')
+    elapsed = time.perf_counter() - started
+    return {'operations': operations, 'failed': failed, 'seconds': round(elapsed, 3),
+            'operations_per_sec': round(operations / elapsed, 1) if elapsed > 0 else 0.0}
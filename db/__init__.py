@@ -0,0 +1,5 @@
+from .migrations import migrate, current_version, rebuild_genre_stats, MIGRATIONS
+from .transaction import LibraryConnection, commit_if_standalone, run_immediate, is_busy
+from .connection import ConnectionManager
+from .cache import AvailabilityCache, BloomFilter, invalidate_availability
+from .tracing import QueryTracer, TracedCursor, LatencyHistogram
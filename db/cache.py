@@ -0,0 +1,163 @@
+import hashlib  # Import hashlib to derive the Bloom filter bit positions
+import math  # Import math to size the Bloom filter
+import threading  # Import threading to guard the cache shared by every connection
+from collections import OrderedDict  # Import OrderedDict to keep the cache in least recently used order
+
+
+class BloomFilter:
+    # Set of strings that can answer "definitely not in the set" without storing the strings.
+    # False positives happen at roughly false_positive_rate once capacity items are added;
+    # false negatives never happen.
+
+    def __init__(self, capacity, false_positive_rate=0.01):
+        self.capacity = max(int(capacity), 1)
+        bits = -self.capacity * math.log(false_positive_rate) / (math.log(2) ** 2)
+        self.size = max(int(bits), 64)  # Number of bits
+        self.hashes = max(int(round(self.size / self.capacity * math.log(2))), 1)  # Bit positions per item
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0  # Items added, duplicates included
+
+    def _positions(self, key):
+        # Double hashing: position i is h1 + i * h2, from one 128-bit digest
+        digest = hashlib.blake2b(str(key).encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        # Add a key to the set
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        # False means the key was never added
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class AvailabilityCache:
+    # Read-through cache of the (BookID, Count) row that an ISBN resolves to, shared by all the
+    # connections of one ConnectionManager, keyed by Book.ISBNKey (see utils/isbn.py).
+    # Holds the last committed state only:
+    #   - an LRU dict of ISBN key -> (BookID, Count) or None, at most size entries;
+    #   - a Bloom filter of every ISBN key in the catalog, so an unknown ISBN is answered without a query.
+    # Model writes call invalidate_availability() for the ISBN keys they touch; the connection drops those
+    # entries again when the transaction commits or rolls back (see LibraryConnection). Commits made by
+    # any other connection, another process's included, are caught by sync(): PRAGMA data_version tells
+    # the looking-up connection that something was committed since it last looked, and then every entry
+    # is dropped and the keys of the books inserted since are added to the Bloom filter. Readers see the
+    # writer's commits this way too, so the entries only outlive a write when it came from that connection.
+
+    def __init__(self, size=1024, false_positive_rate=0.01):
+        self.size = size
+        self.false_positive_rate = false_positive_rate
+        self._entries = OrderedDict()
+        self._filter = None  # Built on first use from the ISBNs in the Book table
+        self._last_book_id = 0  # Highest BookID whose ISBN key is in the Bloom filter
+        self._generation = 0  # Bumped by every invalidation, so loads that raced with a write are not stored
+        self._lock = threading.Lock()
+        self.hits = 0  # Answered from the LRU entries
+        self.misses = 0  # Answered by the database
+        self.negative_hits = 0  # Answered by the Bloom filter: the ISBN does not exist
+
+    def sync(self, conn, load_isbns_after):
+        # Drop every entry when a connection other than conn committed since conn last called sync.
+        # load_isbns_after(book_id) returns (highest BookID, ISBNs of the books after book_id), the books
+        # inserted since the Bloom filter was filled, whose ISBNs it must not report as unknown.
+        version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if version == conn.data_version:
+            return
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            bloom, after = self._filter, self._last_book_id
+        if bloom is not None:
+            last_book_id, isbns = load_isbns_after(after)
+            with self._lock:
+                if bloom is self._filter:
+                    for isbn in isbns:
+                        bloom.add(isbn)
+                    self._last_book_id = max(self._last_book_id, last_book_id)
+                    if bloom.count > bloom.capacity:
+                        self._filter = None  # Too full to stay accurate, rebuilt bigger on next use
+        conn.data_version = version
+
+    def get(self, isbn, load, load_isbns):
+        # Return load(isbn) through the cache. load_isbns() returns (highest BookID, every ISBN in the
+        # catalog) and is called when the Bloom filter has to be (re)built.
+        with self._lock:
+            if isbn in self._entries:
+                self._entries.move_to_end(isbn)
+                self.hits += 1
+                return self._entries[isbn]
+            if self._filter is not None and isbn not in self._filter:
+                self.negative_hits += 1
+                return None
+            generation = self._generation
+            build_filter = self._filter is None
+        if build_filter:
+            self._build_filter(load_isbns, generation)
+        value = load(isbn)
+        with self._lock:
+            self.misses += 1
+            if generation == self._generation:
+                self._entries[isbn] = value
+                self._entries.move_to_end(isbn)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        return value
+
+    def _build_filter(self, load_isbns, generation):
+        # Fill a new Bloom filter with the catalog's ISBNs. Discarded if a write was committed while
+        # reading them, since the read may have missed a new ISBN.
+        last_book_id, isbns = load_isbns()
+        bloom = BloomFilter(max(len(isbns) * 2, 1024), self.false_positive_rate)
+        for isbn in isbns:
+            bloom.add(isbn)
+        with self._lock:
+            if generation == self._generation:
+                self._filter = bloom
+                self._last_book_id = last_book_id
+
+    def invalidate(self, isbns):
+        # Forget the cached rows of these ISBNs and record them as (possibly) existing
+        with self._lock:
+            self._generation += 1
+            for isbn in isbns:
+                self._entries.pop(isbn, None)
+                if self._filter is not None:
+                    self._filter.add(isbn)
+            if self._filter is not None and self._filter.count > self._filter.capacity:
+                self._filter = None  # Too full to stay accurate, rebuilt bigger on next use
+
+    def clear(self):
+        # Forget everything, e.g. after the Book table was changed outside the models
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._filter = None
+            self._last_book_id = 0
+
+    def stats(self):
+        # Counters as a dict
+        with self._lock:
+            lookups = self.hits + self.misses + self.negative_hits
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'negative_hits': self.negative_hits,
+                'hit_rate': (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'filter_isbns': self._filter.count if self._filter is not None else 0,
+            }
+
+
+def invalidate_availability(conn, isbns):
+    # Called by model writes that change Book rows of these ISBNs. Drops them from the cache now and,
+    # through the connection, again when the transaction ends, so a reader cannot re-cache the old value
+    # between the write and its commit.
+    cache = getattr(conn, 'availability_cache', None)
+    if cache is not None:
+        isbns = set(isbns)
+        cache.invalidate(isbns)
+        conn.pending_invalidations.update(isbns)
@@ -0,0 +1,90 @@
+import sqlite3  # Import the sqlite3 module to interact with SQLite databases
+import threading  # Import threading for the writer lock and per-thread readers
+from contextlib import contextmanager  # Import contextmanager to build the connection context managers
+
+from .transaction import LibraryConnection  # Import the connection class that supports units of work
+from .cache import AvailabilityCache  # Import the availability cache shared by the connections
+
+
+class ConnectionManager:
+    # Hands out SQLite connections for one database file: a single writer connection shared by
+    # all threads behind a lock, and one read-only connection per thread. In WAL mode readers
+    # see the last committed state and are never blocked by the writer.
+    #
+    # Options (all optional):
+    #   journal_mode  'WAL' (default) or any other SQLite journal mode
+    #   synchronous   'NORMAL' (default, safe with WAL), 'FULL', 'OFF'
+    #   cache_size    page cache per connection, negative = KiB (default -16000, about 16 MB)
+    #   mmap_size     bytes of the file to memory-map (default 256 MB, 0 disables)
+    #   busy_timeout  milliseconds to wait for a lock held by another process (default 5000)
+    #   availability_cache_size  ISBNs kept in the availability cache (default 1024, 0 disables it;
+    #                            commits by other processes are detected with PRAGMA data_version)
+    #   tracer        db.tracing.QueryTracer timing every statement (default None, no tracing)
+
+    def __init__(self, db_name, journal_mode='WAL', synchronous='NORMAL', cache_size=-16000,
+                 mmap_size=268435456, busy_timeout=5000, availability_cache_size=1024, tracer=None):
+        self.db_name = db_name
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.busy_timeout = busy_timeout
+        self.tracer = tracer
+        self.availability_cache = AvailabilityCache(availability_cache_size) if availability_cache_size else None
+        self._write_lock = threading.RLock()  # Only one thread writes at a time
+        self._local = threading.local()  # Per-thread reader connection and writer nesting depth
+        self._readers = []  # Every reader handed out, so close() can close them
+        self._readers_lock = threading.Lock()
+        self.writer_connection = self._connect()
+        mode = self.writer_connection.execute(f'PRAGMA journal_mode={journal_mode}').fetchone()[0]
+        # An in-memory database is private to its connection, so readers would see nothing
+        self.shared = db_name == ':memory:' or db_name == '' or mode.lower() != 'wal'
+
+    def _connect(self):
+        # Open a connection with the configured pragmas; the lock above makes sharing it across threads safe
+        conn = sqlite3.connect(self.db_name, factory=LibraryConnection, check_same_thread=False,
+                               timeout=self.busy_timeout / 1000)
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        conn.execute(f'PRAGMA cache_size={int(self.cache_size)}')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout)}')
+        conn.availability_cache = self.availability_cache
+        if self.tracer is not None:
+            self.tracer.attach(conn)
+        return conn
+
+    @contextmanager
+    def writer(self):
+        # Exclusive use of the writer connection for the calling thread
+        with self._write_lock:
+            self._local.writing = getattr(self._local, 'writing', 0) + 1
+            try:
+                yield self.writer_connection
+            finally:
+                self._local.writing -= 1
+
+    @contextmanager
+    def reader(self):
+        # A connection for reads. A thread that is in the middle of a write gets the writer,
+        # so it sees its own uncommitted changes.
+        if self.shared or getattr(self._local, 'writing', 0):
+            with self.writer() as conn:
+                yield conn
+            return
+        conn = getattr(self._local, 'reader', None)
+        if conn is None:
+            conn = self._connect()
+            conn.execute('PRAGMA query_only=1')  # Readers must never write behind the writer's back
+            self._local.reader = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        yield conn
+
+    def close(self):
+        # Close the writer and every reader connection
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        with self._write_lock:
+            self.writer_connection.close()
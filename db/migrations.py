@@ -0,0 +1,495 @@
+import sqlite3  # Import the sqlite3 module to interact with SQLite databases
+
+from utils.isbn import canonical_isbn  # Import canonical_isbn to rewrite the stored ISBNs in one form
+
+ISBN13_GLOB = '97[89]' + '[0-9]' * 10  # A canonical ISBN: thirteen digits starting 978 or 979
+
+# Every schema change is an ordered, numbered step. A step must be idempotent
+# (IF NOT EXISTS etc.) so that databases created before versioning existed can
+# be brought up to date without failing on objects they already have.
+
+
+def _create_base_tables(cursor):
+    # Step 1: the original four tables created by Library.create_tables
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS User (
+            UserID INTEGER PRIMARY KEY AUTOINCREMENT,
+            LibraryCardNumber TEXT UNIQUE NOT NULL,
+            FullName TEXT NOT NULL,
+            ValidUntil DATE NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Librarian (
+            LibrarianID INTEGER PRIMARY KEY AUTOINCREMENT,
+            Username TEXT UNIQUE NOT NULL,
+            Password TEXT NOT NULL,
+            FullName TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Book (
+            BookID INTEGER PRIMARY KEY AUTOINCREMENT,
+            Title TEXT,
+            Author TEXT,
+            Year INTEGER,
+            Genre TEXT,
+            ISBN TEXT NOT NULL,
+            Count INTEGER DEFAULT 1
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS Rental (
+            RentalID INTEGER PRIMARY KEY AUTOINCREMENT,
+            UserID INTEGER NOT NULL,
+            BookID INTEGER NOT NULL,
+            RentalDate DATE NOT NULL DEFAULT (date('now')),
+            ReturnDate DATE NOT NULL,
+            Returned BOOLEAN DEFAULT 0,
+            Quantity INTEGER NOT NULL DEFAULT 1,
+            FOREIGN KEY (UserID) REFERENCES User (UserID),
+            FOREIGN KEY (BookID) REFERENCES Book (BookID)
+        )
+    ''')
+
+
+def _create_lookup_indexes(cursor):
+    # Step 2: indexes for the lookups issued by the models.
+    # Librarian.Username is already covered by the index behind its UNIQUE constraint.
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_book_isbn ON Book (ISBN)')  # Book.save, Rental.save, delete_by_isbn
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_book_year ON Book (Year)')  # delete_by_year
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_book_genre ON Book (Genre, Count)')  # top_books_by_genre
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_rental_user ON Rental (UserID, Returned, ReturnDate)
+    ''')  # Open rentals of one user: return_books, list_rented_by_user, overdue checks
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_rental_book ON Rental (BookID)')  # Rentals of one book
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_rental_due ON Rental (Returned, ReturnDate)
+    ''')  # list_overdue, total_overdue, list_all_rented_books
+
+
+def _create_search_index(cursor):
+    # Step 3: FTS5 index over Book title, author and genre, kept in sync by triggers.
+    # SQLite builds without FTS5 skip this step and Book.search falls back to LIKE.
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS BookSearch USING fts5(
+                Title, Author, Genre,
+                content='Book', content_rowid='BookID'
+            )
+        ''')
+    except sqlite3.OperationalError:
+        return  # No FTS5 module in this SQLite build
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_book_search_insert AFTER INSERT ON Book BEGIN
+            INSERT INTO BookSearch (rowid, Title, Author, Genre)
+            VALUES (new.BookID, new.Title, new.Author, new.Genre);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_book_search_delete AFTER DELETE ON Book BEGIN
+            INSERT INTO BookSearch (BookSearch, rowid, Title, Author, Genre)
+            VALUES ('delete', old.BookID, old.Title, old.Author, old.Genre);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_book_search_update AFTER UPDATE OF Title, Author, Genre ON Book BEGIN
+            INSERT INTO BookSearch (BookSearch, rowid, Title, Author, Genre)
+            VALUES ('delete', old.BookID, old.Title, old.Author, old.Genre);
+            INSERT INTO BookSearch (rowid, Title, Author, Genre)
+            VALUES (new.BookID, new.Title, new.Author, new.Genre);
+        END
+    ''')
+    cursor.execute("INSERT INTO BookSearch (BookSearch) VALUES ('rebuild')")  # Index the books that already exist
+
+
+def _create_genre_stats(cursor):
+    # Step 4: GenreStats summary behind the top charts, maintained by triggers on Book and Rental.
+    # BookRows/RentalRows count the rows behind each total, so a genre with no rows left drops out
+    # of the charts exactly like it does from a GROUP BY over the base tables.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS GenreStats (
+            Genre TEXT,
+            BookRows INTEGER NOT NULL DEFAULT 0,
+            TotalBooks INTEGER NOT NULL DEFAULT 0,
+            RentalRows INTEGER NOT NULL DEFAULT 0,
+            TotalRented INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_genre_stats_genre ON GenreStats (Genre)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_genre_stats_books ON GenreStats (TotalBooks)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_genre_stats_rented ON GenreStats (TotalRented)')
+
+    # "Genre IS x" instead of "=" so books without a genre are counted under NULL, like GROUP BY does
+    ensure_genre = '''
+            INSERT INTO GenreStats (Genre) SELECT {genre}
+            WHERE NOT EXISTS (SELECT 1 FROM GenreStats WHERE Genre IS {genre});'''
+    book_genre = '(SELECT Genre FROM Book WHERE BookID = {book_id})'
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_genre_stats_book_insert AFTER INSERT ON Book BEGIN
+            {ensure_genre.format(genre='new.Genre')}
+            UPDATE GenreStats SET BookRows = BookRows + 1, TotalBooks = TotalBooks + IFNULL(new.Count, 0)
+            WHERE Genre IS new.Genre;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_genre_stats_book_count AFTER UPDATE OF Count ON Book
+        WHEN old.Genre IS new.Genre BEGIN
+            UPDATE GenreStats SET TotalBooks = TotalBooks + IFNULL(new.Count, 0) - IFNULL(old.Count, 0)
+            WHERE Genre IS new.Genre;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_genre_stats_book_genre AFTER UPDATE OF Genre ON Book
+        WHEN old.Genre IS NOT new.Genre BEGIN
+            UPDATE GenreStats SET
+                BookRows = BookRows - 1,
+                TotalBooks = TotalBooks - IFNULL(old.Count, 0),
+                RentalRows = RentalRows - (SELECT COUNT(*) FROM Rental WHERE BookID = old.BookID),
+                TotalRented = TotalRented - (SELECT TOTAL(Quantity) FROM Rental WHERE BookID = old.BookID)
+            WHERE Genre IS old.Genre;
+            {ensure_genre.format(genre='new.Genre')}
+            UPDATE GenreStats SET
+                BookRows = BookRows + 1,
+                TotalBooks = TotalBooks + IFNULL(new.Count, 0),
+                RentalRows = RentalRows + (SELECT COUNT(*) FROM Rental WHERE BookID = new.BookID),
+                TotalRented = TotalRented + (SELECT TOTAL(Quantity) FROM Rental WHERE BookID = new.BookID)
+            WHERE Genre IS new.Genre;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_genre_stats_book_delete AFTER DELETE ON Book BEGIN
+            UPDATE GenreStats SET
+                BookRows = BookRows - 1,
+                TotalBooks = TotalBooks - IFNULL(old.Count, 0),
+                RentalRows = RentalRows - (SELECT COUNT(*) FROM Rental WHERE BookID = old.BookID),
+                TotalRented = TotalRented - (SELECT TOTAL(Quantity) FROM Rental WHERE BookID = old.BookID)
+            WHERE Genre IS old.Genre;
+        END
+    ''')  # Rentals of a deleted book no longer join to a genre
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_genre_stats_rental_insert AFTER INSERT ON Rental
+        WHEN EXISTS (SELECT 1 FROM Book WHERE BookID = new.BookID) BEGIN
+            {ensure_genre.format(genre=book_genre.format(book_id='new.BookID'))}
+            UPDATE GenreStats SET RentalRows = RentalRows + 1, TotalRented = TotalRented + new.Quantity
+            WHERE Genre IS {book_genre.format(book_id='new.BookID')};
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_genre_stats_rental_update AFTER UPDATE OF Quantity, BookID ON Rental BEGIN
+            UPDATE GenreStats SET RentalRows = RentalRows - 1, TotalRented = TotalRented - old.Quantity
+            WHERE Genre IS {book_genre.format(book_id='old.BookID')}
+              AND EXISTS (SELECT 1 FROM Book WHERE BookID = old.BookID);
+            UPDATE GenreStats SET RentalRows = RentalRows + 1, TotalRented = TotalRented + new.Quantity
+            WHERE Genre IS {book_genre.format(book_id='new.BookID')}
+              AND EXISTS (SELECT 1 FROM Book WHERE BookID = new.BookID);
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_genre_stats_rental_delete AFTER DELETE ON Rental BEGIN
+            UPDATE GenreStats SET RentalRows = RentalRows - 1, TotalRented = TotalRented - old.Quantity
+            WHERE Genre IS {book_genre.format(book_id='old.BookID')}
+              AND EXISTS (SELECT 1 FROM Book WHERE BookID = old.BookID);
+        END
+    ''')
+    rebuild_genre_stats(cursor)  # Fill the summary from the rows that already exist
+
+
+def _store_dates_as_day_numbers(cursor):
+    # Step 5: Rental and User dates become INTEGER day numbers (days since 1970-01-01, see
+    # utils.utils.to_day), so due-date windows are integer range scans. RentalDate, ReturnDate and
+    # ValidUntil stay readable as generated ISO text columns for listings and older readers;
+    # writers set RentalDay, ReturnDay and ValidUntilDay. SQLite cannot change a column's type in
+    # place, so both tables are rebuilt and their indexes and triggers recreated.
+    day = "unixepoch({column}) / 86400"
+    text = "date({column} * 86400, 'unixepoch')"
+    columns = {row[1] for row in cursor.execute('PRAGMA table_info(Rental)').fetchall()}
+    if 'ReturnDay' in columns:
+        return  # Already rebuilt
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_genre_stats_%'")
+    for (name,) in cursor.fetchall():
+        cursor.execute(f'DROP TRIGGER "{name}"')  # Recreated below; some of them read Rental
+
+    cursor.execute(f'''
+        CREATE TABLE Rental_new (
+            RentalID INTEGER PRIMARY KEY AUTOINCREMENT,
+            UserID INTEGER NOT NULL,
+            BookID INTEGER NOT NULL,
+            RentalDay INTEGER NOT NULL DEFAULT ({day.format(column="'now'")}),
+            ReturnDay INTEGER NOT NULL,
+            Returned BOOLEAN DEFAULT 0,
+            Quantity INTEGER NOT NULL DEFAULT 1,
+            RentalDate TEXT GENERATED ALWAYS AS ({text.format(column='RentalDay')}) VIRTUAL,
+            ReturnDate TEXT GENERATED ALWAYS AS ({text.format(column='ReturnDay')}) VIRTUAL,
+            FOREIGN KEY (UserID) REFERENCES User (UserID),
+            FOREIGN KEY (BookID) REFERENCES Book (BookID)
+        )
+    ''')
+    cursor.execute(f'''
+        INSERT INTO Rental_new (RentalID, UserID, BookID, RentalDay, ReturnDay, Returned, Quantity)
+        SELECT RentalID, UserID, BookID, {day.format(column='RentalDate')}, {day.format(column='ReturnDate')}, Returned, Quantity
+        FROM Rental
+    ''')
+    cursor.execute('DROP TABLE Rental')
+    cursor.execute('ALTER TABLE Rental_new RENAME TO Rental')
+
+    cursor.execute(f'''
+        CREATE TABLE User_new (
+            UserID INTEGER PRIMARY KEY AUTOINCREMENT,
+            LibraryCardNumber TEXT UNIQUE NOT NULL,
+            FullName TEXT NOT NULL,
+            ValidUntilDay INTEGER NOT NULL,
+            ValidUntil TEXT GENERATED ALWAYS AS ({text.format(column='ValidUntilDay')}) VIRTUAL
+        )
+    ''')
+    cursor.execute(f'''
+        INSERT INTO User_new (UserID, LibraryCardNumber, FullName, ValidUntilDay)
+        SELECT UserID, LibraryCardNumber, FullName, {day.format(column='ValidUntil')} FROM User
+    ''')
+    cursor.execute('DROP TABLE User')
+    cursor.execute('ALTER TABLE User_new RENAME TO User')
+
+    cursor.execute('CREATE INDEX idx_rental_user ON Rental (UserID, Returned, ReturnDay)')  # A user's open rentals, due first
+    cursor.execute('CREATE INDEX idx_rental_book ON Rental (BookID)')
+    cursor.execute('CREATE INDEX idx_rental_due ON Rental (Returned, ReturnDay)')  # Overdue and due-soon windows are ranges of it
+    _create_genre_stats(cursor)  # Recreate the triggers and refill the summary
+
+
+def _create_rental_archive(cursor):
+    # Step 6: RentalArchive holds closed rentals moved out of Rental (see models/rental_archive.py), so
+    # the open-loan queries walk only rows that can still change. It keeps just what history needs:
+    # an archived rental is always returned with nothing left on loan. RentalHistory reads both
+    # tables in Rental's columns. Archived rentals keep their RentalID; Rental's AUTOINCREMENT
+    # never hands a moved ID out again.
+    text = "date({column} * 86400, 'unixepoch')"
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS RentalArchive (
+            RentalID INTEGER PRIMARY KEY,
+            UserID INTEGER NOT NULL,
+            BookID INTEGER NOT NULL,
+            RentalDay INTEGER NOT NULL,
+            ReturnDay INTEGER NOT NULL,
+            RentalDate TEXT GENERATED ALWAYS AS ({text.format(column='RentalDay')}) VIRTUAL,
+            ReturnDate TEXT GENERATED ALWAYS AS ({text.format(column='ReturnDay')}) VIRTUAL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_rental_archive_user ON RentalArchive (UserID)')  # A user's history in RentalID order
+    cursor.execute('''
+        CREATE VIEW IF NOT EXISTS RentalHistory AS
+        SELECT RentalID, UserID, BookID, RentalDay, ReturnDay, RentalDate, ReturnDate, Returned, Quantity FROM Rental
+        UNION ALL
+        SELECT RentalID, UserID, BookID, RentalDay, ReturnDay, RentalDate, ReturnDate, 1, 0 FROM RentalArchive
+    ''')
+
+
+def _create_holds(cursor):
+    # Step 7: Hold queue (see models/hold.py). A hold is 'waiting' until a copy is set aside for it,
+    # then 'ready' until ExpiresDay, and ends 'fulfilled', 'expired' or 'cancelled'. idx_hold_queue
+    # lists a book's waiting holds in allocation order, so the next one is a single index seek.
+    text = "date({column} * 86400, 'unixepoch')"
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS Hold (
+            HoldID INTEGER PRIMARY KEY AUTOINCREMENT,
+            UserID INTEGER NOT NULL,
+            BookID INTEGER NOT NULL,
+            Priority INTEGER NOT NULL DEFAULT 0,
+            Status TEXT NOT NULL DEFAULT 'waiting',
+            PlacedDay INTEGER NOT NULL DEFAULT (unixepoch('now') / 86400),
+            ExpiresDay INTEGER,
+            PlacedDate TEXT GENERATED ALWAYS AS ({text.format(column='PlacedDay')}) VIRTUAL,
+            ExpiresDate TEXT GENERATED ALWAYS AS ({text.format(column='ExpiresDay')}) VIRTUAL,
+            FOREIGN KEY (UserID) REFERENCES User (UserID),
+            FOREIGN KEY (BookID) REFERENCES Book (BookID)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_hold_queue ON Hold (BookID, Status, Priority DESC, HoldID)')  # Highest priority first, then oldest
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_hold_active ON Hold (UserID, BookID) WHERE Status IN ('waiting', 'ready')
+    ''')  # One open hold per patron and book; also finds a patron's holds
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_hold_expiry ON Hold (Status, ExpiresDay)')  # Ready holds past their pickup day
+
+
+def _create_trigram_index(cursor):
+    # Step 8: FTS5 trigram index over Book title and author for the typo-tolerant search
+    # (Book.search_fuzzy), kept in sync by triggers like BookSearch. Only single trigrams are ever
+    # queried, so detail='none' leaves out the positions. BookTrigramTerms exposes how many books
+    # contain each trigram. SQLite builds without FTS5 or its trigram tokenizer skip this step.
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS BookTrigram USING fts5(
+                Title, Author,
+                content='Book', content_rowid='BookID', tokenize='trigram', detail='none'
+            )
+        ''')
+    except sqlite3.OperationalError:
+        return  # No FTS5 module or no trigram tokenizer (SQLite before 3.34)
+    cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS BookTrigramTerms USING fts5vocab(BookTrigram, 'row')")
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_book_trigram_insert AFTER INSERT ON Book BEGIN
+            INSERT INTO BookTrigram (rowid, Title, Author) VALUES (new.BookID, new.Title, new.Author);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_book_trigram_delete AFTER DELETE ON Book BEGIN
+            INSERT INTO BookTrigram (BookTrigram, rowid, Title, Author) VALUES ('delete', old.BookID, old.Title, old.Author);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_book_trigram_update AFTER UPDATE OF Title, Author ON Book BEGIN
+            INSERT INTO BookTrigram (BookTrigram, rowid, Title, Author) VALUES ('delete', old.BookID, old.Title, old.Author);
+            INSERT INTO BookTrigram (rowid, Title, Author) VALUES (new.BookID, new.Title, new.Author);
+        END
+    ''')
+    cursor.execute("INSERT INTO BookTrigram (BookTrigram) VALUES ('rebuild')")  # Index the books that already exist
+
+
+def _merge_editions(cursor):
+    # Step 9: one Book row per edition. Valid ISBNs are rewritten in their canonical 13-digit form (see
+    # utils/isbn.py) and the rows of one edition are merged into the oldest: their copies are added up
+    # and their rentals, archived rentals and holds now point to it. ISBNKey is the canonical ISBN as an
+    # integer, or for an ISBN that is not valid, such as the old sample data's 'ISBN001', its trimmed
+    # text (see utils.isbn.lookup_key); rows with the same legacy text are merged the same way. ISBNKey
+    # gets a UNIQUE index, so every ISBN lookup is one probe.
+    columns = {row[1] for row in cursor.execute('PRAGMA table_xinfo(Book)').fetchall()}
+    if 'ISBNKey' in columns:
+        return  # Already merged
+    cursor.execute('SELECT BookID, ISBN FROM Book')
+    rewrites = [(canonical_isbn(isbn), isbn, book_id) for book_id, isbn in cursor.fetchall()]
+    cursor.executemany('UPDATE Book SET ISBN = ? WHERE BookID = ?',
+                       [(canonical, book_id) for canonical, isbn, book_id in rewrites if canonical and canonical != isbn])
+
+    _merge_books(cursor, 'ISBN', f"ISBN GLOB '{ISBN13_GLOB}'")
+
+    cursor.execute(f'''
+        ALTER TABLE Book ADD COLUMN ISBNKey
+        GENERATED ALWAYS AS (CASE WHEN ISBN GLOB '{ISBN13_GLOB}' THEN CAST(ISBN AS INTEGER) ELSE TRIM(ISBN) END) VIRTUAL
+    ''')  # Untyped, so a legacy ISBN stays text even when it is all digits and never equals an integer key
+    _merge_books(cursor, 'ISBNKey', f"ISBN NOT GLOB '{ISBN13_GLOB}'")
+    cursor.execute('DROP INDEX IF EXISTS idx_book_isbn')
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_book_isbn_key ON Book (ISBNKey)')  # Every ISBN lookup, and the upsert in Book.save
+
+
+def _merge_books(cursor, key, where):
+    # Merge the Book rows matching the where condition that have the same key expression into the
+    # oldest of them: copies are added up, rentals, archived rentals and holds move to it.
+    cursor.execute('CREATE TEMP TABLE BookMerge (BookID INTEGER PRIMARY KEY, KeepID INTEGER NOT NULL)')
+    cursor.execute(f'''
+        INSERT INTO BookMerge (BookID, KeepID)
+        SELECT BookID, KeepID FROM (
+            SELECT BookID, MIN(BookID) OVER (PARTITION BY {key}) AS KeepID FROM Book WHERE {where}
+        )
+        WHERE BookID != KeepID
+    ''')  # The rows merged away and the row each one merges into
+    # A patron may hold several rows of one edition; only the oldest open hold stays open. Copies set
+    # aside for the others go back on the shelf.
+    cursor.execute('''
+        SELECT Hold.HoldID, Hold.UserID, IFNULL(BookMerge.KeepID, Hold.BookID), Hold.BookID, Hold.Status
+        FROM Hold LEFT JOIN BookMerge ON BookMerge.BookID = Hold.BookID
+        WHERE Hold.Status IN ('waiting', 'ready')
+        ORDER BY Hold.HoldID
+    ''')
+    open_holds = set()
+    for hold_id, user_id, keep_id, book_id, status in cursor.fetchall():
+        if (user_id, keep_id) not in open_holds:
+            open_holds.add((user_id, keep_id))
+            continue
+        cursor.execute("UPDATE Hold SET Status = 'cancelled' WHERE HoldID = ?", (hold_id,))
+        if status == 'ready':
+            cursor.execute('UPDATE Book SET Count = Count + 1 WHERE BookID = ?', (book_id,))
+    for table in ('Rental', 'RentalArchive', 'Hold'):
+        cursor.execute(f'''
+            UPDATE {table} SET BookID = BookMerge.KeepID FROM BookMerge WHERE {table}.BookID = BookMerge.BookID
+        ''')  # The genre statistics triggers move the rented totals along
+    cursor.execute('''
+        UPDATE Book SET Count = Book.Count + Merged.Count
+        FROM (
+            SELECT BookMerge.KeepID, TOTAL(Book.Count) AS Count FROM BookMerge JOIN Book ON Book.BookID = BookMerge.BookID
+            GROUP BY BookMerge.KeepID
+        ) AS Merged
+        WHERE Book.BookID = Merged.KeepID
+    ''')
+    cursor.execute('DELETE FROM Book WHERE BookID IN (SELECT BookID FROM BookMerge)')
+    cursor.execute('DROP TABLE BookMerge')
+
+
+def rebuild_genre_stats(cursor):
+    # Recompute GenreStats from scratch with full aggregations over Book and Rental
+    cursor.execute('DELETE FROM GenreStats')
+    cursor.execute('''
+        INSERT INTO GenreStats (Genre, BookRows, TotalBooks)
+        SELECT Genre, COUNT(*), TOTAL(Count) FROM Book GROUP BY Genre
+    ''')
+    cursor.execute('''
+        UPDATE GenreStats SET RentalRows = Totals.RentalRows, TotalRented = Totals.TotalRented
+        FROM (
+            SELECT b.Genre, COUNT(*) AS RentalRows, TOTAL(r.Quantity) AS TotalRented
+            FROM Rental r JOIN Book b ON r.BookID = b.BookID
+            GROUP BY b.Genre
+        ) AS Totals
+        WHERE GenreStats.Genre IS Totals.Genre
+    ''')
+
+
+# Ordered list of (version, description, step). Append new steps at the end, never renumber.
+MIGRATIONS = [
+    (1, 'base tables', _create_base_tables),
+    (2, 'lookup indexes', _create_lookup_indexes),
+    (3, 'book search index', _create_search_index),
+    (4, 'genre statistics', _create_genre_stats),
+    (5, 'integer day-number dates', _store_dates_as_day_numbers),
+    (6, 'rental archive', _create_rental_archive),
+    (7, 'hold queue', _create_holds),
+    (8, 'book trigram index', _create_trigram_index),
+    (9, 'canonical ISBNs, one row per edition', _merge_editions),
+]
+
+
+def current_version(conn):
+    # Return the newest applied schema version, 0 for a database that was never migrated
+    cursor = conn.cursor()
+    try:
+        cursor.execute('SELECT MAX(version) FROM schema_version')
+    except sqlite3.OperationalError:
+        return 0  # The schema_version table does not exist yet
+    version = cursor.fetchone()[0]
+    return version or 0
+
+
+def migrate(conn):
+    # Apply every migration step newer than the stored version, each in its own transaction.
+    # The version is mirrored in PRAGMA user_version, which lives in the file header, so an
+    # up-to-date database is recognised without touching any table or running any DDL.
+    cursor = conn.cursor()
+    latest = MIGRATIONS[-1][0]
+    if cursor.execute('PRAGMA user_version').fetchone()[0] == latest:
+        return latest
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL DEFAULT (datetime('now'))
+        )
+    ''')
+    applied = current_version(conn)
+    for version, name, step in MIGRATIONS:
+        if version <= applied:
+            continue  # Already applied
+        if conn.in_transaction:
+            conn.commit()  # Make sure the step starts its own transaction
+        cursor.execute('BEGIN')
+        try:
+            step(cursor)
+            cursor.execute('''
+                INSERT INTO schema_version (version, name) VALUES (?, ?)
+            ''', (version, name))
+            cursor.execute(f'PRAGMA user_version = {int(version)}')
+            conn.commit()  # The step and its version row become durable together
+        except Exception:
+            conn.rollback()  # Leave the database at the last fully applied version
+            raise
+        applied = version
+    if cursor.execute('PRAGMA user_version').fetchone()[0] != applied:
+        cursor.execute(f'PRAGMA user_version = {int(applied)}')  # Databases migrated before user_version was kept
+        if conn.in_transaction:
+            conn.commit()
+    return applied
@@ -0,0 +1,242 @@
+import bisect  # Import bisect to find a latency's histogram bucket
+import os  # Import os to recognise frames that belong to the models package
+import sqlite3  # Import the sqlite3 module for the traced cursor
+import sys  # Import sys to walk the caller's stack and write the report
+import sysconfig  # Import sysconfig to recognise standard library frames
+import threading  # Import threading to guard the statistics shared by all connections
+import time  # Import time to measure statements and methods
+from functools import wraps  # Import wraps to keep the names of instrumented methods
+
+# Opt-in query instrumentation. A QueryTracer handed to ConnectionManager (or Library) makes every
+# connection create TracedCursor cursors and count SQLite VM work with a progress handler:
+#
+#   - each statement is timed from execute() to its last fetch and grouped by the model method
+#     that issued it (Book.search, Rental.save, ...) and its SQL;
+#   - Library methods are timed as a whole when the tracer instruments a Library;
+#   - statements slower than slow_ms are appended, with their EXPLAIN QUERY PLAN, to slow_log.
+#
+# Nothing here runs unless a tracer is passed in.
+
+BUCKETS_MS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]  # Histogram upper bounds
+PROGRESS_STEP = 1000  # SQLite VM instructions between progress handler calls
+MODELS_DIR = os.sep + 'models' + os.sep  # Frames from files in this directory name the issuing model method
+SKIPPED_DIRS = (os.path.dirname(os.path.abspath(__file__)), sysconfig.get_paths()['stdlib'])  # Frames from this package and the standard library are skipped
+
+
+class LatencyHistogram:
+    # Count, total, maximum and bucketed distribution of a series of latencies in milliseconds
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)  # The last bucket holds everything above BUCKETS_MS[-1]
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the given fraction of the samples (the maximum for the last bucket)
+        wanted = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= wanted and count:
+                return min(BUCKETS_MS[index], self.max_ms) if index < len(BUCKETS_MS) else self.max_ms
+        return 0.0
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'total_ms': self.total_ms,
+            'mean_ms': self.total_ms / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'max_ms': self.max_ms,
+            'buckets': {(f'<={bound}' if index < len(BUCKETS_MS) else f'>{BUCKETS_MS[-1]}'): count
+                        for index, (bound, count) in enumerate(zip(BUCKETS_MS + [None], self.counts)) if count},
+        }
+
+
+def _caller():
+    # Qualified name of the model method (or, failing that, the first function outside db/ and the
+    # standard library) on the stack
+    frame = sys._getframe(3)
+    fallback = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if MODELS_DIR in filename:
+            return frame.f_code.co_qualname
+        if fallback is None and not filename.startswith(SKIPPED_DIRS):
+            fallback = frame.f_code.co_qualname
+        frame = frame.f_back
+    return fallback or '?'
+
+
+class TracedCursor(sqlite3.Cursor):
+    # Cursor that reports each statement, including the time spent fetching its rows, to the
+    # connection's tracer. A statement is reported when the cursor moves on to the next statement,
+    # runs out of rows, or is closed or garbage collected.
+
+    _pending = None  # [caller, sql, parameters, seconds, vm ticks at start] of the open statement
+
+    def _start(self, sql, parameters):
+        self._finish()
+        self._pending = [_caller(), sql, parameters, 0.0, self.connection.progress_ticks]
+
+    def _timed(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            if self._pending is not None:
+                self._pending[3] += time.perf_counter() - started
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            caller, sql, parameters, seconds, ticks = pending
+            steps = (self.connection.progress_ticks - ticks) * PROGRESS_STEP
+            self.connection.tracer.record_statement(self.connection, caller, sql, parameters, seconds, steps)
+
+    def execute(self, sql, parameters=()):
+        self._start(sql, parameters)
+        self._timed(super().execute, sql, parameters)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        self._start(sql, seq_of_parameters[0] if seq_of_parameters else ())
+        self._timed(super().executemany, sql, seq_of_parameters)
+        self._finish()  # executemany returns no rows
+        return self
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, size if size is not None else self.arraysize)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass  # The connection may already be closed during interpreter shutdown
+
+
+class QueryTracer:
+    # Shared statistics for every traced connection and instrumented Library.
+    # slow_ms: statements at or above this many milliseconds go to slow_log (a path, or None for no log).
+
+    def __init__(self, slow_ms=100.0, slow_log=None):
+        self.slow_ms = slow_ms
+        self.slow_log = slow_log
+        self.statements = {}  # (caller, normalized sql) -> [LatencyHistogram, VM steps]
+        self.methods = {}  # Library method name -> LatencyHistogram
+        self.slow_count = 0
+        self._lock = threading.Lock()
+
+    def attach(self, conn):
+        # Trace a LibraryConnection: traced cursors plus a progress handler counting VM work
+        conn.tracer = self
+        conn.set_progress_handler(conn.count_progress, PROGRESS_STEP)
+
+    def record_statement(self, conn, caller, sql, parameters, seconds, steps):
+        ms = seconds * 1000
+        key = (caller, ' '.join(sql.split()))
+        with self._lock:
+            entry = self.statements.get(key)
+            if entry is None:
+                entry = self.statements[key] = [LatencyHistogram(), 0]
+            entry[0].add(ms)
+            entry[1] += steps
+            slow = ms >= self.slow_ms
+            if slow:
+                self.slow_count += 1
+        if slow and self.slow_log:
+            self._log_slow(conn, caller, key[1], parameters, ms)
+
+    def _log_slow(self, conn, caller, sql, parameters, ms):
+        # Append the statement, its parameters and its query plan to the slow-query log
+        try:
+            plan_cursor = sqlite3.Cursor(conn)  # A plain cursor, so the EXPLAIN is not traced itself
+            plan_cursor.execute('EXPLAIN QUERY PLAN ' + sql, parameters)
+            depth = {0: -1}  # Plan rows are (id, parent id, unused, detail); the root has parent 0
+            plan = []
+            for node, parent, _, detail in plan_cursor.fetchall():
+                depth[node] = depth.get(parent, -1) + 1
+                plan.append('  ' + '  ' * depth[node] + detail)
+        except sqlite3.Error as error:
+            plan = [f'  (no plan: {error})']
+        entry = [f'-- {time.strftime("%Y-%m-%dT%H:%M:%S")} {ms:.1f} ms {caller} [{threading.current_thread().name}]',
+                 sql, f'-- parameters: {parameters!r}', '-- plan:', *(plan or ['  (none)']), '']
+        with self._lock:
+            with open(self.slow_log, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(entry) + '\n')
+
+    def record_method(self, name, seconds):
+        with self._lock:
+            self.methods.setdefault(name, LatencyHistogram()).add(seconds * 1000)
+
+    def instrument(self, library):
+        # Time every public method of a Library instance; context managers and properties are left alone
+        for name, attribute in vars(type(library)).items():
+            if name.startswith('_') or not callable(attribute) or hasattr(attribute, '__wrapped__'):
+                continue
+            setattr(library, name, self._timed_method(f'{type(library).__name__}.{name}', getattr(library, name)))
+
+    def _timed_method(self, name, method):
+        @wraps(method)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.record_method(name, time.perf_counter() - started)
+        return timed
+
+    def summary(self):
+        # The statistics as plain data
+        with self._lock:
+            return {
+                'methods': {name: histogram.as_dict() for name, histogram in self.methods.items()},
+                'statements': [dict(histogram.as_dict(), caller=caller, sql=sql, vm_steps=steps)
+                               for (caller, sql), (histogram, steps) in self.statements.items()],
+                'slow_statements': self.slow_count,
+            }
+
+    def report(self, out=None, top=15):
+        # Print the Library methods and the top statements by total time
+        out = out or sys.stderr
+        data = self.summary()
+        lines = ['', 'Library methods by total time:',
+                 f'  {"method":<40} {"calls":>7} {"total ms":>10} {"mean ms":>9} {"p95 ms":>8} {"max ms":>9}']
+        for name, stats in sorted(data['methods'].items(), key=lambda item: -item[1]['total_ms'])[:top]:
+            lines.append(f'  {name:<40} {stats["count"]:7d} {stats["total_ms"]:10.2f} {stats["mean_ms"]:9.3f} '
+                         f'{stats["p95_ms"]:8.2f} {stats["max_ms"]:9.2f}')
+        lines += ['', f'Statements by total time ({len(data["statements"])} distinct, '
+                      f'{data["slow_statements"]} at or over {self.slow_ms} ms):',
+                  f'  {"caller":<28} {"calls":>7} {"total ms":>10} {"mean ms":>9} {"p95 ms":>8} {"vm steps":>10}  sql']
+        for stats in sorted(data['statements'], key=lambda item: -item['total_ms'])[:top]:
+            sql = stats['sql'] if len(stats['sql']) <= 70 else stats['sql'][:67] + '...'
+            lines.append(f'  {stats["caller"]:<28} {stats["count"]:7d} {stats["total_ms"]:10.2f} {stats["mean_ms"]:9.3f} '
+                         f'{stats["p95_ms"]:8.2f} {stats["vm_steps"]:10d}  {sql}')
+        print('\n'.join(lines), file=out)
@@ -0,0 +1,124 @@
+import random  # Import random to spread out the retries of busy writers
+import sqlite3  # Import the sqlite3 module to interact with SQLite databases
+import time  # Import time to wait between retries
+from contextlib import contextmanager  # Import contextmanager to build the transaction context manager
+
+from .tracing import TracedCursor  # Import the cursor used while a connection is traced
+
+BUSY_RETRIES = 5  # Further attempts of an immediate transaction that found the database locked
+BUSY_BACKOFF = 0.01  # Seconds; the longest wait before retry n is BUSY_BACKOFF * 2 ** n
+
+
+class LibraryConnection(sqlite3.Connection):
+    # sqlite3 connection that knows whether a unit of work is open, so model methods can
+    # join it instead of committing on their own. Pass it as the factory to sqlite3.connect.
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.transaction_depth = 0  # 0 = no unit of work, 1 = outer transaction, >1 = nested savepoints
+        self.commit_count = 0  # Number of commits that actually ended a transaction
+        self.availability_cache = None  # Shared db.cache.AvailabilityCache, set by ConnectionManager
+        self.pending_invalidations = set()  # ISBNs written in the open transaction
+        self.data_version = None  # PRAGMA data_version at this connection's last AvailabilityCache.sync
+        self.tracer = None  # db.tracing.QueryTracer when the connection is traced
+        self.progress_ticks = 0  # Progress handler calls while traced, a measure of VM work
+
+    def cursor(self, factory=sqlite3.Cursor):
+        # Traced connections hand out cursors that time their statements
+        if self.tracer is not None and factory is sqlite3.Cursor:
+            factory = TracedCursor
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        # Connection.execute does not go through cursor(), so route it there while traced
+        if self.tracer is not None:
+            return self.cursor().execute(sql, parameters)
+        return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if self.tracer is not None:
+            return self.cursor().executemany(sql, seq_of_parameters)
+        return super().executemany(sql, seq_of_parameters)
+
+    def count_progress(self):
+        # Progress handler installed by QueryTracer.attach; returning 0 lets the statement continue
+        self.progress_ticks += 1
+        return 0
+
+    def commit(self):
+        # Commit and count it when there was something to commit
+        if self.in_transaction:
+            self.commit_count += 1
+        super().commit()
+        self._flush_invalidations()
+
+    def rollback(self):
+        # Roll back; cached availability read while the transaction was open may be stale either way
+        super().rollback()
+        self._flush_invalidations()
+
+    def _flush_invalidations(self):
+        # Drop the ISBNs written by the transaction that just ended from the availability cache
+        if self.pending_invalidations:
+            if self.availability_cache is not None:
+                self.availability_cache.invalidate(self.pending_invalidations)
+            self.pending_invalidations = set()
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        # Unit of work: the outermost block commits once on success and rolls back on error,
+        # nested blocks become savepoints that can fail without losing the outer work.
+        # immediate takes the write lock up front (BEGIN IMMEDIATE), so what the block reads cannot
+        # change before it writes; it only applies to an outermost block.
+        depth = self.transaction_depth
+        savepoint = f'uow_{depth}'
+        if depth == 0:
+            if not self.in_transaction:
+                self.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+        else:
+            self.execute(f'SAVEPOINT {savepoint}')
+        self.transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self.transaction_depth -= 1
+            if depth == 0:
+                self.rollback()  # Undo the whole unit of work
+            else:
+                self.execute(f'ROLLBACK TO {savepoint}')  # Undo only the nested block
+                self.execute(f'RELEASE {savepoint}')
+            raise
+        self.transaction_depth -= 1
+        if depth == 0:
+            self.commit()  # One durable write for everything inside the block
+        else:
+            self.execute(f'RELEASE {savepoint}')
+
+
+def is_busy(error):
+    # True for the "database is locked" errors another process's write lock causes
+    return getattr(error, 'sqlite_errorcode', None) == sqlite3.SQLITE_BUSY or 'database is locked' in str(error)
+
+
+def run_immediate(conn, work, retries=BUSY_RETRIES, backoff=BUSY_BACKOFF):
+    # Run work(conn) in an immediate transaction and return its result. When the write lock stays
+    # busy past the connection's busy timeout the whole transaction is retried, at most retries
+    # more times with jittered exponential backoff, before the error is raised. Inside an open unit
+    # of work work simply joins it: the outer transaction already decided how it locks.
+    if conn.transaction_depth or conn.in_transaction:
+        with conn.transaction():
+            return work(conn)
+    for attempt in range(retries + 1):
+        try:
+            with conn.transaction(immediate=True):
+                return work(conn)
+        except sqlite3.OperationalError as error:
+            if attempt == retries or not is_busy(error):
+                raise
+        time.sleep(backoff * 2 ** attempt * random.random())
+
+
+def commit_if_standalone(conn):
+    # Commit a model write unless it runs inside a unit of work, which commits once at its end
+    if getattr(conn, 'transaction_depth', 0) == 0:
+        conn.commit()
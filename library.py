@@ -1,226 +1,521 @@
-import sqlite3  # Imports the sqlite3 module to interact with SQLite databases
-from datetime import datetime  # Imports the datetime class from the datetime module
-from tabulate import tabulate  # Imports the tabulate function to format tables in the console
+import sys  # Imports the sys module to stream exports to standard output
+import time  # Imports the time module to measure import throughput
+from contextlib import contextmanager  # Imports contextmanager to build the transaction context manager
+from itertools import chain, islice  # Imports chain to flatten pages and islice to read a stream in chunks
 
-from utils.utils import add_one_month, add_one_year  # Imports utility functions from the utils module
-from models import Librarian, User, Book, Rental  # Imports model classes from the models module
+from utils.utils import add_one_month, add_one_year, to_day, today_day  # Imports utility functions from the utils module
+from utils.catalog import read_catalog  # Imports the streaming catalog file reader
+from utils.export import write_rows  # Imports the streaming CSV/JSONL writer
+from models import Librarian, User, Book, Rental, GenreStats, RentalArchive, Hold  # Imports model classes from the models module
+from db import migrate, commit_if_standalone, invalidate_availability, run_immediate, ConnectionManager  # Imports the migration runner, write helpers and connection manager from the db package
+
+def tabulate(*args, **kwargs):
+    # Format a table in the console. The tabulate package is imported on first use: it is slow to
+    # import and most command line runs never print a grid.
+    from tabulate import tabulate as render
+    return render(*args, **kwargs)
+
+BOOK_HEADERS = ["BookID", "Title", "Author", "Year", "Genre", "ISBN", "Count"]  # Columns of the book listings
+BOOK_MATCH_HEADERS = BOOK_HEADERS + ["Similarity"]  # Columns of the typo-tolerant search results
+RENTAL_HEADERS = ["RentalID", "LibraryCardNumber", "ISBN", "RentalDate", "ReturnDate", "Returned", "Quantity"]  # Columns of the rental listings
+HOLD_HEADERS = ["HoldID", "ISBN", "Title", "Status", "PlaceInQueue", "PlacedDate", "PickUpBy"]  # Columns of a user's holds
+USER_RENTAL_HEADERS = ["BookID", "Title", "Author", "Year", "Genre", "ISBN", "RentalDate", "ReturnDate", "Quantity", "Returned"]  # Columns of a user's rentals
 
 class Library:
-    def __init__(self, db_name='library.db'):
-        # Initialize the Library class, connecting to the SQLite database
-        self.conn = sqlite3.connect(db_name)
-        self.create_tables()  # Create the necessary tables if they don't exist
+    def __init__(self, db_name='library.db', **connection_options):
+        # Initialize the Library class, connecting to the SQLite database.
+        # connection_options are the options accepted by db.ConnectionManager (synchronous, cache_size, ...).
+        # With tracer=db.QueryTracer(...) every statement and every public method is timed.
+        self.db = ConnectionManager(db_name, **connection_options)
+        if self.db.tracer is not None:
+            self.db.tracer.instrument(self)
+        self.create_tables()  # Create or upgrade the tables to the latest schema version
+
+    @property
+    def conn(self):
+        # The writer connection, for callers that need the raw sqlite3 connection
+        return self.db.writer_connection
+
+    def close(self):
+        # Method to close every database connection held by the library
+        self.db.close()
 
     def create_tables(self):
-        # Method to create tables in the database
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS User (
-                UserID INTEGER PRIMARY KEY AUTOINCREMENT,
-                LibraryCardNumber TEXT UNIQUE NOT NULL,
-                FullName TEXT NOT NULL,
-                ValidUntil DATE NOT NULL
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Librarian (
-                LibrarianID INTEGER PRIMARY KEY AUTOINCREMENT,
-                Username TEXT UNIQUE NOT NULL,
-                Password TEXT NOT NULL,
-                FullName TEXT NOT NULL
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Book (
-                BookID INTEGER PRIMARY KEY AUTOINCREMENT,
-                Title TEXT,
-                Author TEXT,
-                Year INTEGER,
-                Genre TEXT,
-                ISBN TEXT NOT NULL,
-                Count INTEGER DEFAULT 1
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Rental (
-                RentalID INTEGER PRIMARY KEY AUTOINCREMENT,
-                UserID INTEGER NOT NULL,
-                BookID INTEGER NOT NULL,
-                RentalDate DATE NOT NULL DEFAULT (date('now')),
-                ReturnDate DATE NOT NULL,
-                Returned BOOLEAN DEFAULT 0,
-                Quantity INTEGER NOT NULL DEFAULT 1,
-                FOREIGN KEY (UserID) REFERENCES User (UserID),
-                FOREIGN KEY (BookID) REFERENCES Book (BookID)
-            )
-        ''')
-        self.conn.commit()  # Commit the changes to the database
+        # Method to create the tables and indexes by applying any pending schema migrations
+        with self.db.writer() as conn:
+            migrate(conn)
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        # Method to group several operations into one unit of work that commits once.
+        # Nested calls become savepoints, e.g.
+        #     with library.transaction():
+        #         library.add_book(...)
+        #         library.rent_book(...)
+        # immediate=True takes the write lock when the unit of work starts (see LibraryConnection.transaction).
+        with self.db.writer() as conn:
+            with conn.transaction(immediate):
+                yield conn
 
     def insert_sample_data(self):
-        # Method to insert sample data into the database for testing purposes
-        cursor = self.conn.cursor()
-
-        cursor.execute("SELECT COUNT(*) FROM Librarian")
-        if cursor.fetchone()[0] == 0:
-            cursor.execute('''
-                INSERT INTO Librarian (Username, Password, FullName) VALUES
-                ('admin1', 'password1', 'Librarian One'),
-                ('admin2', 'password2', 'Librarian Two')
-            ''')
-
-        cursor.execute("SELECT COUNT(*) FROM User")
-        if cursor.fetchone()[0] == 0:
-            cursor.execute('''
-                INSERT INTO User (LibraryCardNumber, FullName, ValidUntil) VALUES
-                ('CARD12345', 'User One', '2025-12-31'),
-                ('CARD67890', 'User Two', '2024-12-31')
-            ''')
-
-        cursor.execute("SELECT COUNT(*) FROM Book")
-        if cursor.fetchone()[0] == 0:
-            cursor.execute('''
-                INSERT INTO Book (Title, Author, Year, Genre, ISBN, Count) VALUES
-                ('Book One', 'Author One', 2001, 'Fiction', 'ISBN001', 5),
-                ('Book Two', 'Author Two', 2015, 'Non-Fiction', 'ISBN002', 2)
-            ''')
-
-        cursor.execute("SELECT COUNT(*) FROM Rental")
-        if cursor.fetchone()[0] == 0:
-            cursor.execute('''
-                INSERT INTO Rental (UserID, BookID, RentalDate, ReturnDate, Returned, Quantity) VALUES
-                (1, 1, '2024-01-01', '2024-02-01', 0, 1),
-                (2, 2, '2024-03-01', '2024-04-01', 0, 1)
-            ''')
-
-        self.conn.commit()  # Commit the changes to the database
+        # Method to insert sample data into the database for testing purposes; tables that already have rows are left alone
+        with self.db.writer() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM Librarian)")  # Stops at the first row instead of counting them all
+            if not cursor.fetchone()[0]:
+                cursor.execute('''
+                    INSERT INTO Librarian (Username, Password, FullName) VALUES
+                    ('admin1', 'password1', 'Librarian One'),
+                    ('admin2', 'password2', 'Librarian Two')
+                ''')
+
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM User)")
+            if not cursor.fetchone()[0]:
+                cursor.executemany('''
+                    INSERT INTO User (LibraryCardNumber, FullName, ValidUntilDay) VALUES (?, ?, ?)
+                ''', [('CARD12345', 'User One', to_day('2025-12-31')),
+                      ('CARD67890', 'User Two', to_day('2024-12-31'))])
+
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM Book)")
+            if not cursor.fetchone()[0]:
+                cursor.execute('''
+                    INSERT INTO Book (Title, Author, Year, Genre, ISBN, Count) VALUES
+                    ('Book One', 'Author One', 2001, 'Fiction', '9780306406157', 5),
+                    ('Book Two', 'Author Two', 2015, 'Non-Fiction', '9780140449136', 2)
+                ''')
+
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM Rental)")
+            if not cursor.fetchone()[0]:
+                cursor.executemany('''
+                    INSERT INTO Rental (UserID, BookID, RentalDay, ReturnDay, Returned, Quantity) VALUES (?, ?, ?, ?, 0, 1)
+                ''', [(1, 1, to_day('2024-01-01'), to_day('2024-02-01')),
+                      (2, 2, to_day('2024-03-01'), to_day('2024-04-01'))])
+
+            invalidate_availability(conn, [9780306406157, 9780140449136])  # Keep the availability cache current; it is keyed by ISBN key
+            commit_if_standalone(conn)  # Commit, unless called inside a unit of work
 
     def add_librarian(self, username, password, fullname):
         # Method to add a new librarian to the database
-        librarian = Librarian(username, password, fullname)
-        librarian.save(self.conn)
+        with self.db.writer() as conn:
+            librarian = Librarian(username, password, fullname)
+            librarian.save(conn)
 
     def authenticate_admin(self, username, password):
         # Method to authenticate an admin using username and password
-        return Librarian.authenticate(self.conn, username, password)
+        with self.db.reader() as conn:
+            return Librarian.authenticate(conn, username, password)
 
     def authenticate_user(self, library_card_number):
         # Method to authenticate a user using their library card number
-        return User.authenticate(self.conn, library_card_number)
+        with self.db.reader() as conn:
+            return User.authenticate(conn, library_card_number)
 
     def register_user(self, full_name):
         # Method to register a new user and return their library card number
-        user = User(full_name)
-        user.save(self.conn)
-        return user.library_card_number
+        with self.db.writer() as conn:
+            user = User.create(full_name)
+            user.save(conn)
+            return user.library_card_number
 
     def add_book(self, title, author, year, genre, isbn, count):
-        # Method to add a new book to the library
-        book = Book(title, author, year, genre, isbn, count)
-        book.save(self.conn)
+        # Method to add a new book to the library; new copies of a book patrons are queueing for go to their holds.
+        # Returns False when the ISBN is not valid.
+        with self.transaction() as conn:
+            book = Book(title, author, year, genre, isbn, count)
+            if not book.save(conn):
+                return False
+            Hold.allocate(conn, [Book.availability(conn, isbn)[0]])
+        return True
+
+    def import_catalog(self, path, chunk_size=10000):
+        # Method to bulk load books from a CSV or JSONL file, one transaction per chunk of rows
+        rows = read_catalog(path)
+        imported = rejected = 0
+        started = time.perf_counter()
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            books = [row for row in chunk if row is not None]
+            rejected += len(chunk) - len(books)
+            with self.transaction() as conn:
+                Book.bulk_save(conn, books)  # One commit per chunk instead of one per book
+            imported += len(books)
+        elapsed = time.perf_counter() - started
+        rate = imported / elapsed if elapsed > 0 else 0.0
+        print(f"Imported {imported} row(s), rejected {rejected}, in {elapsed:.2f}s ({rate:,.0f} rows/sec).")
+        return {'imported': imported, 'rejected': rejected, 'seconds': elapsed, 'rows_per_sec': rate}
 
     def delete_book_by_isbn(self, isbn, count_to_delete=None):
         # Method to delete a book by its ISBN and optionally a specific count
-        Book.delete_by_isbn(self.conn, isbn, count_to_delete)
+        with self.db.writer() as conn:
+            Book.delete_by_isbn(conn, isbn, count_to_delete)
 
     def delete_book_by_year(self, year):
         # Method to delete books published in or before a specific year
-        Book.delete_by_year(self.conn, year)
+        with self.db.writer() as conn:
+            Book.delete_by_year(conn, year)
 
-    def rent_book(self, library_card_number, isbn, return_date, quantity):
-        # Method to rent a book to a user
-        user = User.get_by_library_card(self.conn, library_card_number)
-        if user:
-            if not user.has_overdue_books(self.conn):
-                rental = Rental(user.user_id, isbn, return_date, quantity)
-                rental.save(self.conn)
-            else:
+    def weed_books(self, isbns=None, year=None, genre=None, dry_run=False, skip_on_loan=False):
+        # Method to deaccession books by ISBN list, year and/or genre in one transaction (see Book.weed)
+        with self.transaction() as conn:
+            report = Book.weed(conn, isbns, year, genre, dry_run, skip_on_loan)
+        action = "Would remove" if dry_run else "Removed"
+        print(f"{action} {report['copies_removed']} copies: {report['rows_deleted']} book row(s) deleted, "
+              f"{report['rows_updated']} reduced, {report['holds_cancelled']} hold(s) cancelled.")
+        for book in report['on_loan']:
+            print(f"Book {book['book_id']} (ISBN {book['isbn']}) has {book['copies_on_loan']} copies on loan and was kept.")
+        return report
+
+    def rent_book(self, library_card_number, isbn, return_date, quantity, check_overdue=True):
+        # Method to rent a book to a user. Callers that have just verified the patron with
+        # check_rental_status can pass check_overdue=False to skip the second check. Runs as an
+        # immediate transaction, retried a few times when another process holds the write lock.
+        if quantity is not None and quantity < 1:
+            print("Invalid quantity.")
+            return False
+
+        def rent(conn):
+            status = User.get_borrowing_status(conn, library_card_number)  # User lookup and overdue check in one query
+            if status:
+                user_id, has_overdue = status
+                if not (check_overdue and has_overdue):
+                    rental = Rental(user_id, isbn, return_date, quantity)
+                    return rental.save(conn)  # True when the rental was recorded
                 print("User has overdue books and cannot rent new books.")
-        else:
-            print("User not found.")
+            else:
+                print("User not found.")
+            return False
+
+        with self.db.writer() as conn:
+            return run_immediate(conn, rent)
 
     def check_rental_status(self, library_card_number):
         # Method to check if a user has any overdue rentals
-        return User.check_rental_status(self.conn, library_card_number)
+        with self.db.reader() as conn:
+            return User.check_rental_status(conn, library_card_number)
 
     def return_book(self, library_card_number, isbn, quantity=None):
-        # Method to return a rented book
-        user = User.get_by_library_card(self.conn, library_card_number)
-        if user:
-            Rental.return_books(self.conn, user.user_id, isbn, quantity)
-        else:
+        # Method to return a rented book, every copy the user has of it when quantity is None
+        if quantity is not None and quantity < 1:
+            print("Invalid quantity.")
+            return 0
+        with self.db.writer() as conn:
+            user = User.get_by_library_card(conn, library_card_number)
+            if user:
+                return Rental.return_books(conn, user.user_id, isbn, quantity)  # Number of books returned
             print("User not found.")
+            return 0
 
-    def list_available_books(self):
-        # Method to list all available books in the library
-        books = Book.list_all_available(self.conn)
-        if books:
-            headers = ["BookID", "Title", "Author", "Year", "Genre", "ISBN", "Count"]
-            print(tabulate(books, headers=headers, tablefmt='grid'))
+    def bulk_return(self, items, batch_size=1000):
+        # Method to return a stream of (library_card_number, isbn, quantity) items, e.g. an emptied
+        # book drop, with one transaction per batch. Returns the per-item result report.
+        items = iter(items)
+        report = []
+        started = time.perf_counter()
+        while True:
+            batch = list(islice(items, batch_size))
+            if not batch:
+                break
+            with self.transaction() as conn:
+                report.extend(Rental.bulk_return(conn, batch))
+        elapsed = time.perf_counter() - started
+        rate = len(report) / elapsed if elapsed > 0 else 0.0
+        returned = sum(1 for result in report if result['status'] == 'returned')
+        print(f"Processed {len(report)} return(s), {returned} fully returned, in {elapsed:.2f}s ({rate:,.0f} items/sec).")
+        return report
+
+    def archive_rentals(self, older_than_days=365, batch_size=5000, pause=0.0):
+        # Method to move returned rentals due more than older_than_days days ago into RentalArchive.
+        # Each batch is its own short immediate transaction, and the writer is released between
+        # batches (for pause seconds, if given), so desks keep renting while a large history moves.
+        # Returns a report with the rows moved per second.
+        before_day = today_day() - older_than_days
+        moved = batches = 0
+        started = time.perf_counter()
+        while True:
+            with self.db.writer() as conn:
+                count = run_immediate(conn, lambda conn: RentalArchive.archive_batch(conn, before_day, batch_size))
+            moved += count
+            batches += 1 if count else 0
+            if count < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+        elapsed = time.perf_counter() - started
+        rate = moved / elapsed if elapsed > 0 else 0.0
+        print(f"Archived {moved} rental(s) in {batches} batch(es), {elapsed:.2f}s ({rate:,.0f} rows/sec).")
+        return {'moved': moved, 'batches': batches, 'seconds': elapsed, 'rows_per_sec': rate}
+
+    def checkout(self, library_card_number, items, return_date=None, all_or_nothing=False):
+        # Method to rent a cart of (isbn, quantity) items to a patron in one immediate transaction. The patron
+        # is checked once for the whole cart; with all_or_nothing nothing is rented unless every item can be.
+        # Returns the per-item result report (see Rental.checkout).
+        items = list(items)
+
+        def rent(conn):
+            status = User.get_borrowing_status(conn, library_card_number)  # User lookup and overdue check in one query
+            if status is None or status[1]:
+                print("User not found." if status is None else "User has overdue books and cannot rent new books.")
+                reason = 'unknown card' if status is None else 'overdue books'
+                return [{'isbn': isbn, 'requested': quantity, 'rented': 0, 'status': reason} for isbn, quantity in items]
+            return Rental.checkout(conn, status[0], items, return_date, all_or_nothing)
+
+        with self.db.writer() as conn:
+            report = run_immediate(conn, rent)  # The write lock is held from the availability read to the commit
+        rented = sum(1 for result in report if result['status'] == 'rented')
+        print(f"Rented {rented} of {len(report)} item(s).")
+        for result in report:
+            if result['status'] != 'rented':
+                print(f"ISBN {result['isbn']}: {result['status']}.")
+        return report
+
+    def place_hold(self, library_card_number, isbn, priority=0):
+        # Method to queue a patron for a book; returns the hold status ('waiting' or 'ready') or None
+        with self.db.writer() as conn:
+            user = User.get_by_library_card(conn, library_card_number)
+            if not user:
+                print("User not found.")
+                return None
+            status = Hold.place(conn, user.user_id, isbn, priority)
+        if status == 'ready':
+            print("A copy has been set aside for you.")
+        elif status == 'waiting':
+            print("Hold placed. A copy will be set aside for you when one is returned.")
+        return status
+
+    def cancel_hold(self, library_card_number, isbn):
+        # Method to cancel a patron's hold on a book; returns True when a hold was cancelled
+        with self.db.writer() as conn:
+            user = User.get_by_library_card(conn, library_card_number)
+            if user:
+                return Hold.cancel(conn, user.user_id, isbn)
+            print("User not found.")
+            return False
+
+    def list_holds(self, library_card_number):
+        # Method to list a patron's open holds with their place in the queue
+        with self.db.reader() as conn:
+            user = User.get_by_library_card(conn, library_card_number)
+            holds = Hold.list_by_user(conn, user.user_id) if user else None
+        if holds is None:
+            print("User not found.")
+        elif holds:
+            print(tabulate(holds, headers=HOLD_HEADERS, tablefmt='grid'))
         else:
+            print("No holds found for this user.")
+        return holds
+
+    def expire_holds(self):
+        # Method to expire the holds that were not picked up in time and pass their copies on; returns the number expired
+        with self.db.writer() as conn:
+            expired = run_immediate(conn, Hold.expire)
+        print(f"Expired {expired} hold(s).")
+        return expired
+
+    def _pages(self, fetch_page, after_id=0):
+        # Generator yielding the pages of a keyset-paginated listing; fetch_page(conn, after_id) returns
+        # (rows, next_after_id). A reader connection is held only while a page is read.
+        while after_id is not None:
+            with self.db.reader() as conn:
+                rows, after_id = fetch_page(conn, after_id)
+            if rows:
+                yield rows
+
+    def _print_pages(self, pages, headers, more=None):
+        # Print every page as its own grid. more(), when given, is asked before each further page and
+        # stops the listing by returning False. Returns the number of rows printed.
+        printed = 0
+        for number, rows in enumerate(pages, 1):
+            if number > 1 and more is not None and not more():
+                break
+            print(tabulate(rows, headers=headers, tablefmt='grid'))
+            printed += len(rows)
+        return printed
+
+    def list_available_books(self, page_size=50, more=None):
+        # Method to list all available books in the library, page_size books per grid
+        pages = self._pages(lambda conn, after: Book.page_available(conn, after, page_size))
+        if not self._print_pages(pages, BOOK_HEADERS, more):
             print("No available books found.")
 
-    def list_overdue_books(self):
-        # Method to list all overdue books
-        rentals = Rental.list_overdue(self.conn)
-        if rentals:
-            headers = ["RentalID", "LibraryCardNumber", "ISBN", "RentalDate", "ReturnDate", "Returned", "Quantity"]
-            print(tabulate(rentals, headers=headers, tablefmt='grid'))
-        else:
+    def list_overdue_books(self, page_size=50, more=None):
+        # Method to list all overdue books, page_size rentals per grid
+        today = today_day()  # The same cut-off for every page
+        pages = self._pages(lambda conn, after: Rental.page_overdue(conn, after, page_size, today))
+        if not self._print_pages(pages, RENTAL_HEADERS, more):
             print("No overdue books found.")
 
-    def list_all_rented_books(self):
-        # Method to list all currently rented books
-        rentals = Rental.list_all_rented_books(self.conn)
-        if rentals:
-            headers = ["RentalID", "LibraryCardNumber", "ISBN", "RentalDate", "ReturnDate", "Returned", "Quantity"]
-            print(tabulate(rentals, headers=headers, tablefmt='grid'))
-        else:
+    def list_due_soon_books(self, days=3, page_size=50, more=None):
+        # Method to list the rentals due from today through the next days days, page_size rentals per grid
+        today = today_day()  # The same window for every page
+        pages = self._pages(lambda conn, after: Rental.page_due_soon(conn, days, after, page_size, today))
+        if not self._print_pages(pages, RENTAL_HEADERS, more):
+            print(f"No books are due in the next {days} day(s).")
+
+    def list_all_rented_books(self, page_size=50, more=None):
+        # Method to list all currently rented books, page_size rentals per grid
+        pages = self._pages(lambda conn, after: Rental.page_rented(conn, after, page_size))
+        if not self._print_pages(pages, RENTAL_HEADERS, more):
             print("No rented books found.")
 
     def list_total_overdue_books(self):
         # Method to list the total number of overdue books
-        total_overdue = Rental.total_overdue(self.conn)
+        with self.db.reader() as conn:
+            total_overdue = Rental.total_overdue(conn)
         print(tabulate([total_overdue], headers=['TotalOverdue'], tablefmt='grid'))
 
-    def list_rented_books(self, library_card_number):
-        # Method to list all books rented by a specific user
-        user = User.get_by_library_card(self.conn, library_card_number)
+    def list_rented_books(self, library_card_number, page_size=50, more=None):
+        # Method to list all books rented by a specific user, page_size books per grid
+        with self.db.reader() as conn:
+            user = User.get_by_library_card(conn, library_card_number)
         if user:
-            rentals = Rental.list_rented_by_user(self.conn, user.user_id)
-            if rentals:
-                headers = ["BookID", "Title", "Author", "Year", "Genre", "ISBN", "RentalDate", "ReturnDate", "Quantity", "Returned"]
-                print(tabulate(rentals, headers=headers, tablefmt='grid'))
-            else:
+            pages = self._pages(lambda conn, after: Rental.page_rented_by_user(conn, user.user_id, after, page_size))
+            if not self._print_pages(pages, USER_RENTAL_HEADERS, more):
                 print("No rented books found for this user.")
         else:
             print("User not found.")
 
-    def search_books(self, search_term):
-        # Method to search for books by title or author
-        books = Book.search(self.conn, search_term)
+    def list_rental_history(self, library_card_number, page_size=50, more=None):
+        # Method to list every rental a user ever made, archived ones included, page_size rentals per grid
+        with self.db.reader() as conn:
+            user = User.get_by_library_card(conn, library_card_number)
+        if user:
+            pages = self._pages(lambda conn, after: RentalArchive.page_history_by_user(conn, user.user_id, after, page_size))
+            if not self._print_pages(pages, USER_RENTAL_HEADERS, more):
+                print("No rentals found for this user.")
+        else:
+            print("User not found.")
+
+    def export_available_books(self, out=None, fmt='csv', page_size=1000):
+        # Method to stream all available books to out (default standard output) as CSV or JSONL.
+        # Rows are read page by page, so memory use does not grow with the catalog. Returns the number of rows.
+        pages = self._pages(lambda conn, after: Book.page_available(conn, after, page_size))
+        return write_rows(chain.from_iterable(pages), BOOK_HEADERS, out or sys.stdout, fmt)
+
+    def export_overdue_books(self, out=None, fmt='csv', page_size=1000):
+        # Method to stream all overdue rentals to out as CSV or JSONL; returns the number of rows
+        today = today_day()  # The same cut-off for every page
+        pages = self._pages(lambda conn, after: Rental.page_overdue(conn, after, page_size, today))
+        return write_rows(chain.from_iterable(pages), RENTAL_HEADERS, out or sys.stdout, fmt)
+
+    def export_rented_books(self, out=None, fmt='csv', page_size=1000):
+        # Method to stream all open rentals to out as CSV or JSONL; returns the number of rows
+        pages = self._pages(lambda conn, after: Rental.page_rented(conn, after, page_size))
+        return write_rows(chain.from_iterable(pages), RENTAL_HEADERS, out or sys.stdout, fmt)
+
+    def export_rented_by_user(self, library_card_number, out=None, fmt='csv', page_size=1000):
+        # Method to stream the books rented by a user to out as CSV or JSONL; returns the number of rows
+        with self.db.reader() as conn:
+            user = User.get_by_library_card(conn, library_card_number)
+        if not user:
+            print("User not found.", file=sys.stderr)  # Standard output may be carrying the export
+            return 0
+        pages = self._pages(lambda conn, after: Rental.page_rented_by_user(conn, user.user_id, after, page_size))
+        return write_rows(chain.from_iterable(pages), USER_RENTAL_HEADERS, out or sys.stdout, fmt)
+
+    def search_books(self, search_term, limit=None):
+        # Method to search for books by title, author or genre, best matches first
+        with self.db.reader() as conn:
+            books = Book.search(conn, search_term, limit)
         if books:
-            headers = ["BookID", "Title", "Author", "Year", "Genre", "ISBN", "Count"]
-            print(tabulate(books, headers=headers, tablefmt='grid'))
+            print(tabulate(books, headers=BOOK_HEADERS, tablefmt='grid'))
         else:
             print("No books found with the given search term.")
 
+    def fuzzy_search_books(self, search_term, limit=20):
+        # Method to search titles and authors allowing for typos, most similar first
+        with self.db.reader() as conn:
+            books = Book.search_fuzzy(conn, search_term, limit)
+        if books:
+            print(tabulate(books, headers=BOOK_MATCH_HEADERS, tablefmt='grid'))
+        else:
+            print("No books found resembling the given search term.")
+        return books
+
     def top_books_by_genre_library(self):
         # Method to list the top books in the library by genre
-        top_books = Book.top_books_by_genre(self.conn)
+        with self.db.reader() as conn:
+            top_books = Book.top_books_by_genre(conn)
         print(tabulate(top_books, headers=["Genre", "TotalBooks"], tablefmt='grid'))
 
     def top_books_by_genre_rented(self):
         # Method to list the top rented books by genre
-        top_rented_books = Rental.top_books_by_genre(self.conn)
+        with self.db.reader() as conn:
+            top_rented_books = Rental.top_books_by_genre(conn)
         print(tabulate(top_rented_books, headers=["Genre", "TotalRented"], tablefmt='grid'))
 
-    def return_available_books(self, isbn):
-        # Method to get the count of available books by ISBN
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            SELECT Count FROM Book WHERE ISBN = ?
-        ''', (isbn,))
-        book_count = cursor.fetchone()
-        if book_count:
-            return book_count[0]
+    def return_available_books(self, isbn, library_card_number=None):
+        # Method to get the count of available books by ISBN; with a card, a copy set aside for that patron's hold counts too
+        with self.db.reader() as conn:
+            book = Book.availability(conn, isbn)  # Served from the availability cache when possible
+            if book and library_card_number:
+                user = User.get_by_library_card(conn, library_card_number)
+                if user and Hold.ready_hold(conn, user.user_id, book[0]):
+                    return book[1] + 1
+        if book:
+            return book[1]
         return 0
+
+    def book_exists(self, isbn):
+        # Method to check whether the catalog has a book under this ISBN, whether or not a copy is on the shelf
+        with self.db.reader() as conn:
+            return Book.availability(conn, isbn) is not None  # Served from the availability cache when possible
+
+    def availability_cache_stats(self):
+        # Method to report the hit and miss counters of the availability cache; None when it is disabled
+        cache = self.db.availability_cache
+        if cache is None:
+            print("The availability cache is disabled.")
+            return None
+        stats = cache.stats()
+        print(f"Availability cache: {stats['hits']} hit(s), {stats['negative_hits']} unknown ISBN(s) answered by the filter, "
+              f"{stats['misses']} miss(es), hit rate {stats['hit_rate']:.0%}.")
+        return stats
+
+    def export_snapshot(self, directory, chunk_size=100000):
+        # Method to write the Rental, Book and User columns as NumPy arrays into directory for the
+        # vectorized reports (see analytics/snapshot.py); returns the snapshot manifest
+        from analytics import write_snapshot  # NumPy is needed, and imported, only by the analytics methods
+        started = time.perf_counter()
+        with self.db.reader() as conn:
+            manifest = write_snapshot(conn, directory, chunk_size)
+        rows = manifest['rows']
+        print(f"Snapshot of {rows['rental']} rental(s), {rows['book']} book(s) and {rows['user']} user(s) "
+              f"written to {directory} in {time.perf_counter() - started:.2f}s.")
+        return manifest
+
+    def circulation_report(self, directory, today=None):
+        # Method to print the loan-duration, overdue-rate and genre reports computed from a snapshot; returns them as a dict
+        from analytics import load_snapshot, circulation_report
+        report = circulation_report(load_snapshot(directory), today)
+        print("Top Library Books ranked by Genre:")
+        print(tabulate(report['top_books_by_genre'], headers=['Genre', 'TotalBooks'], tablefmt='grid'))
+        print("Top Rented Books ranked by Genre:")
+        print(tabulate(report['top_rented_by_genre'], headers=['Genre', 'TotalRented'], tablefmt='grid'))
+        rate = report['overdue_rate']
+        print(f"Total overdue: {report['total_overdue'] or 0} of {rate['on_loan']} copies on loan ({rate['rate']:.1%}).")
+        print(tabulate([(genre, loaned, late, f"{share:.1%}") for genre, loaned, late, share in rate['by_genre']],
+                       headers=['Genre', 'OnLoan', 'Overdue', 'OverdueRate'], tablefmt='grid'))
+        durations = report['loan_durations']
+        if durations['rentals']:
+            percentiles = ', '.join(f"p{p} {days:.0f}" for p, days in durations['percentiles'].items())
+            print(f"Loan length over {durations['rentals']} rental(s): mean {durations['mean']:.1f} days, {percentiles}, max {durations['max']}.")
+        return report
+
+    def rebuild_genre_stats(self):
+        # Method to recompute the genre summary behind the top charts from the Book and Rental tables
+        with self.db.writer() as conn:
+            GenreStats.rebuild(conn)
+        print("Genre statistics rebuilt.")
+
+    def verify_genre_stats(self):
+        # Method to check the genre summary against a full aggregation; returns True when consistent
+        with self.db.reader() as conn:
+            mismatches = GenreStats.verify(conn)
+        for genre, column, summary, expected in mismatches:
+            print(f"Genre {genre!r}: {column} is {summary} in GenreStats but {expected} in the tables.")
+        if not mismatches:
+            print("Genre statistics are consistent.")
+        return not mismatches
@@ -1,14 +1,196 @@
+import argparse  # Importuojam 'argparse' modulį komandinės eilutės argumentams apdoroti.
+import atexit  # Importuojam 'atexit' modulį, kad užklausų suvestinė būtų atspausdinta išeinant.
+import json  # Importuojam 'json' modulį neinteraktyvių komandų rezultatams spausdinti.
+import sys  # Importuojam 'sys' modulį, kad eksportas galėtų rašyti į standartinę išvestį.
 from getpass import getpass # Importuojam 'getpass' modulį, kad naudotojas galėtų įvesti slaptažodį, jo nematant.
 
 from library import Library  # Importuojam Library modulį iš library modulio (./library.py).
+import commands  # Importuojam neinteraktyvias komandas (./commands.py), kurios grąžina JSON.
+from db import QueryTracer  # Importuojam užklausų matavimo klasę iš db paketo.
 from utils.utils import add_one_month  # Importuojam pagalbinį metodą iš utils modulio (../utils/.utils.py)
+from utils.isbn import isbn_key  # Importuojam ISBN tikrinimą (../utils/isbn.py)
 from datetime import date, datetime  # Importuojam date ir datetime klases iš datetime modulio
 
-def main():
-    # Kintamajam priskiriam Library klasę.
-    library = Library()
-    # Paleidžiam funkciją kuri įrašo pagalbinius/pradinius duomenis.
-    library.insert_sample_data()
+def parse_args(argv=None):
+    # Komandinės eilutės argumentai. Be komandos paleidžiamas interaktyvus meniu.
+    parser = argparse.ArgumentParser(description="Library Management System")
+    parser.add_argument('--db', default='library.db', help="SQLite database file (default: library.db)")
+    parser.add_argument('--trace', action='store_true', help="Time every query and Library call and print a summary at exit")
+    parser.add_argument('--slow-ms', type=float, default=100.0, help="With --trace, statements at or over this many ms are slow (default: 100)")
+    parser.add_argument('--slow-log', help="With --trace, append slow statements and their query plans to this file")
+    subparsers = parser.add_subparsers(dest='command')
+
+    import_parser = subparsers.add_parser('import-catalog', help="Bulk import books from a CSV or JSONL file")
+    import_parser.add_argument('path', help="Catalog file (.csv with a header row or .jsonl)")
+    import_parser.add_argument('--chunk-size', type=int, default=10000, help="Rows per transaction (default: 10000)")
+
+    weed_parser = subparsers.add_parser('weed', help="Remove copies by ISBN list, year and/or genre")
+    weed_parser.add_argument('--isbn-file', help="File with one ISBN per line, optionally followed by a copy count")
+    weed_parser.add_argument('--year', type=int, help="Remove books published in or before this year")
+    weed_parser.add_argument('--genre', help="Remove books of this genre")
+    weed_parser.add_argument('--dry-run', action='store_true', help="Only report what would be removed")
+    weed_parser.add_argument('--skip-on-loan', action='store_true', help="Leave books with copies on loan untouched")
+
+    stats_parser = subparsers.add_parser('genre-stats', help="Check or rebuild the genre summary behind the top charts")
+    stats_parser.add_argument('--rebuild', action='store_true', help="Recompute the summary before checking it")
+
+    archive_parser = subparsers.add_parser('archive', help="Move old returned rentals into the rental archive")
+    archive_parser.add_argument('--older-than-days', type=int, default=365, help="Archive returned rentals due more than this many days ago (default: 365)")
+    archive_parser.add_argument('--batch-size', type=int, default=5000, help="Rentals moved per transaction (default: 5000)")
+    archive_parser.add_argument('--pause', type=float, default=0.0, help="Seconds to wait between batches (default: 0)")
+
+    snapshot_parser = subparsers.add_parser('snapshot', help="Write the circulation data as NumPy column files for the reports")
+    snapshot_parser.add_argument('directory', help="Snapshot directory, created if missing")
+    snapshot_parser.add_argument('--chunk-size', type=int, default=100000, help="Rows read per fetch (default: 100000)")
+
+    report_parser = subparsers.add_parser('report', help="Loan-duration, overdue-rate and genre reports from a snapshot")
+    report_parser.add_argument('directory', help="Snapshot directory written by 'snapshot'")
+
+    subparsers.add_parser('seed', help="Insert the sample librarians, users, books and rentals into empty tables")
+
+    export_parser = subparsers.add_parser('export', help="Stream a listing as CSV or JSONL")
+    export_parser.add_argument('listing', choices=['available', 'overdue', 'rented', 'user'], help="What to export")
+    export_parser.add_argument('--card', help="Library card number, for the 'user' listing")
+    export_parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv', help="Output format (default: csv)")
+    export_parser.add_argument('--output', help="Output file (default: standard output)")
+    export_parser.add_argument('--page-size', type=int, default=1000, help="Rows read per query (default: 1000)")
+
+    replay_parser = subparsers.add_parser('replay', help="Run a JSONL file of operations in batched transactions")
+    replay_parser.add_argument('path', help="JSONL file, one {\"op\": ..., ...} object per line ('-' for standard input)")
+    replay_parser.add_argument('--batch-size', type=int, default=500, help="Operations per transaction (default: 500)")
+    replay_parser.add_argument('--results', action='store_true', help="Print one JSON result line per operation")
+
+    commands.add_parsers(subparsers)  # Po vieną komandą kiekvienai Library operacijai (rent, return, search, ...)
+
+    serve_parser = subparsers.add_parser('serve', help="Run the JSON/HTTP service")
+    serve_parser.add_argument('--host', default='127.0.0.1', help="Address to listen on (default: 127.0.0.1)")
+    serve_parser.add_argument('--port', type=int, default=8080, help="Port to listen on (default: 8080)")
+    serve_parser.add_argument('--workers', type=int, default=8, help="Threads running database work (default: 8)")
+    serve_parser.add_argument('--timeout', type=float, default=5.0, help="Seconds per request before answering 504 (default: 5)")
+    return parser.parse_args(argv)
+
+def next_page():
+    # Klausiam naudotojo, ar rodyti kitą sąrašo puslapį
+    return input("Press Enter for the next page, or type 'q' to stop: ").strip().lower() != 'q'
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Kintamajam priskiriam Library klasę. Su --trace matuojamos visos užklausos ir Library metodai.
+    tracer = None
+    if args.trace:
+        tracer = QueryTracer(args.slow_ms, args.slow_log)
+        atexit.register(tracer.report)  # Suvestinė atspausdinama baigiant darbą, kad ir kaip programa baigtųsi
+    library = Library(args.db, tracer=tracer)
+
+    if args.command == 'seed':
+        # Pagalbinių/pradinių duomenų įrašymas, tik kai jų paprašoma
+        library.insert_sample_data()
+        print("Sample data inserted into the empty tables.")
+        return
+
+    if args.command == 'import-catalog':
+        # Masinis knygų katalogo importas iš CSV arba JSONL failo
+        library.import_catalog(args.path, args.chunk_size)
+        return
+
+    if args.command == 'weed':
+        # Knygų nurašymas: pagal ISBN sąrašą, metus ir/arba žanrą
+        isbns = None
+        if args.isbn_file:
+            isbns, bad_lines = [], []
+            with open(args.isbn_file, encoding='utf-8') as f:
+                for number, line in enumerate(f, 1):
+                    parts = line.split()
+                    if not parts:
+                        continue
+                    try:
+                        if len(parts) > 2:
+                            raise ValueError("expected an ISBN and an optional copy count")
+                        isbns.append((parts[0], commands.positive_int(parts[1]) if len(parts) > 1 else None))
+                    except ValueError as error:
+                        bad_lines.append(f"{args.isbn_file}:{number}: {error}")
+            if bad_lines:
+                # Nurašymas neatstatomas, todėl su klaidingu failu nieko nedarom
+                print('\n'.join(bad_lines), file=sys.stderr)
+                raise SystemExit(2)
+        if isbns is None and args.year is None and args.genre is None:
+            print("Nothing to weed: give --isbn-file, --year or --genre.")
+            return
+        library.weed_books(isbns, args.year, args.genre, args.dry_run, args.skip_on_loan)
+        return
+
+    if args.command == 'genre-stats':
+        # Žanrų statistikos (top sąrašų) perskaičiavimas ir patikrinimas
+        if args.rebuild:
+            library.rebuild_genre_stats()
+        if not library.verify_genre_stats():
+            raise SystemExit(1)
+        return
+
+    if args.command == 'archive':
+        # Senų grąžintų nuomų perkėlimas į archyvą nedidelėmis transakcijomis
+        library.archive_rentals(args.older_than_days, args.batch_size, args.pause)
+        return
+
+    if args.command == 'snapshot':
+        # Apyvartos duomenų momentinė kopija NumPy stulpeliais analitikai
+        library.export_snapshot(args.directory, args.chunk_size)
+        return
+
+    if args.command == 'report':
+        # Ataskaitos, skaičiuojamos vektoriškai iš momentinės kopijos
+        library.circulation_report(args.directory)
+        return
+
+    if args.command == 'export':
+        # Sąrašų eksportas į CSV arba JSONL, skaitant puslapiais, kad atmintis neaugtų su katalogu
+        if args.listing == 'user' and not args.card:
+            print("The 'user' listing needs --card.", file=sys.stderr)
+            raise SystemExit(2)
+        out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+        try:
+            if args.listing == 'available':
+                library.export_available_books(out, args.format, args.page_size)
+            elif args.listing == 'overdue':
+                library.export_overdue_books(out, args.format, args.page_size)
+            elif args.listing == 'rented':
+                library.export_rented_books(out, args.format, args.page_size)
+            else:
+                library.export_rented_by_user(args.card, out, args.format, args.page_size)
+        finally:
+            if args.output:
+                out.close()
+        return
+
+    if args.command == 'replay':
+        # Operacijų failo (JSONL) vykdymas paketais, po vieną transakciją kiekvienam paketui
+        lines = sys.stdin if args.path == '-' else open(args.path, encoding='utf-8')
+        try:
+            summary = commands.replay(library, lines, args.batch_size, sys.stdout if args.results else None)
+        finally:
+            if args.path != '-':
+                lines.close()
+        print(json.dumps(summary))
+        if summary['failed']:
+            raise SystemExit(1)
+        return
+
+    if getattr(args, 'operation', None):
+        # Viena operacija iš komandinės eilutės; rezultatas spausdinamas kaip JSON
+        params = {name: value for name, value in vars(args).items()
+                  if name in commands.OPERATIONS[args.operation]['arguments']}
+        outcome = commands.run(library, args.operation, params)
+        print(json.dumps(outcome))
+        if not outcome['ok']:
+            raise SystemExit(1)
+        return
+
+    if args.command == 'serve':
+        # JSON/HTTP servisas kioskams ir internetiniam katalogui
+        from service import serve
+        print(f"Library service starting on http://{args.host}:{args.port}")
+        serve(library, args.host, args.port, args.workers, args.timeout)
+        return
 
     while True:
         # Pagrindinis meniu
@@ -52,12 +234,12 @@ def main():
                         
                         genre = input("Enter genre: ")
 
-                        # Knygos identifikacinio kodo - ISBN numerio įvestis, užtikrinam, kad šis laukelis nebūtų tuščias.
+                        # Knygos identifikacinio kodo - ISBN numerio įvestis, užtikrinam, kad tai būtų galiojantis ISBN-10 arba ISBN-13.
                         while True:
                             isbn = input("Enter ISBN: ")
-                            if isbn.strip():
+                            if isbn_key(isbn) is not None:
                                 break
-                            print("ISBN cannot be empty. Please enter a valid ISBN.")
+                            print("Invalid ISBN. Please enter a valid ISBN-10 or ISBN-13 (hyphens are allowed).")
                         
                         # Knygų skaičiaus įvestis, užtikrinam, kad jis būtų 'int' tipo, 
                         # ir jeigu administratorius šį laukelį palieka tuščiu, automatiškai pridedam tik vieną knygą.
@@ -131,22 +313,26 @@ def main():
                     
                     elif admin_choice == '3':
                         # Pasirinkus kviečiama funkcija kuri parodo visas knygas bibliotekoje, kurios dar nėra išnuomuotos.
-                        library.list_available_books()
+                        library.list_available_books(more=next_page)
                     
                     elif admin_choice == '4':
                         # Pasirinkus iškviečiamos funkcijos kurios parodo:
                         # 1. bendrą visų šiuo metu išnuomuotų knygų kiekį;
                         # 2. sąrašą knygų kur sužymėtos visios šiuo metu vėluojamos grąžinti knygos ir nuomuotojų kortelės kodai;
-                        # 3. sąrašą knygų kur sužymėtos visios šiuo metu išuomotos knygos ir nuomuotojų kortelės kodai.
+                        # 3. sąrašą knygų, kurias grąžinti reikia per artimiausias 3 dienas;
+                        # 4. sąrašą knygų kur sužymėtos visios šiuo metu išuomotos knygos ir nuomuotojų kortelės kodai.
                         print("\n")
                         print("Total number of overdue books:")
                         library.list_total_overdue_books()
                         print("\n")
                         print("All books that are overdue:")
-                        library.list_overdue_books()
+                        library.list_overdue_books(more=next_page)
+                        print("\n")
+                        print("Books due in the next 3 days:")
+                        library.list_due_soon_books(3, more=next_page)
                         print("\n")
                         print("All books that are rented:")
-                        library.list_all_rented_books()
+                        library.list_all_rented_books(more=next_page)
                         print("\n")
                     
                     elif admin_choice == '5':
@@ -167,7 +353,9 @@ def main():
                     print("3. List Available Books")
                     print("4. List Rented Books")
                     print("5. Search books")
-                    print("6. Logout")
+                    print("6. Checkout several books")
+                    print("7. Search books allowing for typos")
+                    print("8. Logout")
                     user_choice = input("Enter your choice: ")
 
                     if user_choice == '1':
@@ -181,9 +369,14 @@ def main():
                                 if book_isbn_to_rent.lower() == 'exit':
                                     break
 
-                                available_books = library.return_available_books(book_isbn_to_rent)
+                                available_books = library.return_available_books(book_isbn_to_rent, library_card_number)  # Įskaitant naudotojui atidėtą egzempliorių
                                 if available_books == 0:
-                                    print("The book doesn't exist in the library, please try a different ISBN number (type 'exit' to quit)")
+                                    if not library.book_exists(book_isbn_to_rent):
+                                        print("The book doesn't exist in the library, please try a different ISBN number (type 'exit' to quit)")
+                                        continue
+                                    # Knyga yra, bet nėra laisvų egzempliorių: pasiūlom rezervuoti knygą
+                                    if input("No copies are available. Place a hold on this book? (y/N): ").strip().lower() == 'y':
+                                        library.place_hold(library_card_number, book_isbn_to_rent)
                                     continue
 
                                 while True:
@@ -207,12 +400,14 @@ def main():
                                         break
                                     try:
                                         quantity = int(quantity_input) if quantity_input else 1
-                                        if quantity > 3:
+                                        if quantity < 1:
+                                            print("Quantity must be at least 1")
+                                        elif quantity > 3:
                                             print("Cannot rent more than 3 of the same book")
                                         elif quantity > available_books:
                                             print(f"Cannot rent more books than are available in the library ({available_books})")
                                         else:
-                                            library.rent_book(library_card_number, book_isbn_to_rent, return_date, quantity)
+                                            library.rent_book(library_card_number, book_isbn_to_rent, return_date, quantity, check_overdue=False)  # Vėlavimai jau patikrinti įėjus į nuomos meniu
                                             break
                                     except ValueError:
                                         print("Invalid quantity. Please enter a valid number.")
@@ -225,18 +420,22 @@ def main():
                             quantity = input("Enter quantity to return (leave empty to return all): ")
                             try:
                                 quantity = int(quantity) if quantity else None
-                                break
+                                if quantity is None or quantity >= 1:
+                                    break
+                                print("Quantity must be at least 1")
                             except ValueError:
                                 print("Invalid quantity. Please enter a valid number.")
                         library.return_book(library_card_number, isbn, quantity)
 
                     elif user_choice == '3':
                         # Parodomos visos bibliotekoje esančios knygos
-                        library.list_available_books()
+                        library.list_available_books(more=next_page)
                     
                     elif user_choice == '4':
-                        # Sąrašas knygų kurias yra išsinuomaves naudotojas
-                        library.list_rented_books(library_card_number)
+                        # Sąrašas knygų kurias yra išsinuomaves naudotojas ir jo rezervacijos
+                        library.list_rented_books(library_card_number, more=next_page)
+                        print("Your holds:")
+                        library.list_holds(library_card_number)
                     
                     elif user_choice == '5':
                         # Knygų paieškos meniu
@@ -244,6 +443,32 @@ def main():
                         library.search_books(search_term)
                     
                     elif user_choice == '6':
+                        # Kelių knygų krepšelis, išnuomojamas viena transakcija
+                        cart = []
+                        while True:
+                            isbn = input("Enter book ISBN to add to the cart (leave empty to check out): ")
+                            if not isbn:
+                                break
+                            quantity_input = input("Enter quantity (default is 1, limit is <= 3): ")
+                            try:
+                                quantity = int(quantity_input) if quantity_input else 1
+                            except ValueError:
+                                print("Invalid quantity. Please enter a valid number.")
+                                continue
+                            if quantity < 1 or quantity > 3:
+                                print("Quantity must be between 1 and 3")
+                                continue
+                            cart.append((isbn, quantity))
+                        if cart:
+                            all_or_nothing = input("Rent only if every book is available? (y/N): ").strip().lower() == 'y'
+                            library.checkout(library_card_number, cart, all_or_nothing=all_or_nothing)
+
+                    elif user_choice == '7':
+                        # Paieška, atlaidi rašybos klaidoms (pvz. "Tolkein")
+                        search_term = input("Enter search term: ")
+                        library.fuzzy_search_books(search_term)
+
+                    elif user_choice == '8':
                         break  # Atsijungimas nuo naudotojo rolių.
             else:
                 print("Invalid library card number")
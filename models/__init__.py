@@ -1,4 +1,7 @@
 from .librarian import Librarian
 from .user import User
 from .books import Book
-from .rental import Rental
\ No newline at end of file
+from .rental import Rental
+from .genre_stats import GenreStats
+from .rental_archive import RentalArchive
+from .hold import Hold
\ No newline at end of file
@@ -1,4 +1,65 @@
+import json  # Import json to pass lists of IDs and trigrams as one parameter
+import math  # Import math to round the shared-trigram bound up
+import re  # Import the re module to split search terms into words
+import sqlite3  # Import the sqlite3 module to detect a missing search index
+
+from db import commit_if_standalone, invalidate_availability  # Import the helpers that let writes join a unit of work and keep the availability cache current
+from utils.isbn import isbn_key, lookup_key  # Import isbn_key to validate ISBNs and lookup_key to find books by their indexed ISBNKey
+from .genre_stats import GenreStats  # Import the genre summary behind the top charts
+from .paging import iterate_pages, next_token  # Import the keyset pagination helpers
+from .rows import BookRow, BookMatchRow, as_row, checked  # Import the book row types and the row helpers
+
+
+def _full_text_query(search_term):
+    # Turn free text into an FTS5 query where every word is a prefix match, e.g. "tolk hob" -> "tolk"* "hob"*
+    words = re.findall(r'\w+', search_term or '')
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+FUZZY_THRESHOLD = 0.3  # Least similarity of a fuzzy match, the default of PostgreSQL's pg_trgm
+FUZZY_CANDIDATES = 2000  # Most books scored per fuzzy search
+
+
+def _words(text):
+    # Lowercase words of a title, an author or a search term
+    return re.findall(r'\w+', (text or '').lower())
+
+
+def _word_trigrams(word):
+    # Trigrams of a word padded like pg_trgm, so its start and end count too: "hobit" -> "  h", " ho", "hob", "obi", "bit", "it "
+    padded = f'  {word} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _score(words, row, cache):
+    # Similarity of a book to the search words: for each word, the best trigram similarity
+    # (shared / all trigrams) to a word of the title or author, averaged over the search words
+    candidates = [cache.setdefault(word, _word_trigrams(word)) for word in _words(row[1]) + _words(row[2])]
+    if not candidates:
+        return 0.0
+    total = 0.0
+    for query in words:
+        trigrams = cache.setdefault(query, _word_trigrams(query))
+        total += max(len(trigrams & other) / len(trigrams | other) for other in candidates)
+    return total / len(words)
+
+
+def _probe_trigrams(words, threshold):
+    # Unpadded trigrams of the search words to look up in BookTrigram. A word at least threshold
+    # similar to a search word shares ceil(threshold * n) of its n padded trigrams, at most 3 of
+    # them padding, so it contains at least k of the word's inner trigrams and therefore one of
+    # any len(inner) - k + 1 of them. Only that many are probed per word, the rarest ones.
+    probes = {}
+    for word in words:
+        inner = sorted({word[i:i + 3] for i in range(len(word) - 2)})
+        needed = max(math.ceil(threshold * (len(word) + 2)) - 3, 1)
+        probes[word] = (inner, max(len(inner) - needed + 1, 1))
+    return probes
+
+
 class Book:
+    __slots__ = ('title', 'author', 'year', 'genre', 'isbn', 'count')  # No per-instance __dict__; loaded rows use the row types in models/rows.py
+
     def __init__(self, title, author, year, genre, isbn, count):
         # Constructor to initialize the Book object with title, author, year, genre, ISBN, and count
         self.title = title  # Set the book title
@@ -9,68 +70,182 @@ class Book:
         self.count = count  # Set the number of copies available
 
     def save(self, conn):
-        # Method to save the book details into the database
+        # Method to save the book details into the database under the canonical form of its ISBN. Copies of
+        # an edition already in the catalog, under any form of its ISBN, are added to its count; so are copies
+        # of a book catalogued under an ISBN that is not valid. Returns False, saving nothing, for any other
+        # ISBN that is not valid.
+        key = isbn_key(self.isbn)
         cursor = conn.cursor()  # Create a cursor object to interact with the database
+        if key is None:
+            key = lookup_key(self.isbn)
+            cursor.execute('UPDATE Book SET Count = Count + ? WHERE ISBNKey = ?', (self.count, key))  # A legacy ISBN, see utils/isbn.py
+            if not cursor.rowcount:
+                print("Invalid ISBN.")
+                return False
+            invalidate_availability(conn, [key])  # The cached copy count of this ISBN is out of date
+            commit_if_standalone(conn)  # Commit, unless the write is part of a larger unit of work
+            return True
         cursor.execute('''
-            SELECT BookID, Count FROM Book WHERE ISBN = ?
-        ''', (self.isbn,))  # Execute the SQL query to check if the book already exists in the database
-        book = cursor.fetchone()  # Fetch the result of the query
-        if book:
-            # If the book exists, update the count of copies
-            book_id, current_count = book
-            new_count = current_count + self.count  # Calculate the new count of copies
-            cursor.execute('''
-                UPDATE Book SET Count = ? WHERE BookID = ?
-            ''', (new_count, book_id))  # Execute the SQL query to update the book count
-        else:
-            # If the book does not exist, insert it into the database
-            cursor.execute('''
-                INSERT INTO Book (Title, Author, Year, Genre, ISBN, Count)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (self.title, self.author, self.year, self.genre, self.isbn, self.count))  # Execute the SQL query to insert the book details
-        conn.commit()  # Commit the transaction to save changes to the database
+            INSERT INTO Book (Title, Author, Year, Genre, ISBN, Count)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (ISBNKey) DO UPDATE SET Count = Count + excluded.Count
+        ''', (self.title, self.author, self.year, self.genre, str(key), self.count))  # One probe of idx_book_isbn_key decides between insert and update
+        invalidate_availability(conn, [key])  # The cached copy count of this ISBN is out of date
+        commit_if_standalone(conn)  # Commit, unless the write is part of a larger unit of work
+        return True
+
+    @staticmethod
+    def bulk_save(conn, books):
+        # Static method to save many (title, author, year, genre, isbn, count) tuples with set-based statements.
+        # Same result as calling save() for each book: copies of an edition already in the catalog are added to
+        # its count, new editions are inserted with the details of their first row and books with an invalid
+        # ISBN are skipped. The caller commits.
+        merged = {}
+        for title, author, year, genre, isbn, count in books:
+            key = isbn_key(isbn)
+            if key is None:
+                continue
+            if key in merged:
+                merged[key][5] += count  # Same edition twice in the batch, only the count is merged
+            else:
+                merged[key] = [title, author, year, genre, str(key), count]
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.executemany('''
+            INSERT INTO Book (Title, Author, Year, Genre, ISBN, Count)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (ISBNKey) DO UPDATE SET Count = Count + excluded.Count
+        ''', list(merged.values()))  # New editions are inserted, known ones get the copies added
+        invalidate_availability(conn, merged)  # The cached copy counts of these ISBNs are out of date
+        return len(merged)  # Number of distinct editions written
 
     @staticmethod
     def delete_by_isbn(conn, isbn, count_to_delete=None):
-        # Static method to delete a book by its ISBN
+        # Static method to delete a book by its ISBN, optionally only count_to_delete copies
+        Book.weed(conn, isbns=[(isbn, count_to_delete)])  # Commits unless part of a larger unit of work
+
+    @staticmethod
+    def weed(conn, isbns=None, year=None, genre=None, dry_run=False, skip_on_loan=False):
+        # Static method to remove copies from the catalog with set-based statements. Select the books with
+        # isbns (ISBN strings, or (isbn, count) pairs to remove only count copies), or with
+        # year (published on or before) and/or genre. Rows whose copies are all removed are deleted, except
+        # rows with copies on loan: those keep the row, so Rental still points to it, with Count reduced, and
+        # are reported in 'on_loan'. The open holds on deleted rows are cancelled, since no copy can come back
+        # for them. skip_on_loan=True leaves such rows untouched. dry_run=True only reports.
+        if isbns is None and year is None and genre is None:
+            raise ValueError("weed() needs isbns, year or genre")
         cursor = conn.cursor()  # Create a cursor object to interact with the database
         cursor.execute('''
-            SELECT SUM(Count) FROM Book WHERE ISBN=?
-        ''', (isbn,))  # Execute the SQL query to get the total count of books with the given ISBN
-        total_books = cursor.fetchone()[0]  # Fetch the total count of books
-        if count_to_delete is None or count_to_delete >= total_books:
-            # If count_to_delete is None or greater than or equal to total_books, delete all books with the given ISBN
+            CREATE TEMP TABLE IF NOT EXISTS WeedRequest (ISBNKey NOT NULL PRIMARY KEY, Remove INTEGER)
+        ''')  # ISBNKey is untyped: an integer, or the text of a legacy ISBN
+        cursor.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS WeedPlan (
+                BookID INTEGER PRIMARY KEY, ISBN TEXT, Count INTEGER, Removed INTEGER, Reached INTEGER, OnLoan INTEGER
+            )
+        ''')
+        cursor.execute('DELETE FROM WeedRequest')
+        cursor.execute('DELETE FROM WeedPlan')
+        if isbns is not None:
+            requests = {}
+            for item in isbns:
+                isbn, count = (item, None) if isinstance(item, str) else item
+                key = lookup_key(isbn)
+                if key is None:
+                    continue  # No ISBN, so not in the catalog
+                previous = requests.get(key, 0)
+                requests[key] = None if count is None or previous is None else previous + count
+            cursor.executemany('INSERT INTO WeedRequest (ISBNKey, Remove) VALUES (?, ?)', requests.items())
+            # One row per edition, found with one probe of idx_book_isbn_key
             cursor.execute('''
-                DELETE FROM Book WHERE ISBN=?
-            ''', (isbn,))  # Execute the SQL query to delete the books
-        else:
-            # If count_to_delete is less than total_books, delete the specified count of books
-            books_to_delete = count_to_delete
-            while books_to_delete > 0:
-                cursor.execute('''
-                    SELECT BookID, Count FROM Book WHERE ISBN=? LIMIT 1
-                ''', (isbn,))  # Execute the SQL query to get a single book record with the given ISBN
-                book = cursor.fetchone()  # Fetch the book record
-                if book is None:
-                    break  # Break the loop if no book is found
-                book_id, book_count = book
-                if book_count > books_to_delete:
-                    # If the book count is greater than books_to_delete, update the count
-                    cursor.execute('''
-                        UPDATE Book SET Count = Count - ? WHERE BookID = ?
-                    ''', (books_to_delete, book_id))  # Execute the SQL query to update the book count
-                    books_to_delete = 0  # Set books_to_delete to 0
-                else:
-                    # If the book count is less than or equal to books_to_delete, delete the book record
-                    cursor.execute('''
-                        DELETE FROM Book WHERE BookID = ?
-                    ''', (book_id,))  # Execute the SQL query to delete the book
-                    books_to_delete -= book_count  # Decrease books_to_delete by the book count
-        conn.commit()  # Commit the transaction to save changes to the database
+                INSERT INTO WeedPlan (BookID, ISBN, Count, Removed, Reached, OnLoan)
+                SELECT Book.BookID, Book.ISBN, Book.Count,
+                       CASE WHEN WeedRequest.Remove IS NULL THEN Book.Count ELSE MIN(Book.Count, WeedRequest.Remove) END,
+                       1,
+                       EXISTS (SELECT 1 FROM Rental WHERE Rental.BookID = Book.BookID AND Rental.Returned = 0)
+                FROM WeedRequest JOIN Book ON Book.ISBNKey = WeedRequest.ISBNKey
+                WHERE WeedRequest.Remove IS NULL OR WeedRequest.Remove > 0
+            ''')
+        conditions, params = [], []
+        if year is not None:
+            conditions.append('Book.Year <= ?')
+            params.append(year)
+        if genre is not None:
+            conditions.append('Book.Genre = ?')
+            params.append(genre)
+        if conditions:
+            if isbns is not None:
+                # Narrow the ISBN selection down to the rows that also match the predicate
+                cursor.execute(f'''
+                    DELETE FROM WeedPlan WHERE BookID NOT IN (
+                        SELECT Book.BookID FROM WeedPlan JOIN Book ON Book.BookID = WeedPlan.BookID
+                        WHERE {' AND '.join(conditions)}
+                    )
+                ''', params)
+            else:
+                cursor.execute(f'''
+                    INSERT INTO WeedPlan (BookID, ISBN, Count, Removed, Reached, OnLoan)
+                    SELECT Book.BookID, Book.ISBN, Book.Count, Book.Count, 1,
+                           EXISTS (SELECT 1 FROM Rental WHERE Rental.BookID = Book.BookID AND Rental.Returned = 0)
+                    FROM Book WHERE {' AND '.join(conditions)}
+                ''', params)
+        if skip_on_loan:
+            cursor.execute('UPDATE WeedPlan SET Removed = 0, Reached = 0 WHERE OnLoan')
+
+        cursor.execute('''
+            SELECT COUNT(*) FILTER (WHERE Reached AND Removed = Count AND NOT OnLoan),
+                   COUNT(*) FILTER (WHERE Removed > 0 AND NOT (Reached AND Removed = Count AND NOT OnLoan)),
+                   TOTAL(Removed)
+            FROM WeedPlan
+        ''')
+        rows_deleted, rows_updated, copies_removed = cursor.fetchone()
+        cursor.execute('''
+            SELECT WeedPlan.BookID, WeedPlan.ISBN, SUM(Rental.Quantity)
+            FROM WeedPlan JOIN Rental ON Rental.BookID = WeedPlan.BookID AND Rental.Returned = 0
+            WHERE WeedPlan.OnLoan
+            GROUP BY WeedPlan.BookID
+        ''')
+        on_loan = [{'book_id': book_id, 'isbn': isbn, 'copies_on_loan': copies} for book_id, isbn, copies in cursor.fetchall()]
+        cursor.execute('''
+            SELECT COUNT(*) FROM WeedPlan
+            JOIN Hold ON Hold.BookID = WeedPlan.BookID AND Hold.Status IN ('waiting', 'ready')
+            WHERE WeedPlan.Reached AND WeedPlan.Removed = WeedPlan.Count AND NOT WeedPlan.OnLoan
+        ''')  # idx_hold_queue finds each deleted row's open holds
+        holds_cancelled = cursor.fetchone()[0]
+        report = {'rows_deleted': rows_deleted, 'rows_updated': rows_updated, 'copies_removed': int(copies_removed),
+                  'holds_cancelled': holds_cancelled, 'on_loan': on_loan, 'dry_run': dry_run}
+        if dry_run:
+            return report
+
+        cursor.execute('''
+            SELECT Book.ISBNKey FROM WeedPlan JOIN Book ON Book.BookID = WeedPlan.BookID WHERE WeedPlan.Removed > 0
+        ''')
+        invalidate_availability(conn, [row[0] for row in cursor.fetchall()])  # The cached copy counts of these ISBNs are out of date
+        if holds_cancelled:
+            cursor.execute('''
+                UPDATE Hold SET Status = 'cancelled'
+                WHERE Status IN ('waiting', 'ready') AND BookID IN (
+                    SELECT BookID FROM WeedPlan WHERE Reached AND Removed = Count AND NOT OnLoan
+                )
+            ''')  # The queue of a book that is leaving the catalog
+        cursor.execute('''
+            DELETE FROM Book WHERE BookID IN (
+                SELECT BookID FROM WeedPlan WHERE Reached AND Removed = Count AND NOT OnLoan
+            )
+        ''')  # Whole rows that are no longer needed
+        cursor.execute('''
+            UPDATE Book SET Count = Book.Count - WeedPlan.Removed
+            FROM WeedPlan
+            WHERE Book.BookID = WeedPlan.BookID AND WeedPlan.Removed > 0
+        ''')  # Rows that keep some copies, or that are still referenced by open rentals
+        commit_if_standalone(conn)  # Commit, unless the write is part of a larger unit of work
+        return report
 
     def delete_book_by_year(self, year):
         # Method to delete books published on or before a given year
         cursor = self.conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('''
+            UPDATE Hold SET Status = 'cancelled'
+            WHERE Status IN ('waiting', 'ready') AND BookID IN (SELECT BookID FROM Book WHERE Year <= ?)
+        ''', (year,))  # No copy of the deleted books can come back for their holds
         cursor.execute('''
             DELETE FROM Book WHERE Year <= ?
         ''', (year,))  # Execute the SQL query to delete the books
@@ -78,12 +253,8 @@ class Book:
 
     @staticmethod
     def delete_by_year(conn, year):
-        # Static method to delete books published on or before a given year
-        cursor = conn.cursor()  # Create a cursor object to interact with the database
-        cursor.execute('''
-            DELETE FROM Book WHERE Year <= ?
-        ''', (year,))  # Execute the SQL query to delete the books
-        conn.commit()  # Commit the transaction to save changes to the database
+        # Static method to delete books published on or before a given year; rows with copies on loan are kept
+        Book.weed(conn, year=year)  # Commits unless part of a larger unit of work
 
     @staticmethod
     def list_all_available(conn):
@@ -92,28 +263,151 @@ class Book:
         cursor.execute('''
             SELECT BookID, Title, Author, Year, Genre, ISBN, Count FROM Book WHERE Count > 0
         ''')  # Execute the SQL query to select all available books
-        return cursor.fetchall()  # Fetch and return all the results of the query
+        return checked(cursor, BookRow).fetchall()  # Fetch and return all the results of the query
+
+    @staticmethod
+    def page_available(conn, after_id=0, page_size=100):
+        # Static method to get one page of available books in BookID order, starting after the book after_id.
+        # Returns (rows, next_after_id), next_after_id being None after the last page.
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('''
+            SELECT BookID, Title, Author, Year, Genre, ISBN, Count FROM Book
+            WHERE BookID > ? AND Count > 0
+            ORDER BY BookID
+            LIMIT ?
+        ''', (after_id, page_size))  # Keyset pagination: the primary key picks up where the last page ended
+        rows = checked(cursor, BookRow).fetchall()  # Fetch one page of results
+        return rows, next_token(rows, page_size)
+
+    @staticmethod
+    def iter_available(conn, page_size=1000, after_id=0):
+        # Static method to iterate over all available books one page at a time, so memory use stays flat
+        return iterate_pages(lambda after: Book.page_available(conn, after, page_size), after_id)
 
     @staticmethod
-    def search(conn, search_term):
-        # Static method to search for books by title or author
+    def availability(conn, isbn):
+        # Static method to get the (BookID, Count) row an ISBN, in any of its written forms, resolves to, or None
+        # for an unknown ISBN, through the availability cache when the connection has one
+        key = lookup_key(isbn)
+        if key is None:
+            return None  # No ISBN, so not in the catalog
+        cache = getattr(conn, 'availability_cache', None)
+        if cache is None or conn.in_transaction:
+            return Book._find_by_key(conn, key)  # Uncommitted changes must not end up in the shared cache
+        cache.sync(conn, lambda book_id: Book._keys_after(conn, book_id))  # Forget what other connections have changed
+        return cache.get(key, lambda key: Book._find_by_key(conn, key), lambda: Book._all_keys(conn))
+
+    @staticmethod
+    def _find_by_key(conn, key):
+        # Static method to read the (BookID, Count) row of an ISBN key from the database
         cursor = conn.cursor()  # Create a cursor object to interact with the database
         cursor.execute('''
-            SELECT * FROM Book
+            SELECT BookID, Count FROM Book WHERE ISBNKey = ?
+        ''', (key,))  # One probe of idx_book_isbn_key
+        return cursor.fetchone()  # Fetch and return the matching row, or None
+
+    @staticmethod
+    def _all_keys(conn):
+        # Static method to read the highest BookID and the ISBN key of every book in the catalog, used to build the
+        # Bloom filter of the availability cache. The BookID is read first, so a book inserted in between is in the keys.
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('SELECT IFNULL(MAX(BookID), 0) FROM Book')  # The last row of the primary key
+        last_book_id = cursor.fetchone()[0]
+        cursor.execute('''
+            SELECT ISBNKey FROM Book ORDER BY ISBNKey
+        ''')  # Execute the SQL query; the ORDER BY reads idx_book_isbn_key instead of the table
+        return last_book_id, [row[0] for row in cursor.fetchall()]  # Fetch and return the keys
+
+    @staticmethod
+    def _keys_after(conn, book_id):
+        # Static method to read the highest BookID and the ISBN keys of the books after book_id, the ones
+        # inserted since the Bloom filter of the availability cache was filled
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('''
+            SELECT BookID, ISBNKey FROM Book WHERE BookID > ?
+        ''', (book_id,))  # A range of the primary key
+        rows = cursor.fetchall()
+        return max([book_id] + [row[0] for row in rows]), [row[1] for row in rows]
+
+    @staticmethod
+    def search(conn, search_term, limit=None):
+        # Static method to search for books by title, author or genre, best matches first
+        query = _full_text_query(search_term)
+        if query:
+            cursor = conn.cursor()  # Create a cursor object to interact with the database
+            try:
+                cursor.execute('''
+                    SELECT Book.BookID, Book.Title, Book.Author, Book.Year, Book.Genre, Book.ISBN, Book.Count FROM BookSearch
+                    JOIN Book ON Book.BookID = BookSearch.rowid
+                    WHERE BookSearch MATCH ?
+                    ORDER BY bm25(BookSearch, 10.0, 5.0, 1.0)
+                    LIMIT ?
+                ''', (query, -1 if limit is None else limit))  # Title matches weigh more than author, author more than genre
+                return checked(cursor, BookRow).fetchall()  # Fetch and return the ranked results
+            except sqlite3.OperationalError:
+                pass  # The SQLite build has no FTS5, so the BookSearch table was never created
+        return Book.search_like(conn, search_term, limit)  # Empty query or no FTS5 support, fall back to a substring search
+
+    @staticmethod
+    def search_fuzzy(conn, search_term, limit=20, threshold=FUZZY_THRESHOLD):
+        # Static method to search titles and authors allowing for typos ("Tolkein" finds "Tolkien"), most
+        # similar first. Candidates come from the BookTrigram index: the books containing the rarest trigrams
+        # of each search word, at most FUZZY_CANDIDATES of them. Returns BookMatchRow rows whose similarity
+        # is at least threshold.
+        words = _words(search_term)
+        if not words:
+            return []
+        probes = _probe_trigrams(words, threshold)
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        try:
+            cursor.execute('''
+                SELECT term, doc FROM BookTrigramTerms WHERE term IN (SELECT value FROM json_each(?))
+            ''', (json.dumps(sorted({trigram for inner, _ in probes.values() for trigram in inner})),))
+        except sqlite3.OperationalError:
+            return Book._rank_fuzzy(Book.search_like(conn, search_term), words, threshold, limit)  # No trigram index in this SQLite build
+        books = dict(cursor.fetchall())  # Books containing each trigram; absent trigrams match nothing
+        probed = set()
+        for inner, count in probes.values():
+            probed.update(sorted(inner, key=lambda trigram: books.get(trigram, 0))[:count])
+        if not probed:
+            return Book._rank_fuzzy(Book.search(conn, search_term, FUZZY_CANDIDATES), words, threshold, limit)  # Only words too short for a trigram
+        candidates = set()
+        for trigram in sorted(probed, key=lambda trigram: books.get(trigram, 0)):  # Rarest first, the most telling books come in first
+            if len(candidates) >= FUZZY_CANDIDATES:
+                break
+            if not books.get(trigram):
+                continue
+            cursor.execute('''
+                SELECT rowid FROM BookTrigram WHERE BookTrigram MATCH ? LIMIT ?
+            ''', ('"' + trigram.replace('"', '""') + '"', FUZZY_CANDIDATES - len(candidates)))  # One doclist of the trigram index
+            candidates.update(row[0] for row in cursor.fetchall())
+        rows = conn.cursor()  # Create a cursor object to interact with the database
+        rows.execute('''
+            SELECT BookID, Title, Author, Year, Genre, ISBN, Count FROM Book WHERE BookID IN (SELECT value FROM json_each(?))
+        ''', (json.dumps(sorted(candidates)),))  # Primary key lookups
+        return Book._rank_fuzzy(checked(rows, BookRow).fetchall(), words, threshold, limit)
+
+    @staticmethod
+    def _rank_fuzzy(rows, words, threshold, limit):
+        # Static method to score rows against the search words and keep the best limit of those reaching threshold
+        cache = {}
+        scored = [(round(_score(words, row, cache), 3), row) for row in rows]
+        scored = sorted((item for item in scored if item[0] >= threshold), key=lambda item: (-item[0], item[1][0]))
+        return [as_row(BookMatchRow, tuple(row) + (similarity,)) for similarity, row in scored[:limit]]
+
+    @staticmethod
+    def search_like(conn, search_term, limit=None):
+        # Static method to search for books by title or author with a substring match
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('''
+            SELECT BookID, Title, Author, Year, Genre, ISBN, Count FROM Book
             WHERE Title LIKE '%' || ? || '%'
                OR Author LIKE '%' || ? || '%'
-        ''', (search_term, search_term))  # Execute the SQL query to search for books by title or author
-        return cursor.fetchall()  # Fetch and return all the results of the query
+            LIMIT ?
+        ''', (search_term, search_term, -1 if limit is None else limit))  # Execute the SQL query to search for books by title or author
+        return checked(cursor, BookRow).fetchall()  # Fetch and return all the results of the query
 
     @staticmethod
     def top_books_by_genre(conn):
-        # Static method to get the top books by genre
-        cursor = conn.cursor()  # Create a cursor object to interact with the database
-        cursor.execute('''
-            SELECT Genre, SUM(Count) as TotalBooks
-            FROM Book
-            GROUP BY Genre
-            ORDER BY TotalBooks DESC
-            LIMIT 5
-        ''')  # Execute the SQL query to get the top books by genre
-        return cursor.fetchall()  # Fetch and return all the results of the query
+        # Static method to get the top books by genre, read from the trigger-maintained GenreStats summary
+        return GenreStats.top_books(conn)
@@ -0,0 +1,64 @@
+from db import commit_if_standalone, rebuild_genre_stats  # Import the commit helper and the summary rebuild
+
+
+class GenreStats:
+    # Per-genre totals behind the top charts, kept up to date by triggers on Book and Rental
+    # (see db/migrations.py), so reading a chart touches a handful of rows.
+
+    @staticmethod
+    def top_books(conn, limit=5):
+        # Static method to get the genres with the most copies in the library
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('''
+            SELECT Genre, TotalBooks FROM GenreStats
+            WHERE BookRows > 0
+            ORDER BY TotalBooks DESC
+            LIMIT ?
+        ''', (limit,))  # Walks idx_genre_stats_books from the top
+        return cursor.fetchall()  # Fetch and return all the results of the query
+
+    @staticmethod
+    def top_rented(conn, limit=5):
+        # Static method to get the genres with the most copies rented
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('''
+            SELECT Genre, TotalRented FROM GenreStats
+            WHERE RentalRows > 0
+            ORDER BY TotalRented DESC
+            LIMIT ?
+        ''', (limit,))  # Walks idx_genre_stats_rented from the top
+        return cursor.fetchall()  # Fetch and return all the results of the query
+
+    @staticmethod
+    def rebuild(conn):
+        # Static method to recompute every genre total from the Book and Rental tables
+        rebuild_genre_stats(conn.cursor())
+        commit_if_standalone(conn)  # Commit, unless the rebuild is part of a larger unit of work
+
+    @staticmethod
+    def verify(conn):
+        # Static method to compare the summary with a full aggregation of the base tables.
+        # Returns a list of (genre, column, summary value, aggregated value) mismatches, empty when consistent.
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('''
+            SELECT Genre, TotalBooks, TotalRented FROM GenreStats WHERE BookRows > 0 OR RentalRows > 0
+        ''')
+        summary = {genre: (books, rented) for genre, books, rented in cursor.fetchall()}
+        cursor.execute('SELECT Genre, SUM(Count) FROM Book GROUP BY Genre')
+        expected = {genre: [books or 0, None] for genre, books in cursor.fetchall()}
+        cursor.execute('''
+            SELECT b.Genre, SUM(r.Quantity) FROM Rental r JOIN Book b ON r.BookID = b.BookID GROUP BY b.Genre
+        ''')
+        for genre, rented in cursor.fetchall():
+            expected.setdefault(genre, [None, None])[1] = rented
+        mismatches = []
+        for genre in sorted(set(summary) | set(expected), key=lambda genre: (genre is None, genre or '')):
+            books, rented = summary.get(genre, (None, None))
+            expected_books, expected_rented = expected.get(genre, (None, None))
+            if expected_books is not None and books != expected_books:
+                mismatches.append((genre, 'TotalBooks', books, expected_books))
+            if expected_rented is not None and rented != expected_rented:
+                mismatches.append((genre, 'TotalRented', rented, expected_rented))
+            if expected_books is None and expected_rented is None:
+                mismatches.append((genre, 'Genre', 'present', 'absent'))
+        return mismatches
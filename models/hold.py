@@ -0,0 +1,162 @@
+import json
+from utils.isbn import lookup_key
+from utils.utils import today_day
+from db import commit_if_standalone, invalidate_availability
+from .books import Book
+from .rows import HoldRow, checked
+
+HOLD_PICKUP_DAYS = 3  # Days a patron has to collect a copy set aside for a hold
+
+
+class Hold:
+    # Queue of patrons waiting for a book. A copy that comes back goes to the next eligible waiting
+    # hold, highest Priority first and oldest first within a priority: it is taken off the shelf and
+    # the hold becomes 'ready' until the patron rents the book or HOLD_PICKUP_DAYS pass. The next
+    # hold is a seek into idx_hold_queue, so allocation costs the same with ten holds or ten thousand.
+
+    @staticmethod
+    def place(conn, user_id, isbn, priority=0):
+        # Static method to queue a patron for a book; a copy on the shelf is set aside at once.
+        # Returns the new hold's status ('waiting' or 'ready'), or None when the ISBN is unknown
+        # or the patron already has an open hold on the book.
+        book = Book.availability(conn, isbn)  # Resolve the ISBN to its book, usually from the cache
+        if book is None:
+            print("Book not found.")
+            return None
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('''
+            INSERT INTO Hold (UserID, BookID, Priority)
+            SELECT ?, ?, ?
+            WHERE NOT EXISTS (
+                SELECT 1 FROM Hold WHERE UserID = ? AND BookID = ? AND Status IN ('waiting', 'ready')
+            )
+        ''', (user_id, book[0], priority, user_id, book[0]))  # idx_hold_active answers the NOT EXISTS
+        if not cursor.rowcount:
+            commit_if_standalone(conn)  # Ends the transaction the INSERT opened
+            print("There is already a hold on this book for this user.")
+            return None
+        hold_id = cursor.lastrowid
+        Hold.allocate(conn, [book[0]])
+        cursor.execute('SELECT Status FROM Hold WHERE HoldID = ?', (hold_id,))
+        status = cursor.fetchone()[0]
+        commit_if_standalone(conn)  # Commit, unless the write is part of a larger unit of work
+        return status
+
+    @staticmethod
+    def allocate(conn, book_ids, today=None):
+        # Static method to set the copies on the shelf of each book in book_ids aside for its next
+        # waiting holds. Holds of patrons with overdue books are passed over and keep their place.
+        # Returns the number of holds made ready; the caller commits.
+        today = today if today is not None else today_day()
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        allocated = 0
+        for book_id in book_ids:
+            cursor.execute('''
+                UPDATE Hold SET Status = 'ready', ExpiresDay = ?
+                WHERE HoldID IN (
+                    SELECT HoldID FROM Hold
+                    WHERE BookID = ? AND Status = 'waiting'
+                      AND NOT EXISTS (
+                          SELECT 1 FROM Rental
+                          WHERE Rental.UserID = Hold.UserID AND Rental.Returned = 0 AND Rental.ReturnDay < ?
+                      )
+                    ORDER BY Priority DESC, HoldID
+                    LIMIT COALESCE((SELECT MAX(Count, 0) FROM Book WHERE BookID = ?), 0)
+                )
+            ''', (today + HOLD_PICKUP_DAYS, book_id, today, book_id))  # Walks idx_hold_queue from the front, one copy per hold; none for a deleted book
+            ready = cursor.rowcount
+            if ready:
+                cursor.execute('''
+                    UPDATE Book SET Count = Count - ? WHERE BookID = ? RETURNING ISBNKey
+                ''', (ready, book_id))  # The copies leave the shelf for the pickup desk
+                invalidate_availability(conn, [row[0] for row in cursor.fetchall()])
+                allocated += ready
+        return allocated
+
+    @staticmethod
+    def ready_hold(conn, user_id, book_id):
+        # Static method to get the ID of the patron's ready hold on a book, or None
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('''
+            SELECT HoldID FROM Hold WHERE BookID = ? AND Status = 'ready' AND UserID = ?
+        ''', (book_id, user_id))  # Scans the book's ready holds in idx_hold_queue, at most one per copy
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def fulfil(conn, hold_ids):
+        # Static method to close ready holds whose set-aside copy has been rented. The caller commits.
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('''
+            UPDATE Hold SET Status = 'fulfilled' WHERE HoldID IN (SELECT value FROM json_each(?)) AND Status = 'ready'
+        ''', (json.dumps(list(hold_ids)),))
+        return cursor.rowcount
+
+    @staticmethod
+    def cancel(conn, user_id, isbn):
+        # Static method to cancel the patron's open hold on a book. A copy already set aside goes to
+        # the next hold in the queue, or back on the shelf. Returns True when a hold was cancelled.
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('''
+            SELECT Hold.HoldID, Hold.BookID, Hold.Status FROM Book
+            JOIN Hold ON Hold.UserID = ? AND Hold.BookID = Book.BookID AND Hold.Status IN ('waiting', 'ready')
+            WHERE Book.ISBNKey = ?
+        ''', (user_id, lookup_key(isbn)))  # idx_book_isbn_key finds the book, idx_hold_active the hold
+        cancelled = cursor.fetchall()
+        for hold_id, book_id, status in cancelled:
+            cursor.execute("UPDATE Hold SET Status = 'cancelled' WHERE HoldID = ?", (hold_id,))
+            if status == 'ready':
+                cursor.execute('UPDATE Book SET Count = Count + 1 WHERE BookID = ?', (book_id,))
+                invalidate_availability(conn, [lookup_key(isbn)])  # The cached copy count of this ISBN is out of date
+                Hold.allocate(conn, [book_id])
+        commit_if_standalone(conn)  # Commit, unless the write is part of a larger unit of work
+        if not cancelled:
+            print("No open hold found for this ISBN and user.")
+        return bool(cancelled)
+
+    @staticmethod
+    def expire(conn, today=None):
+        # Static method to expire the ready holds whose pickup day has passed. Their copies go to the
+        # next holds in the queues, or back on the shelf. Returns the number of holds expired.
+        today = today if today is not None else today_day()
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('''
+            UPDATE Hold SET Status = 'expired'
+            WHERE Status = 'ready' AND ExpiresDay < ?
+            RETURNING BookID
+        ''', (today,))  # A range of idx_hold_expiry
+        copies = {}
+        for (book_id,) in cursor.fetchall():
+            copies[book_id] = copies.get(book_id, 0) + 1
+        for book_id, count in copies.items():
+            cursor.execute('''
+                UPDATE Book SET Count = Count + ? WHERE BookID = ? RETURNING ISBNKey
+            ''', (count, book_id))
+            invalidate_availability(conn, [row[0] for row in cursor.fetchall()])  # The cached copy count of this ISBN is out of date
+        Hold.allocate(conn, sorted(copies), today)
+        commit_if_standalone(conn)  # Commit, unless the write is part of a larger unit of work
+        return sum(copies.values())
+
+    @staticmethod
+    def list_by_user(conn, user_id):
+        # Static method to list a patron's open holds, with each waiting hold's place in its queue
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('''
+            SELECT
+                Hold.HoldID,
+                Book.ISBN,
+                Book.Title,
+                Hold.Status,
+                CASE WHEN Hold.Status = 'waiting' THEN 1 + (
+                    SELECT COUNT(*) FROM Hold AS Ahead
+                    WHERE Ahead.BookID = Hold.BookID AND Ahead.Status = 'waiting'
+                      AND (Ahead.Priority > Hold.Priority OR (Ahead.Priority = Hold.Priority AND Ahead.HoldID < Hold.HoldID))
+                ) END,
+                Hold.PlacedDate,
+                Hold.ExpiresDate
+            FROM Hold
+            JOIN Book ON Hold.BookID = Book.BookID
+            WHERE Hold.UserID = ? AND Hold.Status IN ('waiting', 'ready')
+            ORDER BY Hold.HoldID
+        ''', (user_id,))  # The place in the queue counts a range of idx_hold_queue
+        return checked(cursor, HoldRow).fetchall()  # Fetch and return all the results of the query
@@ -1,6 +1,10 @@
 import sqlite3  # Import the sqlite3 module to interact with SQLite databases
+from db import commit_if_standalone  # Import the helper that lets writes join a unit of work
+from .rows import LibrarianRow, checked  # Import the librarian row type and its column check
 
 class Librarian:
+    __slots__ = ('username', 'password', 'fullname')  # No per-instance __dict__; loaded rows use the row types in models/rows.py
+
     def __init__(self, username, password, fullname):
         # Constructor to initialize the Librarian object with a username, password, and fullname
         self.username = username
@@ -14,13 +18,13 @@ class Librarian:
             INSERT INTO Librarian (Username, Password, FullName)
             VALUES (?, ?, ?)
         ''', (self.username, self.password, self.fullname))  # Execute the SQL query to insert librarian details
-        conn.commit()  # Commit the transaction to save changes to the database
+        commit_if_standalone(conn)  # Commit, unless the write is part of a larger unit of work
 
     @staticmethod
     def authenticate(conn, username, password):
         # Static method to authenticate a librarian using their username and password
         cursor = conn.cursor()  # Create a cursor object to interact with the database
         cursor.execute('''
-            SELECT * FROM Librarian WHERE Username=? AND Password=?
+            SELECT LibrarianID, Username, Password, FullName FROM Librarian WHERE Username=? AND Password=?
         ''', (username, password))  # Execute the SQL query to select a librarian with matching username and password
-        return cursor.fetchone()  # Fetch and return the result of the query (None if no match found)
+        return checked(cursor, LibrarianRow).fetchone()  # Fetch and return the result of the query (None if no match found)
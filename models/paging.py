@@ -0,0 +1,13 @@
+def iterate_pages(fetch_page, after_id=0):
+    # Generator yielding every row of a keyset-paginated listing. fetch_page(after_id) returns
+    # (rows, next_after_id), next_after_id being None after the last page.
+    while after_id is not None:
+        rows, after_id = fetch_page(after_id)
+        yield from rows
+
+
+def next_token(rows, page_size, key=lambda row: row[0]):
+    # Keyset token for the page after rows: the key of the last row, or None when this was the last page
+    if not rows or len(rows) < page_size:
+        return None
+    return key(rows[-1])
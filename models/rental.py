@@ -1,74 +1,285 @@
-from datetime import datetime
-from utils.utils import add_one_month
+import json
+from datetime import date
+from utils.isbn import lookup_key
+from utils.utils import add_one_month, to_day, today_day
+from db import commit_if_standalone, invalidate_availability
+from .books import Book
+from .genre_stats import GenreStats
+from .hold import Hold
+from .paging import iterate_pages, next_token
+from .rows import RentalRow, UserRentalRow, checked
 
 class Rental:
+    __slots__ = ('user_id', 'isbn', 'return_day', 'quantity')  # No per-instance __dict__; loaded rows use the row types in models/rows.py
+
     def __init__(self, user_id, isbn, return_date, quantity):
-        # Constructor to initialize the Rental object with user ID, ISBN, return date, and quantity
+        # Constructor to initialize the Rental object with user ID, ISBN, return date (ISO text, date or day number), and quantity
         self.user_id = user_id  # Set the user ID
         self.isbn = isbn  # Set the book ISBN
-        self.return_date = return_date if return_date else add_one_month(datetime.today()).strftime('%Y-%m-%d')  # Set the return date, default is one month from today
-        self.quantity = quantity if quantity else 1  # Set the quantity, default is 1
+        self.return_day = to_day(return_date if return_date else add_one_month(date.today()))  # Set the return day, default is one month from today
+        self.quantity = 1 if quantity is None else quantity  # Set the quantity, default is 1
 
     def save(self, conn):
-        # Method to save the rental details into the database
+        # Method to save the rental details into the database. The copies are taken with a conditional
+        # UPDATE, so two desks renting the last copy at the same time cannot both succeed. A copy set
+        # aside for the patron's ready hold counts towards the quantity and closes the hold.
+        if self.quantity < 1:
+            print("Invalid quantity.")  # A negative quantity would put copies on the shelf
+            return False
         cursor = conn.cursor()  # Create a cursor object to interact with the database
-        cursor.execute('''
-            SELECT BookID, Count FROM Book WHERE ISBN = ?
-        ''', (self.isbn,))  # Execute the SQL query to check if the book exists and get its count
-        book = cursor.fetchone()  # Fetch the result of the query
-        if book and book[1] >= self.quantity:
-            # If the book exists and has enough copies, save the rental
-            book_id = book[0]
-            cursor.execute('''
-                INSERT INTO Rental (UserID, BookID, ReturnDate, Quantity)
-                VALUES (?, ?, ?, ?)
-            ''', (self.user_id, book_id, self.return_date, self.quantity))  # Insert the rental details
-            cursor.execute('''
-                UPDATE Book SET Count = Count - ? WHERE BookID = ?
-            ''', (self.quantity, book_id))  # Update the book count
-            conn.commit()  # Commit the transaction to save changes to the database
-        else:
-            print("Not enough books available.")  # Print message if not enough books are available
+        book = Book.availability(conn, self.isbn)  # Resolve the ISBN to its book, usually from the cache
+        if book:
+            hold_id = Hold.ready_hold(conn, self.user_id, book[0])
+            from_shelf = self.quantity - (1 if hold_id else 0)
+            taken = True
+            if from_shelf:
+                cursor.execute('''
+                    UPDATE Book SET Count = Count - ? WHERE BookID = ? AND Count >= ?
+                ''', (from_shelf, book[0], from_shelf))  # Take the copies only if they are still on the shelf
+                taken = cursor.rowcount == 1
+            if taken:
+                if hold_id:
+                    Hold.fulfil(conn, [hold_id])  # The set-aside copy has been collected
+                cursor.execute('''
+                    INSERT INTO Rental (UserID, BookID, ReturnDay, Quantity)
+                    VALUES (?, ?, ?, ?)
+                ''', (self.user_id, book[0], self.return_day, self.quantity))  # Insert the rental details
+                invalidate_availability(conn, [lookup_key(self.isbn)])  # The cached copy count of this ISBN is out of date
+            commit_if_standalone(conn)  # Commit, unless the write is part of a larger unit of work; also ends the transaction a failed UPDATE opened
+            if taken:
+                return True
+        print("Not enough books available.")  # Print message if not enough books are available
+        return False
 
     @staticmethod
     def return_books(conn, user_id, isbn, return_quantity=None):
-        # Static method to return rented books
+        # Static method to return rented books, all of them when return_quantity is None
+        if return_quantity is not None and return_quantity < 1:
+            print("Invalid quantity.")
+            return 0
         cursor = conn.cursor()  # Create a cursor object to interact with the database
         cursor.execute('''
-            SELECT Rental.RentalID, Rental.BookID, Rental.Quantity, Rental.ReturnDate
+            SELECT Rental.RentalID, Rental.BookID, Rental.Quantity
             FROM Rental
             JOIN User ON Rental.UserID = User.UserID
             JOIN Book ON Rental.BookID = Book.BookID
-            WHERE User.UserID = ? AND Book.ISBN = ? AND Rental.Returned = 0
-            ORDER BY Rental.ReturnDate ASC
-        ''', (user_id, isbn))  # Execute the SQL query to get the rentals for the user and book
+            WHERE User.UserID = ? AND Book.ISBNKey = ? AND Rental.Returned = 0
+            ORDER BY Rental.ReturnDay ASC, Rental.RentalID ASC
+        ''', (user_id, lookup_key(isbn)))  # Execute the SQL query to get the rentals for the user and book
         rentals = cursor.fetchall()  # Fetch all the results of the query
         if not rentals:
             print("Error: No active rental found for this ISBN and user.")  # Print error message if no rentals found
-            return
+            return 0
         if return_quantity is None:
             return_quantity = sum(rental[2] for rental in rentals)  # Calculate the total quantity to return
         remaining_quantity_to_return = return_quantity  # Set the remaining quantity to return
         for rental in rentals:
-            rental_id, book_id, quantity, return_date = rental
+            rental_id, book_id, quantity = rental
             if remaining_quantity_to_return <= 0:
                 break  # Break the loop if no remaining quantity to return
-            if remaining_quantity_to_return >= quantity:
+            returned_now = min(quantity, remaining_quantity_to_return)  # Copies of this rental coming back
+            if returned_now == quantity:
                 cursor.execute('''
                     UPDATE Rental SET Returned = 1, Quantity = 0 WHERE RentalID = ?
                 ''', (rental_id,))  # Update the rental as returned
-                remaining_quantity_to_return -= quantity  # Decrease the remaining quantity to return
             else:
                 cursor.execute('''
                     UPDATE Rental SET Quantity = Quantity - ? WHERE RentalID = ?
-                ''', (remaining_quantity_to_return, rental_id))  # Update the rental quantity
-                remaining_quantity_to_return = 0  # Set remaining quantity to return to 0
+                ''', (returned_now, rental_id))  # Update the rental quantity
+            remaining_quantity_to_return -= returned_now  # Decrease the remaining quantity to return
             cursor.execute('''
                 UPDATE Book SET Count = Count + ? WHERE BookID = ?
-            ''', (quantity, book_id))  # Update the book count
-        conn.commit()  # Commit the transaction to save changes to the database
+            ''', (returned_now, book_id))  # Only the copies actually returned go back on the shelf
+        Hold.allocate(conn, sorted({rental[1] for rental in rentals}))  # Returned copies go to the next holds first
+        invalidate_availability(conn, [lookup_key(isbn)])  # The cached copy count of this ISBN is out of date
+        commit_if_standalone(conn)  # Commit, unless the write is part of a larger unit of work
         if remaining_quantity_to_return > 0:
             print(f"Warning: Not all requested quantities were returned. {remaining_quantity_to_return} books could not be returned.")  # Print warning if not all quantities were returned
+        return return_quantity - remaining_quantity_to_return  # Number of books actually returned
+
+    @staticmethod
+    def bulk_return(conn, items):
+        # Static method to process many returns at once, e.g. a book-drop batch. items is a list of
+        # (library_card_number, isbn, quantity) tuples, quantity None meaning "everything rented".
+        # Copies are taken from the rentals due first, exactly like return_books, but resolved with
+        # set-based statements. Returns one result dict per item. The caller commits.
+        groups = {}  # (card, isbn) -> [group_id, requested total or None]
+        for card, isbn, quantity in items:
+            if quantity is not None and quantity < 1:
+                continue  # Reported as an invalid quantity, it must not shrink the other items' total
+            group = groups.setdefault((card, isbn), [len(groups) + 1, 0])
+            group[1] = None if quantity is None or group[1] is None else group[1] + quantity
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS ReturnBatch (
+                GroupID INTEGER PRIMARY KEY, Card TEXT NOT NULL, ISBNKey, Requested INTEGER
+            )
+        ''')
+        cursor.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS ReturnAllocation (
+                RentalID INTEGER PRIMARY KEY, BookID INTEGER NOT NULL, GroupID INTEGER NOT NULL, Returned INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS temp.idx_return_allocation_group ON ReturnAllocation (GroupID)')
+        cursor.execute('DELETE FROM ReturnBatch')
+        cursor.execute('DELETE FROM ReturnAllocation')
+        cursor.executemany('''
+            INSERT INTO ReturnBatch (GroupID, Card, ISBNKey, Requested) VALUES (?, ?, ?, ?)
+        ''', [(group_id, card, lookup_key(isbn), requested) for (card, isbn), (group_id, requested) in groups.items()])  # An unknown ISBN matches no book
+        # Spread each requested quantity over the open rentals in due-date order: a rental gives back
+        # whatever is still requested after the rentals before it, at most its own quantity
+        cursor.execute('''
+            INSERT INTO ReturnAllocation (RentalID, BookID, GroupID, Returned)
+            SELECT RentalID, BookID, GroupID, Returned FROM (
+                SELECT RentalID, BookID, GroupID,
+                       CASE WHEN Requested IS NULL THEN Quantity
+                            ELSE MAX(0, MIN(Quantity, Requested - (Running - Quantity))) END AS Returned
+                FROM (
+                    SELECT Rental.RentalID, Rental.BookID, Rental.Quantity, ReturnBatch.GroupID, ReturnBatch.Requested,
+                           SUM(Rental.Quantity) OVER (
+                               PARTITION BY ReturnBatch.GroupID
+                               ORDER BY Rental.ReturnDay, Rental.RentalID
+                           ) AS Running
+                    FROM ReturnBatch
+                    JOIN User ON User.LibraryCardNumber = ReturnBatch.Card
+                    JOIN Book ON Book.ISBNKey = ReturnBatch.ISBNKey
+                    JOIN Rental ON Rental.UserID = User.UserID AND Rental.BookID = Book.BookID AND Rental.Returned = 0
+                )
+            )
+            WHERE Returned > 0
+        ''')
+        cursor.execute('''
+            UPDATE Rental
+            SET Quantity = Rental.Quantity - ReturnAllocation.Returned,
+                Returned = Rental.Quantity = ReturnAllocation.Returned
+            FROM ReturnAllocation
+            WHERE Rental.RentalID = ReturnAllocation.RentalID
+              AND Rental.RentalID IN (SELECT RentalID FROM ReturnAllocation)
+        ''')  # The IN clause makes the batch drive the update instead of a scan of Rental. Fully returned rentals end up as Returned = 1, Quantity = 0, the same as return_books
+        cursor.execute('''
+            UPDATE Book SET Count = Book.Count + Totals.Returned
+            FROM (SELECT BookID, SUM(Returned) AS Returned FROM ReturnAllocation GROUP BY BookID) AS Totals
+            WHERE Book.BookID = Totals.BookID
+        ''')  # Put the returned copies back on the shelf, one UPDATE per book
+        cursor.execute('''
+            SELECT DISTINCT BookID FROM ReturnAllocation
+            WHERE EXISTS (SELECT 1 FROM Hold WHERE Hold.BookID = ReturnAllocation.BookID AND Hold.Status = 'waiting')
+        ''')  # Only the books someone is queueing for
+        Hold.allocate(conn, [row[0] for row in cursor.fetchall()])  # Returned copies go to the next holds first
+        cursor.execute('''
+            SELECT ReturnBatch.GroupID,
+                   EXISTS (SELECT 1 FROM User WHERE User.LibraryCardNumber = ReturnBatch.Card),
+                   (SELECT SUM(Returned) FROM ReturnAllocation WHERE ReturnAllocation.GroupID = ReturnBatch.GroupID)
+            FROM ReturnBatch
+        ''')
+        outcome = {group_id: [bool(known_card), returned or 0] for group_id, known_card, returned in cursor.fetchall()}
+        invalidate_availability(conn, {lookup_key(isbn) for (card, isbn), (group_id, requested) in groups.items()
+                                       if outcome[group_id][1]})  # The cached copy counts of the returned ISBNs are out of date
+
+        report = []
+        for card, isbn, quantity in items:
+            if quantity is not None and quantity < 1:
+                report.append({'card': card, 'isbn': isbn, 'requested': quantity, 'returned': 0, 'status': 'invalid quantity'})
+                continue
+            known_card, available = outcome[groups[(card, isbn)][0]]
+            returned = available if quantity is None else min(quantity, available)
+            outcome[groups[(card, isbn)][0]][1] -= returned  # Later items of the same card and ISBN get the rest
+            if not known_card:
+                status = 'unknown card'
+            elif returned == 0:
+                status = 'not rented'
+            elif quantity is not None and returned < quantity:
+                status = 'partial'
+            else:
+                status = 'returned'
+            report.append({'card': card, 'isbn': isbn, 'requested': quantity, 'returned': returned, 'status': status})
+        return report
+
+    @staticmethod
+    def checkout(conn, user_id, items, return_date=None, all_or_nothing=False):
+        # Static method to rent a cart of books to one patron, whose eligibility the caller has checked.
+        # items is a list of (isbn, quantity) tuples; the availability of every ISBN is read with one
+        # query and the copies of an edition listed more than once, under any form of its ISBN, are handed
+        # out in item order. The copies
+        # are taken with conditional UPDATEs, so the shelf never goes negative even when another process
+        # got there first. With all_or_nothing, nothing is rented unless every item can be.
+        # Returns one result dict per item.
+        return_day = to_day(return_date or add_one_month(date.today()))
+        keys = {isbn: lookup_key(isbn) for isbn, quantity in items}
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('''
+            SELECT ISBNKey, BookID, Count FROM Book
+            WHERE ISBNKey IN (SELECT value FROM json_each(?))
+        ''', (json.dumps(sorted({key for key in keys.values() if key is not None}, key=str)),))  # One probe of idx_book_isbn_key per distinct edition
+        books = {key: [book_id, count] for key, book_id, count in cursor.fetchall()}
+        shelf = {isbn: books[key] for isbn, key in keys.items() if key in books}  # Forms of one ISBN share one entry
+        cursor.execute('''
+            SELECT BookID, HoldID FROM Hold
+            WHERE BookID IN (SELECT value FROM json_each(?)) AND Status = 'ready' AND UserID = ?
+        ''', (json.dumps([book[0] for book in books.values()]), user_id))
+        held = dict(cursor.fetchall())  # BookID -> the patron's ready hold, whose set-aside copy the cart can take
+        for book in books.values():
+            if book[0] in held:
+                book[1] += 1
+
+        report = []
+        for isbn, quantity in items:
+            book = shelf.get(isbn)
+            if quantity is None or quantity < 1:
+                status = 'invalid quantity'
+            elif book is None:
+                status = 'not found'
+            elif book[1] < quantity:
+                status = 'not enough copies'
+            else:
+                book[1] -= quantity  # Later items of the same ISBN get the rest
+                status = 'rented'
+            report.append({'isbn': isbn, 'requested': quantity, 'rented': quantity if status == 'rented' else 0, 'status': status})
+        if all_or_nothing and any(result['status'] != 'rented' for result in report):
+            for result in report:
+                if result['status'] == 'rented':
+                    result['rented'], result['status'] = 0, 'cancelled'
+            return report
+
+        rented = [result for result in report if result['rented']]
+        taken = {}  # BookID -> copies the cart takes from it
+        for result in rented:
+            book_id = shelf[result['isbn']][0]
+            taken[book_id] = taken.get(book_id, 0) + result['rented']
+        for book_id in taken:
+            if book_id in held:
+                taken[book_id] -= 1  # The set-aside copy is already off the shelf
+        lost = set()  # Books whose copies another desk took after the read above
+        for book_id, copies in taken.items():
+            if not copies:
+                continue
+            cursor.execute('''
+                UPDATE Book SET Count = Count - ? WHERE BookID = ? AND Count >= ?
+            ''', (copies, book_id, copies))  # One conditional UPDATE per book, however many items named it
+            if not cursor.rowcount:
+                lost.add(book_id)
+        if lost:
+            # Only possible when the caller did not hold the write lock since the read (see db.run_immediate)
+            for result in rented:
+                if shelf[result['isbn']][0] in lost:
+                    result['rented'], result['status'] = 0, 'not enough copies'
+            if all_or_nothing:
+                cursor.executemany('''
+                    UPDATE Book SET Count = Count + ? WHERE BookID = ?
+                ''', [(copies, book_id) for book_id, copies in taken.items() if book_id not in lost])  # Put the copies already taken back
+                for result in rented:
+                    if result['status'] == 'rented':
+                        result['rented'], result['status'] = 0, 'cancelled'
+            rented = [result for result in rented if result['rented']]
+        if rented:
+            Hold.fulfil(conn, {held[book_id] for book_id in taken if book_id in held and book_id not in lost})  # The set-aside copies have been collected
+            cursor.executemany('''
+                INSERT INTO Rental (UserID, BookID, ReturnDay, Quantity)
+                VALUES (?, ?, ?, ?)
+            ''', [(user_id, shelf[result['isbn']][0], return_day, result['rented']) for result in rented])
+            invalidate_availability(conn, {keys[result['isbn']] for result in rented})  # The cached copy counts of these ISBNs are out of date
+        commit_if_standalone(conn)  # Commit, unless the write is part of a larger unit of work
+        return report
 
     @staticmethod
     def list_overdue(conn):
@@ -86,9 +297,9 @@ class Rental:
             FROM Rental
             JOIN User ON Rental.UserID = User.UserID
             JOIN Book ON Rental.BookID = Book.BookID
-            WHERE Rental.ReturnDate < ? AND Rental.Returned = 0
-        ''', (datetime.today().strftime('%Y-%m-%d'),))  # Execute the SQL query to select overdue rentals
-        return cursor.fetchall()  # Fetch and return all the results of the query
+            WHERE Rental.ReturnDay < ? AND Rental.Returned = 0
+        ''', (today_day(),))  # An integer range of idx_rental_due
+        return checked(cursor, RentalRow).fetchall()  # Fetch and return all the results of the query
 
     @staticmethod
     def list_all_rented_books(conn):
@@ -108,7 +319,7 @@ class Rental:
             JOIN Book ON Rental.BookID = Book.BookID
             WHERE Rental.Returned = 0
         ''')  # Execute the SQL query to select all rented books
-        return cursor.fetchall()  # Fetch and return all the results of the query
+        return checked(cursor, RentalRow).fetchall()  # Fetch and return all the results of the query
 
     @staticmethod
     def total_overdue(conn):
@@ -117,8 +328,8 @@ class Rental:
         cursor.execute('''
             SELECT SUM(Quantity) as TotalOverdue
             FROM Rental
-            WHERE ReturnDate < ? AND Returned = 0
-        ''', (datetime.today().strftime('%Y-%m-%d'),))  # Execute the SQL query to get the total quantity of overdue books
+            WHERE ReturnDay < ? AND Returned = 0
+        ''', (today_day(),))  # An integer range of idx_rental_due
         return cursor.fetchone()  # Fetch and return the result of the query
 
     @staticmethod
@@ -146,18 +357,132 @@ class Rental:
             WHERE 
                 User.UserID = ? AND Rental.Returned = 0
         ''', (user_id,))  # Execute the SQL query to select all rented books by the user
-        return cursor.fetchall()  # Fetch and return all the results of the query
+        return checked(cursor, UserRentalRow).fetchall()  # Fetch and return all the results of the query
 
     @staticmethod
-    def top_books_by_genre(conn):
-        # Static method to get the top rented books by genre
+    def page_overdue(conn, after_id=0, page_size=100, today=None):
+        # Static method to get one page of overdue rentals in RentalID order, starting after the rental after_id.
+        # Returns (rows, next_after_id), next_after_id being None after the last page.
+        today = to_day(today) if today is not None else today_day()
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('''
+            SELECT
+                Rental.RentalID,
+                User.LibraryCardNumber,
+                Book.ISBN,
+                Rental.RentalDate,
+                Rental.ReturnDate,
+                Rental.Returned,
+                Rental.Quantity
+            FROM Rental
+            JOIN User ON Rental.UserID = User.UserID
+            JOIN Book ON Rental.BookID = Book.BookID
+            WHERE Rental.RentalID > ? AND Rental.ReturnDay < ? AND Rental.Returned = 0
+            ORDER BY Rental.RentalID
+            LIMIT ?
+        ''', (after_id, today, page_size))  # Keyset pagination: the primary key picks up where the last page ended
+        rows = checked(cursor, RentalRow).fetchall()  # Fetch one page of results
+        return rows, next_token(rows, page_size)
+
+    @staticmethod
+    def iter_overdue(conn, page_size=1000, after_id=0):
+        # Static method to iterate over all overdue rentals one page at a time, so memory use stays flat
+        today = today_day()  # The same cut-off for every page
+        return iterate_pages(lambda after: Rental.page_overdue(conn, after, page_size, today), after_id)
+
+    @staticmethod
+    def page_due_soon(conn, days=3, after_id=0, page_size=100, today=None):
+        # Static method to get one page of open rentals due from today through the next days days, in
+        # RentalID order. Returns (rows, next_after_id), next_after_id being None after the last page.
+        today = to_day(today) if today is not None else today_day()
         cursor = conn.cursor()  # Create a cursor object to interact with the database
         cursor.execute('''
-            SELECT b.Genre, SUM(r.Quantity) as TotalRented
-            FROM Rental r
-            JOIN Book b ON r.BookID = b.BookID
-            GROUP BY b.Genre
-            ORDER BY TotalRented DESC
-            LIMIT 5
-        ''')  # Execute the SQL query to get the top rented books by genre
-        return cursor.fetchall()  # Fetch and return all the results of the query
+            SELECT
+                Rental.RentalID,
+                User.LibraryCardNumber,
+                Book.ISBN,
+                Rental.RentalDate,
+                Rental.ReturnDate,
+                Rental.Returned,
+                Rental.Quantity
+            FROM Rental
+            JOIN User ON Rental.UserID = User.UserID
+            JOIN Book ON Rental.BookID = Book.BookID
+            WHERE Rental.RentalID > ? AND Rental.Returned = 0 AND Rental.ReturnDay BETWEEN ? AND ?
+            ORDER BY Rental.RentalID
+            LIMIT ?
+        ''', (after_id, today, today + days, page_size))  # An integer range of idx_rental_due
+        rows = checked(cursor, RentalRow).fetchall()  # Fetch one page of results
+        return rows, next_token(rows, page_size)
+
+    @staticmethod
+    def iter_due_soon(conn, days=3, page_size=1000, after_id=0):
+        # Static method to iterate over all rentals due in the next days days one page at a time
+        today = today_day()  # The same window for every page
+        return iterate_pages(lambda after: Rental.page_due_soon(conn, days, after, page_size, today), after_id)
+
+    @staticmethod
+    def page_rented(conn, after_id=0, page_size=100):
+        # Static method to get one page of open rentals in RentalID order, starting after the rental after_id.
+        # Returns (rows, next_after_id), next_after_id being None after the last page.
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('''
+            SELECT
+                Rental.RentalID,
+                User.LibraryCardNumber,
+                Book.ISBN,
+                Rental.RentalDate,
+                Rental.ReturnDate,
+                Rental.Returned,
+                Rental.Quantity
+            FROM Rental
+            JOIN User ON Rental.UserID = User.UserID
+            JOIN Book ON Rental.BookID = Book.BookID
+            WHERE Rental.RentalID > ? AND +Rental.Returned = 0
+            ORDER BY Rental.RentalID
+            LIMIT ?
+        ''', (after_id, page_size))  # Walks the primary key from after_id; "+" keeps idx_rental_due, which would sort every open rental per page, out of it. A page costs the rows it steps over, which archiving keeps few
+        rows = checked(cursor, RentalRow).fetchall()  # Fetch one page of results
+        return rows, next_token(rows, page_size)
+
+    @staticmethod
+    def iter_rented(conn, page_size=1000, after_id=0):
+        # Static method to iterate over all open rentals one page at a time, so memory use stays flat
+        return iterate_pages(lambda after: Rental.page_rented(conn, after, page_size), after_id)
+
+    @staticmethod
+    def page_rented_by_user(conn, user_id, after_id=0, page_size=100):
+        # Static method to get one page of a user's rented books, in the same columns as list_rented_by_user.
+        # Pages follow RentalID order; returns (rows, next_after_id), next_after_id being None after the last page.
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('''
+            SELECT
+                Book.BookID,
+                Book.Title,
+                Book.Author,
+                Book.Year,
+                Book.Genre,
+                Book.ISBN,
+                Rental.RentalDate,
+                Rental.ReturnDate,
+                Rental.Quantity,
+                Rental.Returned,
+                Rental.RentalID
+            FROM Rental
+            JOIN Book ON Rental.BookID = Book.BookID
+            WHERE Rental.UserID = ? AND Rental.Returned = 0 AND Rental.RentalID > ?
+            ORDER BY Rental.RentalID
+            LIMIT ?
+        ''', (user_id, after_id, page_size))  # idx_rental_user finds the user's open rentals; the few there are get sorted by RentalID
+        rows = checked(cursor, UserRentalRow, extra=1).fetchall()  # Fetch one page of results, RentalID last
+        return [row[:-1] for row in rows], next_token(rows, page_size, key=lambda row: row[-1])
+
+    @staticmethod
+    def iter_rented_by_user(conn, user_id, page_size=1000, after_id=0):
+        # Static method to iterate over all books rented by a user one page at a time
+        return iterate_pages(lambda after: Rental.page_rented_by_user(conn, user_id, after, page_size), after_id)
+
+    @staticmethod
+    def top_books_by_genre(conn):
+        # Static method to get the top rented books by genre, read from the trigger-maintained GenreStats summary
+        return GenreStats.top_rented(conn)
@@ -0,0 +1,67 @@
+import json
+from db import commit_if_standalone
+from .paging import iterate_pages, next_token
+from .rows import UserRentalRow, checked
+
+
+class RentalArchive:
+    # Closed rentals moved out of Rental, so the open-loan queries only walk rows that can still
+    # change. The RentalHistory view (see db/migrations.py) reads Rental and RentalArchive together.
+
+    @staticmethod
+    def archive_batch(conn, before_day, batch_size=1000):
+        # Static method to move up to batch_size returned rentals due before the day number before_day
+        # from Rental into RentalArchive. Moved rows leave the front of idx_rental_due, so every batch
+        # starts at the front again. Returns the number of rentals moved; the caller commits.
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('''
+            SELECT RentalID FROM Rental
+            WHERE Returned = 1 AND ReturnDay < ?
+            ORDER BY ReturnDay
+            LIMIT ?
+        ''', (before_day, batch_size))  # Walks the front of idx_rental_due, no sort
+        rental_ids = json.dumps([row[0] for row in cursor.fetchall()])
+        cursor.execute('''
+            INSERT INTO RentalArchive (RentalID, UserID, BookID, RentalDay, ReturnDay)
+            SELECT RentalID, UserID, BookID, RentalDay, ReturnDay FROM Rental
+            WHERE RentalID IN (SELECT value FROM json_each(?))
+        ''', (rental_ids,))
+        moved = cursor.rowcount
+        cursor.execute('''
+            DELETE FROM Rental WHERE RentalID IN (SELECT value FROM json_each(?))
+        ''', (rental_ids,))
+        commit_if_standalone(conn)  # Commit, unless the batch is part of a larger unit of work
+        return moved
+
+    @staticmethod
+    def page_history_by_user(conn, user_id, after_id=0, page_size=100):
+        # Static method to get one page of every rental a user ever made, open, returned or archived,
+        # in the columns of Rental.list_rented_by_user. Pages follow RentalID order; returns
+        # (rows, next_after_id), next_after_id being None after the last page.
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('''
+            SELECT
+                Book.BookID,
+                Book.Title,
+                Book.Author,
+                Book.Year,
+                Book.Genre,
+                Book.ISBN,
+                RentalHistory.RentalDate,
+                RentalHistory.ReturnDate,
+                RentalHistory.Quantity,
+                RentalHistory.Returned,
+                RentalHistory.RentalID
+            FROM RentalHistory
+            JOIN Book ON RentalHistory.BookID = Book.BookID
+            WHERE RentalHistory.UserID = ? AND RentalHistory.RentalID > ?
+            ORDER BY RentalHistory.RentalID
+            LIMIT ?
+        ''', (user_id, after_id, page_size))  # Each half of the view is searched by its user index, then the rows are sorted by RentalID
+        rows = checked(cursor, UserRentalRow, extra=1).fetchall()  # Fetch one page of results, RentalID last
+        return [row[:-1] for row in rows], next_token(rows, page_size, key=lambda row: row[-1])
+
+    @staticmethod
+    def iter_history_by_user(conn, user_id, page_size=1000, after_id=0):
+        # Static method to iterate over a user's whole rental history one page at a time
+        return iterate_pages(lambda after: RentalArchive.page_history_by_user(conn, user_id, after, page_size), after_id)
@@ -0,0 +1,38 @@
+from collections import namedtuple  # Import namedtuple for the compact, tuple-compatible row types
+
+# Row types of the listing queries, naming their columns in order (row.isbn is row[5] of a BookRow).
+# The listings return the plain tuples sqlite3 produces: a Python row_factory would cost a call per
+# row, which made a large listing close to twice as slow. checked(cursor, RowType) instead compares
+# the number of columns of the cursor's statement with the fields once per statement, so a query
+# returning extra columns fails instead of misaligning. as_row builds a named row from a tuple where
+# the rows are rebuilt in Python anyway, e.g. the scored fuzzy search results; dropping a page's
+# keyset column is a plain slice and keeps the tuples.
+
+BookRow = namedtuple('BookRow', 'book_id title author year genre isbn count')
+RentalRow = namedtuple('RentalRow', 'rental_id library_card_number isbn rental_date return_date returned quantity')
+UserRentalRow = namedtuple('UserRentalRow', 'book_id title author year genre isbn rental_date return_date quantity returned')
+LibrarianRow = namedtuple('LibrarianRow', 'librarian_id username password fullname')
+HoldRow = namedtuple('HoldRow', 'hold_id isbn title status position placed_date expires_date')
+BookMatchRow = namedtuple('BookMatchRow', BookRow._fields + ('similarity',))  # A fuzzy search result and its score
+
+_new = tuple.__new__  # Builds a row type from a tuple without going through its generated __new__
+
+
+def _width_error(row_type, width):
+    # The error for a row whose values do not line up with row_type's fields, e.g. a SELECT * after a column was added
+    return ValueError(f"{row_type.__name__} has {len(row_type._fields)} fields, the row has {width} values")
+
+
+def checked(cursor, row_type, extra=0):
+    # cursor, after checking that its statement returns row_type's columns, plus extra trailing
+    # columns the caller strips off again (e.g. the keyset token of a page)
+    if cursor.description is not None and len(cursor.description) != len(row_type._fields) + extra:
+        raise _width_error(row_type, len(cursor.description) - extra)
+    return cursor
+
+
+def as_row(row_type, row):
+    # A row_type built from an already fetched tuple
+    if len(row) != len(row_type._fields):
+        raise _width_error(row_type, len(row))
+    return _new(row_type, row)
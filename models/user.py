@@ -1,84 +1,87 @@
 import uuid  # Import the uuid module to generate unique identifiers
-from datetime import datetime, date  # Import datetime and date classes from the datetime module
-from utils.utils import add_one_year  # Import the add_one_year function from the utils.utils module
+from datetime import datetime  # Import the datetime class from the datetime module
+from utils.utils import add_one_year, to_day, today_day  # Import the date helpers from the utils.utils module
+from db import commit_if_standalone  # Import the helper that lets writes join a unit of work
 
 class User:
-    def __init__(self, fullname):
-        # Constructor to initialize the User object with a full name
-        self.library_card_number = str(uuid.uuid4())  # Generate a unique library card number
-        self.fullname = fullname  # Set the full name of the user
-        self.valid_until = add_one_year(datetime.today()).strftime('%Y-%m-%d')  # Set the validity date to one year from today
+    __slots__ = ('user_id', 'library_card_number', 'fullname', 'valid_until')  # No per-instance __dict__
+
+    def __init__(self, fullname, library_card_number, valid_until, user_id=None):
+        # Constructor to initialize the User object from its fields; use create() for a new patron
+        self.user_id = user_id  # None until the user is loaded from the database
+        self.library_card_number = library_card_number
+        self.fullname = fullname
+        self.valid_until = valid_until
+
+    @classmethod
+    def create(cls, fullname):
+        # Constructor for a new patron: a fresh library card valid for one year from today
+        return cls(fullname, str(uuid.uuid4()), add_one_year(datetime.today()).strftime('%Y-%m-%d'))
+
+    @staticmethod
+    def _row_factory(cursor, row):
+        # sqlite3 row_factory building a loaded patron from a (UserID, LibraryCardNumber, FullName, ValidUntil) row
+        return User(row[2], row[1], row[3], row[0])
 
     def save(self, conn):
         # Method to save the user details into the database
         cursor = conn.cursor()  # Create a cursor object to interact with the database
         cursor.execute('''
-            INSERT INTO User (LibraryCardNumber, FullName, ValidUntil)
+            INSERT INTO User (LibraryCardNumber, FullName, ValidUntilDay)
             VALUES (?, ?, ?)
-        ''', (self.library_card_number, self.fullname, self.valid_until))  # Execute the SQL query to insert user details
-        conn.commit()  # Commit the transaction to save changes to the database
+        ''', (self.library_card_number, self.fullname, to_day(self.valid_until)))  # Execute the SQL query to insert user details
+        commit_if_standalone(conn)  # Commit, unless the write is part of a larger unit of work
 
     @staticmethod
     def authenticate(conn, library_card_number):
-        # Static method to authenticate a user using their library card number
-        cursor = conn.cursor()  # Create a cursor object to interact with the database
-        cursor.execute('''
-            SELECT * FROM User WHERE LibraryCardNumber=?
-        ''', (library_card_number,))  # Execute the SQL query to select a user with the matching library card number
-        return cursor.fetchone()  # Fetch and return the result of the query (None if no match found)
+        # Static method to authenticate a user using their library card number; returns the User, or None
+        return User.get_by_library_card(conn, library_card_number)
 
     @staticmethod
     def get_by_library_card(conn, library_card_number):
         # Static method to get a user by their library card number
         cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.row_factory = User._row_factory  # Rows come back as User objects
         cursor.execute('''
-            SELECT * FROM User WHERE LibraryCardNumber=?
+            SELECT UserID, LibraryCardNumber, FullName, ValidUntil FROM User WHERE LibraryCardNumber=?
         ''', (library_card_number,))  # Execute the SQL query to select a user with the matching library card number
-        row = cursor.fetchone()  # Fetch the result of the query
-        if row:
-            user = User(row[2])  # Use the full name from the row to initialize the User object
-            user.user_id = row[0]  # Set the user ID
-            user.library_card_number = row[1]  # Set the library card number
-            user.valid_until = row[3]  # Set the validity date
-            return user  # Return the User object
-        return None  # Return None if no user is found
+        return cursor.fetchone()  # The User, or None if no user is found
 
     @staticmethod
     def check_rental_status(conn, library_card_number):
-        # Static method to check if a user has any overdue rentals
+        # Static method to check if a user has any overdue rentals, answered by one indexed EXISTS probe
+        cursor = conn.cursor()  # Create a cursor object to interact with the database
+        cursor.execute('''
+            SELECT EXISTS (
+                SELECT 1 FROM User
+                JOIN Rental ON Rental.UserID = User.UserID
+                WHERE User.LibraryCardNumber = ? AND Rental.Returned = 0 AND Rental.ReturnDay < ?
+            )
+        ''', (library_card_number, today_day()))  # Stops at the first overdue rental, if any
+        return bool(cursor.fetchone()[0])  # True when there is an overdue book
+
+    @staticmethod
+    def get_borrowing_status(conn, library_card_number):
+        # Static method answering "can this patron borrow?" in one query: returns (user_id, has_overdue),
+        # or None when the card is unknown
         cursor = conn.cursor()  # Create a cursor object to interact with the database
         cursor.execute('''
-            SELECT Rental.RentalID, Rental.BookID, Rental.Quantity, Rental.ReturnDate
-            FROM Rental
-            JOIN User ON Rental.UserID = User.UserID
-            WHERE User.LibraryCardNumber = ? AND Rental.Returned = 0
-            ORDER BY Rental.ReturnDate ASC
-        ''', (library_card_number,))  # Execute the SQL query to select rentals for the user that are not returned
-        rentals = cursor.fetchall()  # Fetch all the results of the query
-        today = date.today()  # Get today's date
-        
-        for rental in rentals:
-            rental_id, book_id, quantity, return_date = rental  # Unpack the rental details
-            return_date = date.fromisoformat(return_date)  # Convert the return date to a date object
-            if return_date < today:
-                return True  # There is an overdue book
-        
-        return False  # No overdue books
+            SELECT User.UserID, EXISTS (
+                SELECT 1 FROM Rental
+                WHERE Rental.UserID = User.UserID AND Rental.Returned = 0 AND Rental.ReturnDay < ?
+            )
+            FROM User WHERE User.LibraryCardNumber = ?
+        ''', (today_day(), library_card_number))
+        row = cursor.fetchone()
+        return (row[0], bool(row[1])) if row else None
 
     def has_overdue_books(self, conn):
-        # Method to check if the user has any overdue books
+        # Method to check if the user has any overdue books, answered by one indexed EXISTS probe
         cursor = conn.cursor()  # Create a cursor object to interact with the database
         cursor.execute('''
-            SELECT Rental.RentalID, Rental.BookID, Rental.Quantity, Rental.ReturnDate
-            FROM Rental
-            JOIN User ON Rental.UserID = User.UserID
-            WHERE User.UserID = ? AND Rental.Returned = 0
-            ORDER BY Rental.ReturnDate ASC
-        ''', (self.user_id,))  # Execute the SQL query to select rentals for the user that are not returned
-        rentals = cursor.fetchall()  # Fetch all the results of the query
-        today = datetime.today().date()  # Get today's date as a date object
-        for rental in rentals:
-            rental_id, book_id, quantity, return_date = rental  # Unpack the rental details
-            if datetime.strptime(return_date, '%Y-%m-%d').date() < today:
-                return True  # There is an overdue book
-        return False  # No overdue books
+            SELECT EXISTS (
+                SELECT 1 FROM Rental
+                WHERE UserID = ? AND Returned = 0 AND ReturnDay < ?
+            )
+        ''', (self.user_id, today_day()))  # Seeks straight into idx_rental_user
+        return bool(cursor.fetchone()[0])  # True when there is an overdue book
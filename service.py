@@ -0,0 +1,247 @@
+import asyncio  # Import asyncio to serve many connections from one thread
+import json  # Import json to encode requests and responses
+import re  # Import re to match request paths
+from concurrent.futures import ThreadPoolExecutor  # Import the executor that runs the blocking sqlite work
+from http import HTTPStatus  # Import HTTPStatus for reason phrases
+from urllib.parse import urlsplit, parse_qs, unquote  # Import URL helpers to read paths and query strings
+
+from library import BOOK_HEADERS, RENTAL_HEADERS  # Import the column names of the listings
+from models import Book, Rental  # Import the model classes used by the read endpoints
+
+# JSON/HTTP front-end for Library, built on asyncio streams so it needs nothing beyond the
+# standard library. Blocking sqlite calls run on a bounded thread pool. Reads are answered with 504
+# when they take longer than the timeout; writes are not timed out, since the job running one cannot
+# be cancelled and could still commit after the client was told it failed.
+#
+#   GET  /books/search?q=<text>&limit=<n>   ranked title/author/genre search
+#   GET  /books/<isbn>/availability          copies on the shelf
+#   POST /rentals  {"card", "isbn", "quantity", "return_date"}
+#   POST /returns  {"card", "isbn", "quantity"}
+#   GET  /rentals/overdue?after=<id>&limit=<n>  overdue rentals, one keyset page; pass next_after back for more
+#   GET  /charts/genres                      top genres in the catalog and by rentals
+
+MAX_BODY = 1024 * 1024  # Largest request body accepted, in bytes
+MAX_PAGE = 5000  # Largest page of a paginated listing
+
+
+class HTTPError(Exception):
+    # Error that becomes an HTTP response with a JSON {"error": ...} body
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _rows(columns, rows):
+    # Turn result tuples into JSON objects
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def _int(value, name, default=None, minimum=None):
+    # Read an optional integer parameter, no smaller than minimum when one is given
+    if value is None or value == '':
+        return default
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"'{name}' must be an integer")
+    if minimum is not None and number < minimum:
+        raise HTTPError(400, f"'{name}' must be at least {minimum}")
+    return number
+
+
+class LibraryService:
+    def __init__(self, library, workers=8, timeout=5.0, queue_limit=None):
+        # library: the Library to serve; workers: threads running sqlite work;
+        # timeout: seconds before a read is answered with 504; queue_limit: requests allowed
+        # to run or wait for a worker before new ones get 503 (default 4 per worker)
+        self.library = library
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='library-service')
+        self.slots = asyncio.Semaphore(queue_limit or workers * 4)
+        self.routes = [
+            ('GET', re.compile(r'^/books/search$'), self.search),
+            ('GET', re.compile(r'^/books/(?P<isbn>[^/]+)/availability$'), self.availability),
+            ('POST', re.compile(r'^/rentals$'), self.rent),
+            ('POST', re.compile(r'^/returns$'), self.return_books),
+            ('GET', re.compile(r'^/rentals/overdue$'), self.overdue),
+            ('GET', re.compile(r'^/charts/genres$'), self.top_charts),
+        ]
+
+    # Endpoint handlers. They run on the executor threads and may block on sqlite.
+
+    def search(self, params, body):
+        term = params.get('q', '')
+        limit = _int(params.get('limit'), 'limit', 50)
+        with self.library.db.reader() as conn:
+            return 200, {'books': _rows(BOOK_HEADERS, Book.search(conn, term, limit))}
+
+    def availability(self, params, body):
+        isbn = params['isbn']
+        return 200, {'isbn': isbn, 'available': self.library.return_available_books(isbn)}
+
+    def rent(self, params, body):
+        card, isbn = body.get('card'), body.get('isbn')
+        if not card or not isbn:
+            raise HTTPError(400, "'card' and 'isbn' are required")
+        quantity = _int(body.get('quantity'), 'quantity', 1, minimum=1)
+        if self.library.authenticate_user(card) is None:
+            raise HTTPError(404, "User not found")
+        if not self.library.rent_book(card, isbn, body.get('return_date'), quantity):
+            raise HTTPError(409, "The patron has overdue books or there are not enough copies available")
+        return 201, {'card': card, 'isbn': isbn, 'quantity': quantity}
+
+    def return_books(self, params, body):
+        card, isbn = body.get('card'), body.get('isbn')
+        if not card or not isbn:
+            raise HTTPError(400, "'card' and 'isbn' are required")
+        quantity = _int(body.get('quantity'), 'quantity', minimum=1)
+        if self.library.authenticate_user(card) is None:
+            raise HTTPError(404, "User not found")
+        returned = self.library.return_book(card, isbn, quantity)
+        if not returned:
+            raise HTTPError(409, "No active rental found for this ISBN and user")
+        return 200, {'card': card, 'isbn': isbn, 'returned': returned}
+
+    def overdue(self, params, body):
+        after_id = _int(params.get('after'), 'after', 0)
+        limit = max(1, min(_int(params.get('limit'), 'limit', 500), MAX_PAGE))
+        with self.library.db.reader() as conn:
+            rows, next_after = Rental.page_overdue(conn, after_id, limit)
+        return 200, {'rentals': _rows(RENTAL_HEADERS, rows), 'next_after': next_after}
+
+    def top_charts(self, params, body):
+        with self.library.db.reader() as conn:
+            library_chart = Book.top_books_by_genre(conn)
+            rented_chart = Rental.top_books_by_genre(conn)
+        return 200, {
+            'library': [{'genre': genre, 'total_books': total} for genre, total in library_chart],
+            'rented': [{'genre': genre, 'total_rented': total} for genre, total in rented_chart],
+        }
+
+    # Request plumbing
+
+    async def dispatch(self, method, target, body):
+        # Route one request and run its handler on the executor; returns (status, payload)
+        url = urlsplit(target)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        path = unquote(url.path)
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if not match:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            params.update(match.groupdict())
+            if self.slots.locked():
+                return 503, {'error': "Server is busy, try again later"}
+            job = await self.submit(handler, params, body)
+            try:
+                if method != 'GET':
+                    return await asyncio.shield(job)  # A write is waited for: it may commit whatever the client is told
+                return await asyncio.wait_for(asyncio.shield(job), self.timeout)
+            except asyncio.TimeoutError:
+                return 504, {'error': f"Request took longer than {self.timeout}s"}
+            except HTTPError as error:
+                return error.status, {'error': error.message}
+            except Exception as error:
+                return 500, {'error': f"{type(error).__name__}: {error}"}
+        if allowed:
+            return 405, {'error': "Method not allowed"}
+        return 404, {'error': "Not found"}
+
+    async def submit(self, handler, params, body):
+        # Run a handler on the executor. The job holds a slot until it is done, not just until its
+        # request was answered, so queue_limit bounds the work the threads really have in hand.
+        await self.slots.acquire()
+        try:
+            job = asyncio.get_running_loop().run_in_executor(self.executor, handler, params, body)
+        except BaseException:
+            self.slots.release()
+            raise
+        job.add_done_callback(self._finished)
+        return job
+
+    def _finished(self, job):
+        # Done callback of a job: free its slot and collect an error nobody waited for
+        self.slots.release()
+        if not job.cancelled():
+            job.exception()
+
+    async def handle_connection(self, reader, writer):
+        # Serve HTTP/1.1 requests on one connection until the client closes it
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self.send(writer, 400, {'error': "Malformed request line"}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                length = _int(headers.get('content-length'), 'Content-Length', 0)
+                if length > MAX_BODY:
+                    await self.send(writer, 413, {'error': "Request body too large"}, False)
+                    break
+                raw = await reader.readexactly(length) if length else b''
+                try:
+                    body = json.loads(raw) if raw else {}
+                    if not isinstance(body, dict):
+                        raise ValueError
+                except ValueError:
+                    status, payload = 400, {'error': "Body must be a JSON object"}
+                else:
+                    status, payload = await self.dispatch(method.upper(), target, body)
+                await self.send(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, HTTPError):
+            pass  # Client went away or sent garbage; nothing left to answer
+        finally:
+            writer.close()
+
+    async def send(self, writer, status, payload, keep_alive):
+        # Write one JSON response
+        data = json.dumps(payload).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + data)
+        await writer.drain()
+
+    async def start(self, host='127.0.0.1', port=8080):
+        # Start listening and return the asyncio server
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self):
+        # Stop the worker threads
+        self.executor.shutdown(wait=True)
+
+
+def serve(library, host='127.0.0.1', port=8080, workers=8, timeout=5.0):
+    # Run the service until interrupted
+    async def run():
+        service = LibraryService(library, workers, timeout)
+        server = await service.start(host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            service.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,59 @@
+import itertools  # Import itertools to number the timed calls
+
+import pytest  # Import pytest for the fixtures and marks
+
+from benchmarks import suite  # Import the benchmark cases of every Library operation
+from benchmarks.datagen import generate  # Import the synthetic data generator
+from library import Library  # Import the Library facade being measured
+
+# The cases of benchmarks/suite.py under pytest-benchmark, against a small generated database.
+# Needs the pytest-benchmark plugin (pip install pytest-benchmark); without it only the coverage
+# test runs. Machine-readable results and comparisons come from the plugin:
+#
+#     python -m pytest tests/test_benchmarks.py --benchmark-json=results.json
+#     python -m pytest tests/test_benchmarks.py --benchmark-compare
+#
+# Larger databases and more calls per case: python -m benchmarks.suite --books 100000
+
+BOOKS = 2000  # Books in the generated database
+SEED = 42  # Seed for the data and the operations
+REPEAT = 20  # Timed calls per fast operation
+
+
+@pytest.fixture
+def timer(request):
+    # The benchmark fixture of the pytest-benchmark plugin; the case is skipped when the plugin is not there
+    if not request.config.pluginmanager.hasplugin('benchmark'):
+        pytest.skip("needs the pytest-benchmark plugin")
+    return request.getfixturevalue('benchmark')
+
+
+@pytest.fixture(scope='module')
+def workload(tmp_path_factory):
+    # A Library on a generated database and the suite's context, shared by the cases in order
+    scratch = tmp_path_factory.mktemp('suite')
+    counts = generate(str(scratch / 'library.db'), BOOKS, seed=SEED)
+    library = Library(str(scratch / 'library.db'))
+    yield library, suite.Context(library, counts, SEED, str(scratch))
+    library.close()
+
+
+def test_every_operation_has_a_case():
+    covered = {method for spec in suite.CASES for method in spec['covers']}
+    assert sorted(suite.public_methods() - covered) == []
+
+
+@pytest.mark.parametrize('spec', suite.CASES, ids=[spec['name'] for spec in suite.CASES])
+def test_operation(timer, workload, spec):
+    library, ctx = workload
+    prepare, run = spec['build'](library, ctx)
+    calls = itertools.count()
+
+    def setup():
+        i = next(calls)
+        if prepare:
+            prepare(i)  # Untimed, like in the suite
+        return (i,), {}
+
+    timer.group = spec['covers'][0]
+    timer.pedantic(run, setup=setup, rounds=spec['repeat'] or REPEAT)
@@ -0,0 +1,79 @@
+import random  # Import random for the seeded workload
+
+import pytest  # Import pytest for the fixtures
+
+from benchmarks.datagen import isbn13  # Import isbn13 to give the books valid ISBNs
+from library import Library  # Import the Library facade the workload runs through
+from models import GenreStats  # Import GenreStats, the summary under test
+
+# Consistency tests for the trigger-maintained GenreStats summary: after every kind of write the
+# summary and the top charts must match a full aggregation of Book and Rental.
+
+GENRES = ['Fiction', 'History', 'Science', 'Poetry', None]
+
+
+@pytest.fixture
+def library(tmp_path):
+    library = Library(str(tmp_path / 'library.db'))
+    yield library
+    library.close()
+
+
+def assert_consistent(library):
+    # The summary matches the base tables, and both charts are the top genres of the full aggregation
+    with library.db.reader() as conn:
+        assert GenreStats.verify(conn) == []
+        books = dict(conn.execute('SELECT Genre, SUM(Count) FROM Book GROUP BY Genre').fetchall())
+        rented = dict(conn.execute('''
+            SELECT Book.Genre, SUM(Rental.Quantity) FROM Rental JOIN Book ON Book.BookID = Rental.BookID GROUP BY Book.Genre
+        ''').fetchall())
+        for chart, totals in ((GenreStats.top_books(conn), books), (GenreStats.top_rented(conn), rented)):
+            assert all(totals[genre] == total for genre, total in chart)
+            assert [total for genre, total in chart] == sorted(totals.values(), reverse=True)[:len(chart)]
+            assert len(chart) == min(len(totals), 5)
+
+
+def test_summary_follows_every_write(library):
+    rng = random.Random(7)
+    isbns = [isbn13(number) for number in range(60)]
+    for number, isbn in enumerate(isbns):
+        library.add_book(f'Title {number}', f'Author {number % 9}', 1950 + number, GENRES[number % len(GENRES)], isbn, rng.randint(1, 6))
+    cards = [library.register_user(f'Patron {number}') for number in range(12)]
+    assert_consistent(library)
+
+    for _ in range(150):
+        library.rent_book(rng.choice(cards), rng.choice(isbns), None, rng.randint(1, 2))
+    library.checkout(cards[0], [(isbn, 1) for isbn in rng.sample(isbns, 5)])
+    assert_consistent(library)
+
+    for card in cards[:6]:
+        for isbn in rng.sample(isbns, 10):
+            library.return_book(card, isbn, rng.choice([None, 1]))
+    library.bulk_return([(card, isbn, 1) for card in cards[6:] for isbn in rng.sample(isbns, 5)])
+    assert_consistent(library)
+
+    with library.transaction() as conn:
+        conn.execute("UPDATE Book SET Genre = 'Reclassified' WHERE BookID % 7 = 0")  # Genre changes move both totals
+    for isbn in isbns[:5]:
+        library.delete_book_by_isbn(isbn, 1)
+    library.weed_books(genre='Poetry')  # Deletes rows, keeps the ones with copies on loan
+    library.delete_book_by_year(1960)
+    assert_consistent(library)
+
+    for card in cards:
+        library.return_book(card, rng.choice(isbns))
+    library.archive_rentals(older_than_days=-3650)  # Every returned rental leaves Rental
+    assert_consistent(library)
+
+
+def test_rebuild_repairs_the_summary(library):
+    for number in range(10):
+        library.add_book(f'Title {number}', 'Author', 2000, GENRES[number % 2], isbn13(number), 3)
+    card = library.register_user('Patron')
+    library.rent_book(card, isbn13(0), None, 2)
+    with library.db.writer() as conn:
+        conn.execute('UPDATE GenreStats SET TotalBooks = TotalBooks + 7, TotalRented = TotalRented + 1')
+        conn.commit()
+        assert GenreStats.verify(conn) != []
+    library.rebuild_genre_stats()
+    assert_consistent(library)
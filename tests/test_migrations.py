@@ -0,0 +1,38 @@
+import sqlite3  # Import the sqlite3 module for the scratch databases
+
+from benchmarks import check_migrations  # Import the baseline migration check these tests run
+from db import migrate, current_version, MIGRATIONS  # Import the migration runner
+
+# Migration tests: a new database and one left by the first release both reach the latest schema.
+
+LATEST = MIGRATIONS[-1][0]
+
+
+def indexes(conn):
+    # Names of the indexes on the database's tables
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'")}
+
+
+def test_new_database_reaches_latest_version():
+    conn = sqlite3.connect(':memory:')
+    assert migrate(conn) == LATEST
+    assert current_version(conn) == LATEST
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == LATEST
+    assert [row[0] for row in conn.execute('SELECT version FROM schema_version ORDER BY version')] == \
+        [version for version, name, step in MIGRATIONS]
+    assert {'idx_book_isbn_key', 'idx_rental_user', 'idx_rental_book', 'idx_rental_due'} <= indexes(conn)
+    conn.close()
+
+
+def test_migrate_is_idempotent():
+    conn = sqlite3.connect(':memory:')
+    migrate(conn)
+    schema = conn.execute('SELECT type, name, sql FROM sqlite_master ORDER BY name').fetchall()
+    assert migrate(conn) == LATEST
+    assert conn.execute('SELECT type, name, sql FROM sqlite_master ORDER BY name').fetchall() == schema
+    conn.close()
+
+
+def test_first_release_database_migrates():
+    failures = check_migrations.check()
+    assert failures == [], '\n'.join(failures)
@@ -0,0 +1,29 @@
+import sqlite3  # Import the sqlite3 module for the scratch database
+
+from benchmarks import check_query_plans  # Import the query plan check these tests run
+from db import migrate  # Import migrate to create the schema
+
+# Query plan regression tests: every statement the model methods issue must use an index
+# (see benchmarks/check_query_plans.py, which also runs on its own).
+
+
+def test_model_queries_use_indexes():
+    checked, failures = check_query_plans.check()
+    assert checked > 0
+    assert failures == [], '\n\n'.join(failures)
+
+
+def test_full_scans_are_detected():
+    conn = sqlite3.connect(':memory:')
+    migrate(conn)
+    assert check_query_plans.full_scans(conn, "SELECT * FROM Book WHERE Title = 'x'") == ['Book']
+    assert check_query_plans.full_scans(conn, 'SELECT * FROM Book WHERE BookID = 1') == []
+    conn.close()
+
+
+def test_sorts_are_detected():
+    conn = sqlite3.connect(':memory:')
+    migrate(conn)
+    assert check_query_plans.sorts(conn, 'SELECT * FROM Book WHERE BookID > 0 ORDER BY Title')
+    assert not check_query_plans.sorts(conn, 'SELECT * FROM Book WHERE BookID > 0 ORDER BY BookID')
+    conn.close()
@@ -0,0 +1,75 @@
+import csv  # Import the csv module to read CSV catalogs
+import json  # Import the json module to read JSONL catalogs
+import os  # Import the os module to look at file extensions
+
+from utils.isbn import canonical_isbn  # Import canonical_isbn to validate and normalize the ISBN column
+
+# Column names accepted in catalog files, mapped to Book fields
+FIELDS = {
+    'title': 'title',
+    'author': 'author',
+    'year': 'year',
+    'genre': 'genre',
+    'isbn': 'isbn',
+    'count': 'count',
+}
+
+
+def _to_int(value, default):
+    # Convert a catalog value to int, keeping the default for empty cells
+    if value is None or str(value).strip() == '':
+        return default
+    return int(value)
+
+
+def normalize_row(row):
+    # Turn one raw catalog record into a (title, author, year, genre, isbn, count) tuple, None if unusable
+    fields = {FIELDS[key.strip().lower()]: value for key, value in row.items() if key and key.strip().lower() in FIELDS}
+    isbn = canonical_isbn(str(fields.get('isbn') or ''))
+    if not isbn:
+        return None  # A valid ISBN is mandatory, the same as in the admin menu
+    try:
+        year = _to_int(fields.get('year'), None)
+        count = _to_int(fields.get('count'), 1)  # Default is one copy, the same as Library.add_book from the menu
+    except (TypeError, ValueError):
+        return None  # Not a number, e.g. "1999a" in a CSV cell or a list in a JSON record
+    return (fields.get('title'), fields.get('author'), year, fields.get('genre'), isbn, count)
+
+
+def read_csv(path):
+    # Generator yielding raw records from a CSV file with a header row
+    with open(path, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
+
+def read_jsonl(path):
+    # Generator yielding raw records from a file with one JSON object per line, None for a line that is
+    # not a JSON object, so it is counted as rejected like a bad CSV cell instead of stopping the import
+    with open(path, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as error:
+                print(f"Line {number}: not valid JSON ({error.msg}), rejected.")
+                yield None
+                continue
+            if not isinstance(record, dict):
+                print(f"Line {number}: not a JSON object, rejected.")
+                yield None
+                continue
+            yield record
+
+
+def read_catalog(path):
+    # Generator yielding normalized book tuples, or None for rejected records, from a CSV or JSONL file
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        records = read_csv(path)
+    elif extension in ('.jsonl', '.ndjson'):
+        records = read_jsonl(path)
+    else:
+        raise ValueError(f"Unsupported catalog format '{extension}', expected .csv or .jsonl")
+    for record in records:
+        yield normalize_row(record) if record is not None else None
@@ -0,0 +1,33 @@
+import csv  # Import the csv module to write CSV output
+import json  # Import the json module to write JSONL output
+
+FORMATS = ('csv', 'jsonl')  # Output formats accepted by write_rows
+
+
+def write_csv(rows, headers, out):
+    # Write a header line and then every row as CSV, one row at a time; returns the number of rows
+    writer = csv.writer(out)
+    writer.writerow(headers)
+    written = 0
+    for row in rows:
+        writer.writerow(row)
+        written += 1
+    return written
+
+
+def write_jsonl(rows, headers, out):
+    # Write every row as one JSON object per line, one row at a time; returns the number of rows
+    written = 0
+    for row in rows:
+        out.write(json.dumps(dict(zip(headers, row))) + '\n')
+        written += 1
+    return written
+
+
+def write_rows(rows, headers, out, fmt='csv'):
+    # Stream rows (any iterable, e.g. a keyset-paginated generator) to out in the given format
+    if fmt == 'csv':
+        return write_csv(rows, headers, out)
+    if fmt == 'jsonl':
+        return write_jsonl(rows, headers, out)
+    raise ValueError(f"Unsupported export format '{fmt}', expected one of {', '.join(FORMATS)}")
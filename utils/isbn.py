@@ -0,0 +1,53 @@
+import re  # Import the re module to strip the label and separators of a written ISBN
+
+# Books are stored under one canonical form of their ISBN: the 13 digits of the ISBN-13, also kept
+# as an integer in Book.ISBNKey, which has a UNIQUE index. An ISBN-10 is the same edition as the
+# ISBN-13 made of 978, its first nine digits and a new check digit. Books catalogued before ISBNs were
+# checked may have an ISBN that is not valid (such as the old sample data's 'ISBN001'); their ISBNKey
+# is the ISBN text itself, so they can still be rented, returned and removed under it.
+
+LABEL = re.compile(r'^ISBN(?:-1[03])?:?', re.IGNORECASE)  # "ISBN", "ISBN-13:" and the like in front of the number
+SEPARATORS = re.compile(r'[\s-]+')  # Hyphens and spaces between the groups of digits
+
+
+def _check_digit_13(digits):
+    # Check digit of the first twelve digits of an ISBN-13
+    # The digits in odd positions weigh 1, those in even positions 3
+    return (10 - (sum(map(int, digits[0:12:2])) + 3 * sum(map(int, digits[1:12:2]))) % 10) % 10
+
+
+def _valid_isbn10(digits):
+    # True when ten characters (digits, X last) have a valid ISBN-10 check digit
+    values = [int(digit) for digit in digits[:9]] + [10 if digits[9] in 'Xx' else int(digits[9])]
+    return sum(value * (10 - position) for position, value in enumerate(values)) % 11 == 0
+
+
+def isbn_key(value):
+    # Integer key of an ISBN-10 or ISBN-13, written with or without hyphens, spaces or an "ISBN" label;
+    # None when it is not a valid ISBN
+    if isinstance(value, int):
+        value = str(value)
+    if not isinstance(value, str):
+        return None
+    digits = value if value.isdigit() else SEPARATORS.sub('', LABEL.sub('', value.strip()))  # Stored ISBNs are already bare digits
+    if len(digits) == 13 and digits.isdigit() and digits[:3] in ('978', '979'):
+        return int(digits) if _check_digit_13(digits) == int(digits[12]) else None
+    if len(digits) == 10 and digits[:9].isdigit() and (digits[9].isdigit() or digits[9] in 'Xx') and _valid_isbn10(digits):
+        body = '978' + digits[:9]
+        return int(body + str(_check_digit_13(body)))
+    return None
+
+
+def canonical_isbn(value):
+    # The 13-digit form an ISBN is stored under, None when it is not a valid ISBN
+    key = isbn_key(value)
+    return str(key) if key is not None else None
+
+
+def lookup_key(value):
+    # The Book.ISBNKey value an ISBN is looked up by: its integer key when it is valid, otherwise the
+    # text as written, which only matches a book catalogued under exactly that text. None for no ISBN.
+    key = isbn_key(value)
+    if key is not None or not isinstance(value, str):
+        return key
+    return value.strip() or None
@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 def add_one_month(date):
     month = date.month + 1
@@ -17,3 +17,22 @@ def add_one_year(date):
         return date.replace(year=date.year + 1)
     except ValueError:
         return date + (datetime(date.year + 1, 1, 1) - datetime(date.year, 1, 1))
+
+# Dates are stored as day numbers: whole days since 1970-01-01, the same as unixepoch(date) / 86400 in SQLite
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def to_day(value):
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    return value.toordinal() - EPOCH_ORDINAL
+
+def from_day(day):
+    return date.fromordinal(day + EPOCH_ORDINAL)
+
+def day_to_iso(day):
+    return from_day(day).isoformat()
+
+def today_day():
+    return date.today().toordinal() - EPOCH_ORDINAL